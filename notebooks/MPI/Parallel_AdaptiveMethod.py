@@ -0,0 +1,36 @@
+import argparse
+import numpy as np
+from mpi4py import MPI
+import time
+
+from quadrature import adaptive_integrate, romberg
+from timing import PhaseTimer
+
+def peak(x):
+    # narrow peak at x=1, hard for uniform grids
+    return 1/(1e-4+(x-1)**2)
+
+FUNCTIONS = {'cos': np.cos, 'peak': peak}
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--method', choices=['adaptive', 'romberg'], default='adaptive')
+parser.add_argument('--function', choices=sorted(FUNCTIONS), default='cos')
+parser.add_argument('--tol', type=float, default=1e-10)
+args = parser.parse_args()
+
+COMM=MPI.COMM_WORLD
+rank=COMM.Get_rank()
+t=time.time()
+timer=PhaseTimer(COMM)
+xmax=3*np.pi/2
+xmin=0
+
+if args.method=='adaptive':
+	integrale, error, nbeval = adaptive_integrate(FUNCTIONS[args.function], xmin, xmax, args.tol, comm=COMM, timer=timer)
+else:
+	integrale, error, nbeval = romberg(FUNCTIONS[args.function], xmin, xmax, args.tol, comm=COMM, timer=timer)
+
+if rank==0:
+	runtime=time.time()-t
+	print("integrale = " ,integrale, "+/-", error, "with", nbeval, "evaluations in ",runtime," s")
+timer.report(method=args.method, function=args.function, tol=args.tol)
@@ -1,26 +1,64 @@
-import random
+import argparse
 import numpy as np
 from mpi4py import MPI
 import time
+
+from estimator import combine_stats, mean_and_error, run_to_tolerance
+from integral_estimators import ESTIMATORS, estimator_kernel
+from montecarlo import number_of_blocks
+from scheduler import gather_results, map_blocks
+from timing import PhaseTimer
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--estimator', choices=sorted(ESTIMATORS), default='plain')
+parser.add_argument('--schedule', choices=['static', 'dynamic'], default='static')
+parser.add_argument('--chunk', type=int, default=1)
+parser.add_argument('--tol', type=float, default=None,
+                    help='sample until the standard error is below tol')
+parser.add_argument('--max-samples', type=int, default=None,
+                    help='upper bound on the samples drawn with --tol')
+parser.add_argument('--samples', type=int, default=1000000)
+args = parser.parse_args()
+
 COMM=MPI.COMM_WORLD
 rank=COMM.Get_rank()
 size=COMM.Get_size()
 t = time.time()
-nb=1000000
+nb=args.samples
+timer=PhaseTimer(COMM)
 xmin=0
 xmax=3*np.pi/2
-nbc=int(nb/size)+(size==(rank+1))*(nb%size)
-k=0
+
+options={}
+if args.estimator=='control':
+	# (x-pi)^2 follows the cos bowl on [0, 3pi/2], its integral is 3pi^3/8
+	options=dict(g=lambda x: (x-np.pi)**2, G=3*np.pi**3/8)
+# with --tol the run is open-ended and every block is full
+kernel=estimator_kernel(args.estimator, np.cos, xmin, xmax, None if args.tol is not None else nb, **options)
+
+if args.tol is not None:
+	# run until accurate enough instead of a fixed nb
+	I, error, nb=run_to_tolerance(COMM, kernel, args.tol, args.max_samples, timer=timer)
+	if rank==0:
+		time=time.time()-t
+		print("I= ",I, "+/-", error, "with", nb, "samples in ",time," s")
+	timer.report(samples=nb)
+	raise SystemExit
+
+nblocks=number_of_blocks(nb)
 #print("I ",rank," will generate ", nbc)
-for i in range(nbc):
-	x=random.uniform(xmin,xmax) 
-	k=k+np.cos(x)
-k=k/nbc
-inner_point=COMM.reduce(k,op=MPI.SUM ,root=0)
+results=map_blocks(COMM, nblocks, kernel, args.schedule, args.chunk, timer)
+timer.count('samples', sum(stats[3] for _, stats in results))
+# per-block stats are merged in block order on the root, so the estimate
+# does not depend on the number of ranks or on the schedule
+timer.barrier()
+block_stats=gather_results(COMM, results, root=0, timer=timer)
 
 if rank==0:
 	time=time.time()-t
-	I=inner_point/size
-	print("I= ",I, 'in ',time,' s')
+	stats=combine_stats(block_stats)
+	I, error=mean_and_error(stats)
+	print("I= ",I, "+/-", error, "with", int(stats[3]), "samples in ",time," s")
+timer.report(samples=nb)
 	
  	
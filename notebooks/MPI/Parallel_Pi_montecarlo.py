@@ -1,25 +1,51 @@
-import random
+import argparse
 from mpi4py import MPI
 import time
+
+from montecarlo import block_length, circle_points_kernel, number_of_blocks, report
+from estimator import circle_stats_kernel, run_to_tolerance
+from scheduler import gather_results, map_blocks
+from timing import PhaseTimer
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--schedule', choices=['static', 'dynamic'], default='static')
+parser.add_argument('--chunk', type=int, default=1)
+parser.add_argument('--tol', type=float, default=None,
+                    help='sample until the standard error is below tol')
+parser.add_argument('--max-samples', type=int, default=None,
+                    help='upper bound on the samples drawn with --tol')
+parser.add_argument('--samples', type=int, default=100000)
+parser.add_argument('--verbose', action='store_true',
+                    help='print the number of blocks of every rank')
+args = parser.parse_args()
+
 COMM=MPI.COMM_WORLD
 rank=COMM.Get_rank()
 size=COMM.Get_size()
 t = time.time()
-nb=100000
-nbc=int(nb/size)+(size==(rank+1))*(nb%size)
-k=0
-print("I ",rank," will generate ", nbc)
-for i in range(nbc):
-	x=random.uniform(-1, 1) 
-	y=random.uniform(-1, 1)
-	r2=x**2+y**2
-	k=k+(r2<1)
+nb=args.samples
+timer=PhaseTimer(COMM)
+
+if args.tol is not None:
+	# run until accurate enough instead of a fixed nb
+	pi, error, nb=run_to_tolerance(COMM, circle_stats_kernel(), args.tol, args.max_samples, timer=timer)
+	if rank==0:
+		time=time.time()-t
+		print("pi= ",pi, "+/-", error, "with", nb, "samples in ",time," s")
+	timer.report(samples=nb)
+	raise SystemExit
+
+nblocks=number_of_blocks(nb)
+results=map_blocks(COMM, nblocks, circle_points_kernel(nb), args.schedule, args.chunk, timer)
+timer.count('samples', sum(block_length(b, nb) for b, _ in results))
+if args.verbose:
+	print("I ",rank," generated ", len(results), " blocks")
 
-inner_point=COMM.reduce(k,op=MPI.SUM ,root=0)
+timer.barrier()
+inner_point=gather_results(COMM, results, root=0, timer=timer)
 
 if rank==0:
 	time=time.time()-t
-	pi=4*inner_point/nb
-	print("pi= ",pi, 'in ',time,' s')
+	report(sum(inner_point), nb, time)
+timer.report(samples=nb)
 	
- 	
@@ -0,0 +1,92 @@
+import argparse
+import os
+import sys
+import numpy as np
+from mpi4py import MPI
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from kernels.equations import BURGER_2D, DIFF_2D, POISSON_2D, hat_index
+from kernels.cavity import VELOCITY
+from kernels.checkpoint import Checkpoint
+from kernels.decomp import CartCavityFlow, CartDomain, ghost_width, solve
+from kernels.stencil import BACKENDS
+from kernels.timing import PhaseTimer
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--equation', choices=['diff', 'burger', 'poisson', 'cavity'], default='diff')
+parser.add_argument('--backend', choices=BACKENDS, default='numpy')
+parser.add_argument('--nx', type=int, default=1001)
+parser.add_argument('--ny', type=int, default=1001)
+parser.add_argument('--nt', type=int, default=100)
+parser.add_argument('--checkpoint', default=None,
+                    help='directory of the per-rank checkpoints to restart from and save to')
+parser.add_argument('--checkpoint-every', type=int, default=100)
+args = parser.parse_args()
+
+COMM=MPI.COMM_WORLD
+rank=COMM.Get_rank()
+timer=PhaseTimer(COMM)
+nx, ny, nt = args.nx, args.ny, args.nt
+dx = 2/(nx-1)
+dy = 2/(ny-1)
+
+def set_global(local, index, value):
+	# the cells of a global index this rank holds, if any
+	index = domain.local_index(index)
+	if index is not None:
+		local[index] = value
+
+# every rank only allocates and initializes its local blocks
+with timer.phase('initial conditions', 'setup'):
+	if args.equation=='poisson':
+		eq = POISSON_2D
+		domain = CartDomain(COMM, (ny, nx), ghost_width(eq))
+		b = domain.zeros()
+		set_global(b, (int(ny / 4), int(nx / 4)), 100)
+		set_global(b, (int(3 * ny / 4), int(3 * nx / 4)), -100)
+		arrays = [domain.zeros(), domain.zeros(), b]
+		params = (dx, dy)
+	elif args.equation=='cavity':
+		eq = VELOCITY
+		domain = CartDomain(COMM, (ny, nx), ghost_width(eq))
+		arrays = [domain.zeros(), domain.zeros(), domain.zeros()]
+		# the initial condition at y=2, as in cavity.cavity_flow
+		set_global(arrays[0], (slice(None), -1), 1)
+		rho, nu = 1., .1
+		dt = min(.001, .2*dx*dy/nu)
+	else:
+		eq = DIFF_2D if args.equation=='diff' else BURGER_2D
+		domain = CartDomain(COMM, (ny, nx), ghost_width(eq))
+		arrays = []
+		for field in eq.fields:
+			u = domain.zeros()
+			set_global(u, (slice(None), slice(None)), 1)
+			set_global(u, hat_index(dx, dy), 2)
+			arrays += [u, domain.zeros()]
+		nu = .05 if args.equation=='diff' else .01
+		dt = .2*dx*dy/nu if args.equation=='diff' else .001
+		params = (dt, dx, dy, nu)
+
+checkpoint=None
+if args.checkpoint:
+	checkpoint=Checkpoint(args.checkpoint, args.checkpoint_every, comm=domain.cart)
+
+timer.barrier()
+t=time.time()
+if args.equation=='cavity':
+	u, v, p = arrays
+	CartCavityFlow(domain, u, v, p, dt, dx, dy, rho, nu, backend=args.backend, timer=timer).run(nt, checkpoint=checkpoint)
+else:
+	solve(eq, domain, arrays, nt, *params, timer=timer, checkpoint=checkpoint, backend=args.backend)
+if checkpoint:
+	checkpoint.close()
+timer.barrier()
+runtime=time.time()-t
+with timer.phase('gather', 'communication'):
+	# the lid fixes max u of the cavity, its pressure says more
+	result = domain.gather(arrays[2 if args.equation=='cavity' else 0])
+
+if rank==0:
+	print('cavity_flow' if args.equation=='cavity' else eq.name, "on", domain.dims, "ranks, max =", result.max(), "in ", runtime, " s")
+timer.report(nx=nx, ny=ny, nt=nt)
@@ -1,12 +1,14 @@
+import argparse
 import numpy as np
 from mpi4py import MPI
 import time
-def compute_integrale_trapeze(x, y, nbi):
-    integrale = 0.
-    for i in range(nbi):
-        trap = (x[i+1]-x[i])/2 * (y[i]+y[i+1])
-        integrale = integrale + trap               
-    return integrale
+
+from quadrature import split_intervals, trapezoid
+from timing import PhaseTimer
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--nbx', type=int, default=1067)
+args = parser.parse_args()
 
 COMM=MPI.COMM_WORLD
 size=COMM.Get_size()
@@ -14,26 +16,22 @@ rank=COMM.Get_rank()
 t=time.time()
 xmax=3*np.pi/2
 xmin=0
-nbx = 1067
-dx=(xmax-xmin)/(nbx-1)
-nbi=int((nbx-1)/size)
-if (size==(rank+1)):
-	nbi=nbi+((nbx-1)%size)
-
-if rank==(size-1):
-	xmin = xmax-nbi*dx
-else:
-	xmax = xmin+(rank+1)*nbi*dx
-	xmin = xmin+rank*nbi*dx
-	
+nbx = args.nbx
+timer=PhaseTimer(COMM)
+# nbx points, nbx-1 trapezes shared out by the common split
+first, nbi = split_intervals(nbx-1, rank, size)
 
-x = np.linspace(xmin, xmax, nbi+1)
-y = np.cos(x)
-integrale_c = compute_integrale_trapeze(x, y, nbi)
-integrale=COMM.reduce(integrale_c,op=MPI.SUM, root=0)
+with timer.phase('integrate', 'compute'):
+	integrale_c = trapezoid(np.cos, xmin, xmax, nbx-1, first, nbi)
+timer.count('intervals', nbi)
+timer.barrier()
+with timer.phase('reduce', 'communication'):
+	integrale=COMM.reduce(integrale_c,op=MPI.SUM, root=0)
+timer.count('bytes reduced', 8)
 
 if rank==0:
 	runtime=time.time()-t
 	print("integrale = " ,integrale, "in ",runtime," s")
+timer.report(nbx=nbx)
 	
 	
@@ -5,9 +5,13 @@ Created on Mon Dec  7 09:19:39 2020
 
 @author: kissami
 """
+import argparse
 import numpy as np
 from mpi4py import MPI
-import random 
+
+from montecarlo import (block_length, compute_circle_points_blocks,
+                        number_of_blocks, rank_blocks, report)
+from timing import PhaseTimer
 
 COMM = MPI.COMM_WORLD
 SIZE = COMM.Get_size()
@@ -15,39 +19,35 @@ RANK = COMM.Get_rank()
 
 INTERVAL= 1000
 
+parser = argparse.ArgumentParser()
+parser.add_argument('--samples', type=int, default=INTERVAL**2)
+args = parser.parse_args()
+
 def parallel_compute_points():
 
-    circle_points = 0
-    random.seed(42)  
-    
-    for i in range(RANK, INTERVAL**2, SIZE):
-        # Randomly generated x and y values from a 
-        # uniform distribution 
-        # Rannge of x and y values is -1 to 1 
-        rand_x= random.uniform(-1, 1) 
-        rand_y= random.uniform(-1, 1) 
-      
-        # Distance between (x, y) from the origin 
-        origin_dist= rand_x**2 + rand_y**2
-    
-        # Checking if (x, y) lies inside the circle 
-        if origin_dist<= 1.: 
-            circle_points+= 1
-        
-    return circle_points
+    # Each rank draws its share of the global blocks, every block from its
+    # own stream, so the total does not depend on SIZE
+    nblocks = number_of_blocks(args.samples)
+    blocks = rank_blocks(nblocks, RANK, SIZE)
+    timer.count('samples', sum(block_length(b, args.samples) for b in blocks))
+
+    return compute_circle_points_blocks(blocks, args.samples)
 
 
+timer = PhaseTimer(COMM)
 start = MPI.Wtime()
-circle_points = parallel_compute_points()
+with timer.phase('sample', 'compute'):
+    circle_points = parallel_compute_points()
      
 circle_points = np.array(circle_points, 'd')
 sum_circle_points = np.zeros(1)
 
-COMM.Reduce(circle_points, sum_circle_points, MPI.SUM, 0)
+timer.barrier()
+with timer.phase('reduce', 'communication'):
+    COMM.Reduce(circle_points, sum_circle_points, MPI.SUM, 0)
+timer.count('bytes reduced', circle_points.nbytes)
 end = MPI.Wtime()
 
 if RANK == 0:
-    print("Circle points number :",sum_circle_points)
-    pi = 4* sum_circle_points/ INTERVAL**2
-    print("Final Estimation of Pi=", pi, "cpu time :",end-start)
-        
+    report(int(sum_circle_points[0]), args.samples, end-start)
+timer.report(samples=args.samples)
@@ -1,48 +1,22 @@
-import random 
 import timeit
 
-INTERVAL= 1000
+from montecarlo import (compute_circle_points_blocks, number_of_blocks,
+                        report)
 
-random.seed(42)  
+INTERVAL= 1000
 
 def compute_points():
-    
-    random.seed(42)  
-    
-    circle_points= 0
 
     # Total Random numbers generated= possible x 
-    # values* possible y values 
-    for i in range(INTERVAL**2): 
-      
-        # Randomly generated x and y values from a 
-        # uniform distribution 
-        # Rannge of x and y values is -1 to 1 
-        
-        
-        rand_x= random.uniform(-1, 1) 
-        rand_y= random.uniform(-1, 1) 
-      
-        # Distance between (x, y) from the origin 
-        origin_dist= rand_x**2 + rand_y**2
-      
-        # Checking if (x, y) lies inside the circle 
-        if origin_dist<= 1: 
-            circle_points+= 1
-      
-        # Estimating value of pi, 
-        # pi= 4*(no. of points generated inside the  
-        # circle)/ (no. of points generated inside the square) 
-    
-     
-    
-    return circle_points
+    # values* possible y values, drawn block by block
+    nblocks = number_of_blocks(INTERVAL**2)
+    return compute_circle_points_blocks(range(nblocks), INTERVAL**2)
 
 start = timeit.default_timer()
 circle_points = compute_points()
 end = timeit.default_timer()
 
-
-pi = 4* circle_points/ INTERVAL**2 
-print("Circle points number :",circle_points)
-print("Final Estimation of Pi=", pi, "cpu time :",end-start) 
\ No newline at end of file
+# Estimating value of pi, 
+# pi= 4*(no. of points generated inside the  
+# circle)/ (no. of points generated inside the square) 
+report(circle_points, INTERVAL**2, end-start)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Running Monte Carlo estimator that samples until it is accurate enough.
+
+Every rank accumulates (count, mean, M2, evaluations) of its sample values
+in a NumPy buffer, M2 being the sum of the squared deviations from the
+mean.  The count is the number of independent values the error is computed
+from and the evaluations the number of points drawn; they differ for
+estimators whose independent unit is a pair or a whole block (see
+integral_estimators.py).  Two such vectors are merged with the update of
+Chan, Golub and LeVeque, which unlike sums of squares does not cancel when
+the variance is small next to the mean.  The reduction operation MERGE
+applies it, so a non-blocking Iallreduce of a snapshot of that buffer is
+kept in flight while the ranks go on sampling; when it completes, every rank
+sees the same global statistics and takes the same decision: stop once the
+standard error of the mean drops below the tolerance, or post the next
+reduction.  A final Allreduce folds in the blocks drawn after the last
+snapshot.
+
+Blocks are global and rank-cyclic as in montecarlo.py, but the block where a
+run stops depends on timing, so unlike fixed-size runs the result is not
+reproducible bit for bit.
+"""
+import math
+
+import numpy as np
+from mpi4py import MPI
+
+from montecarlo import (BLOCK_SIZE, SEED, block_circle_points,
+                        block_generator, block_length)
+from timing import NULL_TIMER
+
+
+NSTATS = 4
+
+
+def sample_stats(values, evaluations=None):
+    """Return the (count, mean, M2, evaluations) vector of values."""
+    if evaluations is None:
+        evaluations = len(values)
+    if len(values) == 0:
+        return np.array([0., 0., 0., evaluations])
+    mean = np.mean(values)
+    deviations = values - mean
+    return np.array([len(values), mean, np.dot(deviations, deviations),
+                     evaluations])
+
+
+def merge_stats(a, b):
+    """Return the stats vector of the union of the samples of a and b."""
+    count = a[0] + b[0]
+    if count == 0:
+        return np.array([0., 0., 0., a[3] + b[3]])
+    delta = b[1] - a[1]
+    return np.array([count, a[1] + delta * (b[0] / count),
+                     a[2] + b[2] + delta * delta * (a[0] * b[0] / count),
+                     a[3] + b[3]])
+
+
+def combine_stats(stats):
+    """Merge a sequence of stats vectors, in order."""
+    total = np.zeros(NSTATS)
+    for s in stats:
+        total = merge_stats(total, s)
+    return total
+
+
+def _merge(inbuf, inoutbuf, datatype):
+    a = np.frombuffer(inbuf, dtype=float).reshape(-1, NSTATS)
+    b = np.frombuffer(inoutbuf, dtype=float).reshape(-1, NSTATS)
+    for i in range(len(b)):
+        b[i] = merge_stats(a[i], b[i])
+
+
+# one stats vector is a single element, so MPI never splits it
+STATS = MPI.DOUBLE.Create_contiguous(NSTATS).Commit()
+MERGE = MPI.Op.Create(_merge, commute=True)
+
+
+def points_in_block(block, nsamples, block_size=BLOCK_SIZE):
+    """Number of points of block, the last one cut short in a run of nsamples.
+
+    nsamples None is an open-ended run, where every block is full.
+    """
+    if nsamples is None:
+        return block_size
+    return block_length(block, nsamples, block_size)
+
+
+def circle_stats_kernel(seed=SEED, block_size=BLOCK_SIZE):
+    """Return kernel(block) giving the stats of the pi samples 4*[x^2+y^2<=1]."""
+    x = np.empty(block_size)
+    y = np.empty(block_size)
+    inside = np.empty(block_size, dtype=bool)
+
+    def kernel(block):
+        hits = block_circle_points(block_generator(seed, block), x, y, inside)
+        mean = 4. * hits / block_size
+        return np.array([block_size, mean, mean * (4. - mean) * block_size,
+                         block_size])
+
+    return kernel
+
+
+def function_stats_kernel(f, xmin, xmax, nsamples=None, seed=SEED,
+                          block_size=BLOCK_SIZE):
+    """Return kernel(block) giving the stats of the samples (xmax-xmin)*f(x).
+
+    With nsamples the blocks cover exactly nsamples points, otherwise every
+    block is full, as run_to_tolerance needs.
+    """
+    buffer = np.empty(block_size)
+
+    def kernel(block):
+        x = buffer[:points_in_block(block, nsamples, block_size)]
+        block_generator(seed, block).random(out=x)
+        np.multiply(x, xmax - xmin, out=x)
+        np.add(x, xmin, out=x)
+        values = f(x)
+        np.multiply(values, xmax - xmin, out=values)
+        return sample_stats(values)
+
+    return kernel
+
+
+def mean_and_error(stats):
+    """Return the mean and its standard error from a stats vector."""
+    count, mean, m2 = stats[:3]
+    if count < 2:
+        return mean, float('inf')
+    return mean, math.sqrt(m2 / (count - 1) / count)
+
+
+def run_to_tolerance(comm, kernel, tol, max_samples=None, check_every=4,
+                     timer=NULL_TIMER):
+    """Sample blocks on every rank until the standard error is below tol.
+
+    Returns (mean, standard error, number of evaluations), the same on all
+    ranks.  A timing.PhaseTimer times the sampling, the tests of the
+    reduction in flight and the final reduction.
+    """
+    rank = comm.Get_rank()
+    size = comm.Get_size()
+    local = np.zeros(NSTATS)
+    snapshot = np.zeros(NSTATS)
+    total = np.zeros(NSTATS)
+
+    block = rank
+    request = None
+    while True:
+        with timer.phase('blocks', 'compute'):
+            for _ in range(check_every):
+                local[:] = merge_stats(local, kernel(block))
+                block += size
+        timer.count('blocks', check_every)
+
+        if request is not None:
+            with timer.phase('test', 'communication'):
+                done = request.Test()
+            if not done:
+                continue
+            mean, error = mean_and_error(total)
+            if error < tol:
+                break
+            if max_samples is not None and total[3] >= max_samples:
+                break
+
+        snapshot[:] = local
+        with timer.phase('iallreduce', 'communication'):
+            request = comm.Iallreduce([snapshot, 1, STATS],
+                                      [total, 1, STATS], op=MERGE)
+        timer.count('reductions')
+        timer.count('bytes reduced', snapshot.nbytes)
+
+    with timer.phase('allreduce', 'communication'):
+        comm.Allreduce([local, 1, STATS], [total, 1, STATS], op=MERGE)
+    timer.count('reductions')
+    timer.count('bytes reduced', local.nbytes)
+    timer.count('samples', local[3])
+    mean, error = mean_and_error(total)
+    return mean, error, int(total[3])
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Variance-reduction and quasi-Monte Carlo estimators of a 1D integral.
+
+Every estimator is a factory returning kernel(block), which gives the stats
+vector of estimator.py for one global block of BLOCK_SIZE evaluations.  A
+block only depends on the seed and on its number, so the blocks can be
+spread over the ranks with any schedule of scheduler.py or sampled until a
+tolerance with estimator.run_to_tolerance.  Given nsamples, the last block
+is cut short so that the blocks evaluate exactly nsamples points, as in
+montecarlo.circle_points_kernel.
+
+  plain       (xmax-xmin) f(x) with x uniform
+  stratified  one uniform point in each of the equal strata of a block
+  antithetic  pairs x, xmin+xmax-x
+  control     f - beta (g - G) for a control g of known integral G
+  sobol       Sobol points, scrambled anew in every block
+  halton      Halton points, with digit permutations drawn for every block
+
+For plain and control the independent unit is a point, for antithetic a
+pair; a block cut to an odd length draws one more point to end its last
+pair.  Stratified and quasi-random points are not independent inside a
+block, so there the unit is the block mean; the standard error is then
+estimated from the spread of the block means.  Each quasi-random block is an
+independent random scrambling of the same points (randomized QMC), so the
+block means are independent replicates; consecutive pieces of a single
+scrambled sequence would not be, and neither are the points themselves.
+"""
+import warnings
+
+import numpy as np
+from scipy.stats import qmc
+
+from estimator import function_stats_kernel, points_in_block, sample_stats
+from montecarlo import BLOCK_SIZE, SEED, block_generator
+
+# spawn key of the pilot stream, far above any block number
+PILOT_BLOCK = 2**63 - 1
+PILOT_SIZE = 4096
+
+
+def _block_mean_stats(values, evaluations):
+    return np.array([1., np.mean(values), 0., evaluations])
+
+
+def stratified_kernel(f, xmin, xmax, nsamples=None, seed=SEED,
+                      block_size=BLOCK_SIZE):
+    """Block of n points: one uniform point in each of n equal strata."""
+    buffer = np.empty(block_size)
+    steps = np.arange(block_size)
+
+    def kernel(block):
+        n = points_in_block(block, nsamples, block_size)
+        h = (xmax - xmin) / n
+        x = buffer[:n]
+        block_generator(seed, block).random(out=x)
+        np.add(x, steps[:n], out=x)
+        np.multiply(x, h, out=x)
+        np.add(x, xmin, out=x)
+        values = f(x)
+        np.multiply(values, xmax - xmin, out=values)
+        return _block_mean_stats(values, n)
+
+    return kernel
+
+
+def antithetic_kernel(f, xmin, xmax, nsamples=None, seed=SEED,
+                      block_size=BLOCK_SIZE):
+    buffer = np.empty(-(-block_size // 2))
+
+    def kernel(block):
+        npairs = -(-points_in_block(block, nsamples, block_size) // 2)
+        x = buffer[:npairs]
+        block_generator(seed, block).random(out=x)
+        np.multiply(x, xmax - xmin, out=x)
+        np.add(x, xmin, out=x)
+        values = f(x)
+        values += f(xmax + xmin - x)
+        np.multiply(values, (xmax - xmin) / 2, out=values)
+        return sample_stats(values, 2 * npairs)
+
+    return kernel
+
+
+def control_beta(f, g, xmin, xmax, seed=SEED):
+    """Optimal control coefficient cov(f, g)/var(g) estimated on a pilot run.
+
+    The pilot stream only depends on the seed, so every rank computes the
+    same beta without communicating.
+    """
+    x = block_generator(seed, PILOT_BLOCK).uniform(xmin, xmax, PILOT_SIZE)
+    fx = f(x)
+    gx = g(x)
+    covariance = np.cov(fx, gx)
+    return covariance[0, 1] / covariance[1, 1]
+
+
+def control_kernel(f, xmin, xmax, g, G, nsamples=None, seed=SEED,
+                   block_size=BLOCK_SIZE):
+    """Estimator with the control variate g, whose integral over the range is G."""
+    beta = control_beta(f, g, xmin, xmax, seed)
+    gmean = G / (xmax - xmin)
+    buffer = np.empty(block_size)
+
+    def kernel(block):
+        x = buffer[:points_in_block(block, nsamples, block_size)]
+        block_generator(seed, block).random(out=x)
+        np.multiply(x, xmax - xmin, out=x)
+        np.add(x, xmin, out=x)
+        values = f(x)
+        values -= beta * (g(x) - gmean)
+        np.multiply(values, xmax - xmin, out=values)
+        return sample_stats(values)
+
+    return kernel
+
+
+def sobol_kernel(f, xmin, xmax, nsamples=None, seed=SEED,
+                 block_size=BLOCK_SIZE):
+    """Scrambled Sobol estimator; block_size should be a power of two.
+
+    Block b evaluates the first points of the Sobol sequence under its own
+    random scrambling, drawn from the stream of the block.
+    """
+    def kernel(block):
+        n = points_in_block(block, nsamples, block_size)
+        # with the default 30 bits the points lie on a 2^-30 grid, a bias
+        # of a few 1e-9 that no number of replicates reveals
+        engine = qmc.Sobol(1, scramble=True, bits=64,
+                           seed=block_generator(seed, block))
+        with warnings.catch_warnings():
+            # only a block cut at nsamples is not a power of two long
+            warnings.filterwarnings('ignore', 'The balance properties')
+            x = engine.random(n)[:, 0]
+        np.multiply(x, xmax - xmin, out=x)
+        np.add(x, xmin, out=x)
+        values = f(x)
+        np.multiply(values, xmax - xmin, out=values)
+        return _block_mean_stats(values, n)
+
+    return kernel
+
+
+def scrambled_radical_inverse(index, base, permutations):
+    """Van der Corput points of the given indices with permuted digits.
+
+    permutations[d] is the random permutation applied to the digit d of the
+    index.  A point only depends on its own index.
+    Once the remaining digits are all zero, their permuted values add the same
+    tail to every point.
+    """
+    index = index.copy()
+    points = np.zeros(len(index))
+    scales = float(base) ** -np.arange(1, len(permutations) + 1)
+    for digit, permutation in enumerate(permutations):
+        if not index.any():
+            points += np.dot(permutations[digit:, 0], scales[digit:])
+            break
+        points += permutation[index % base] * scales[digit]
+        index //= base
+    return points
+
+
+def halton_kernel(f, xmin, xmax, nsamples=None, seed=SEED,
+                  block_size=BLOCK_SIZE, base=2):
+    """Scrambled Halton estimator (the 1D Halton sequence is base 2).
+
+    Block b evaluates the first points of the sequence with digit
+    permutations of its own, drawn from the stream of the block.
+    """
+    ndigits = int(np.ceil(53 * np.log(2) / np.log(base)))
+    index = np.arange(block_size, dtype=np.int64)
+
+    def kernel(block):
+        n = points_in_block(block, nsamples, block_size)
+        rng = block_generator(seed, block)
+        permutations = np.array([rng.permutation(base)
+                                 for _ in range(ndigits)])
+        x = scrambled_radical_inverse(index[:n], base, permutations)
+        np.multiply(x, xmax - xmin, out=x)
+        np.add(x, xmin, out=x)
+        values = f(x)
+        np.multiply(values, xmax - xmin, out=values)
+        return _block_mean_stats(values, n)
+
+    return kernel
+
+
+ESTIMATORS = {
+    'plain': function_stats_kernel,
+    'stratified': stratified_kernel,
+    'antithetic': antithetic_kernel,
+    'control': control_kernel,
+    'sobol': sobol_kernel,
+    'halton': halton_kernel,
+}
+
+
+def estimator_kernel(name, f, xmin, xmax, nsamples=None, seed=SEED,
+                     block_size=BLOCK_SIZE, **options):
+    """Kernel of the named estimator over nsamples points (None: unbounded)."""
+    try:
+        factory = ESTIMATORS[name]
+    except KeyError:
+        raise ValueError("unknown estimator %r" % name) from None
+    return factory(f, xmin, xmax, nsamples=nsamples, seed=seed,
+                   block_size=block_size, **options)
@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The Monte Carlo engine now lives in the kernels package (kernels/montecarlo.py);
+this module keeps `from montecarlo import ...` working for the MPI scripts.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from kernels.montecarlo import *  # noqa: E402,F401,F403
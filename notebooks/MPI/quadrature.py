@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vectorized composite quadrature rules shared by the MPI quadrature scripts.
+
+[xmin, xmax] is cut into n intervals of width h.  Every rule integrates one
+interval [a, a+h] as h * sum(w_k f(a + t_k h)) with nodes t_k in [0, 1] and
+weights w_k summing to 1.  The intervals are evaluated by chunks of
+CHUNK_SIZE so memory stays flat for any n, and the nodes at t=0 and t=1 are
+shared between neighbouring intervals, so f is evaluated once per grid point.
+
+Interval i always starts at xmin + i*h whatever the rank that owns it, so
+the sum over all ranks only depends on the number of ranks through the
+floating-point reduction order.
+
+adaptive_integrate refines with a 7/15-point Gauss-Kronrod pair only the
+intervals whose error estimate is too large, and romberg extrapolates
+trapezoid sums on grids halved at each level.  Both spread the function
+evaluations of every refinement level over the ranks of a communicator or
+over the workers of a concurrent.futures pool.
+
+The parallel functions take an optional timing.PhaseTimer that times their
+evaluations and reductions and counts the intervals and bytes reduced.
+"""
+import math
+import os
+
+import numpy as np
+from mpi4py import MPI
+
+from timing import NULL_TIMER
+
+CHUNK_SIZE = 1 << 16
+
+
+def split_intervals(n, rank, size):
+    """Return (first, count) of the contiguous intervals owned by rank.
+
+    The first n % size ranks get one interval more than the others.
+    """
+    count, extra = divmod(n, size)
+    first = rank * count + min(rank, extra)
+    return first, count + (rank < extra)
+
+
+def _rule(name, order=5):
+    if name == 'rectangle':
+        return np.array([0.]), np.array([1.])
+    if name == 'trapezoid':
+        return np.array([0., 1.]), np.array([.5, .5])
+    if name == 'midpoint':
+        return np.array([.5]), np.array([1.])
+    if name == 'simpson':
+        return np.array([0., .5, 1.]), np.array([1., 4., 1.]) / 6
+    if name == 'gauss':
+        nodes, weights = np.polynomial.legendre.leggauss(order)
+        return (nodes + 1) / 2, weights / 2
+    raise ValueError("unknown rule %r" % name)
+
+
+RULES = ('rectangle', 'midpoint', 'trapezoid', 'simpson', 'gauss')
+
+
+def _chunk_sum(f, xmin, h, start, stop, nodes, weights):
+    total = 0.
+    interior = (nodes > 0.) & (nodes < 1.)
+    left = weights[nodes == 0.].sum()
+    right = weights[nodes == 1.].sum()
+    if left or right:
+        y = f(xmin + h * np.arange(start, stop + 1))
+        total += left * np.sum(y[:-1]) + right * np.sum(y[1:])
+    if interior.any():
+        a = xmin + h * np.arange(start, stop)
+        for t, w in zip(nodes[interior], weights[interior]):
+            total += w * np.sum(f(a + t * h))
+    return total
+
+
+def integrate(f, xmin, xmax, n, rule='trapezoid', first=0, count=None,
+              order=5, chunk=CHUNK_SIZE):
+    """Integrate f over the intervals [first, first+count) of n on [xmin, xmax].
+
+    With the defaults the whole range is integrated.  f must accept NumPy
+    arrays.  order is the number of Gauss-Legendre nodes of the 'gauss' rule.
+    """
+    if count is None:
+        count = n - first
+    nodes, weights = _rule(rule, order)
+    h = (xmax - xmin) / n
+    total = 0.
+    for start in range(first, first + count, chunk):
+        stop = min(start + chunk, first + count)
+        total += _chunk_sum(f, xmin, h, start, stop, nodes, weights)
+    return h * total
+
+
+def rectangle(f, xmin, xmax, n, first=0, count=None, chunk=CHUNK_SIZE):
+    return integrate(f, xmin, xmax, n, 'rectangle', first, count, chunk=chunk)
+
+
+def trapezoid(f, xmin, xmax, n, first=0, count=None, chunk=CHUNK_SIZE):
+    return integrate(f, xmin, xmax, n, 'trapezoid', first, count, chunk=chunk)
+
+
+def simpson(f, xmin, xmax, n, first=0, count=None, chunk=CHUNK_SIZE):
+    return integrate(f, xmin, xmax, n, 'simpson', first, count, chunk=chunk)
+
+
+def gauss_legendre(f, xmin, xmax, n, first=0, count=None, order=5,
+                   chunk=CHUNK_SIZE):
+    return integrate(f, xmin, xmax, n, 'gauss', first, count, order, chunk)
+
+
+def parallel_integrate(comm, f, xmin, xmax, n, rule='trapezoid', root=0,
+                       timer=NULL_TIMER, **options):
+    """Integrate over all n intervals, split with split_intervals over comm.
+
+    Returns the integral on root and None elsewhere.
+    """
+    first, count = split_intervals(n, comm.Get_rank(), comm.Get_size())
+    with timer.phase('integrate', 'compute'):
+        local = integrate(f, xmin, xmax, n, rule, first, count, **options)
+    timer.count('intervals', count)
+    with timer.phase('reduce', 'communication'):
+        result = comm.reduce(local, root=root)
+    timer.count('bytes reduced', 8)
+    return result
+
+
+# 15-point Kronrod nodes on [-1, 1] with their weights, and the weights of the
+# embedded 7-point Gauss rule (zero on the Kronrod-only nodes)
+_XK = np.array([0.991455371120812639206854697526329,
+                0.949107912342758524526189684047851,
+                0.864864423359769072789712788640926,
+                0.741531185599394439863864773280788,
+                0.586087235467691130294144845693013,
+                0.405845151377397166906606412076961,
+                0.207784955007898467600689403773245])
+_WK = np.array([0.022935322010529224963732008058970,
+                0.063092092629978553290700663189204,
+                0.104790010322250183839876322541518,
+                0.140653259715525918745189590510238,
+                0.169004726639267902826583426598550,
+                0.190350578064785409913256402421014,
+                0.204432940075298892414161999234649])
+_WK0 = 0.209482141084727828012999174891714
+_WG = np.array([0., 0.129484966168869693270611432679082,
+                0., 0.279705391489276667901467771423780,
+                0., 0.381830050505118944950369775488975, 0.])
+_WG0 = 0.417959183673469387755102040816327
+
+GK_NODES = np.concatenate((-_XK, [0.], _XK[::-1]))
+GK_KRONROD = np.concatenate((_WK, [_WK0], _WK[::-1]))
+GK_GAUSS = np.concatenate((_WG, [_WG0], _WG[::-1]))
+
+
+def gauss_kronrod(f, a, b):
+    """Return the 15-point integrals of f on the intervals [a, b] and the
+    absolute difference with the embedded 7-point rule as error estimate."""
+    center = (a + b) / 2
+    half = (b - a) / 2
+    # an explicit shape, as a share of no interval has no -1 to infer
+    y = f(center[:, None] + half[:, None] * GK_NODES).reshape(len(a),
+                                                              len(GK_NODES))
+    kronrod = half * (y @ GK_KRONROD)
+    gauss = half * (y @ GK_GAUSS)
+    return kronrod, np.abs(kronrod - gauss)
+
+
+def _gauss_kronrod_pairs(f, a, b):
+    """gauss_kronrod as one (n, 2) array of (integral, error) rows."""
+    return np.stack(gauss_kronrod(f, a, b), axis=1)
+
+
+def distributed_gauss_kronrod(f, a, b, comm=None, pool=None, nchunks=None,
+                              timer=NULL_TIMER):
+    """gauss_kronrod of all intervals, every rank or worker doing a share.
+
+    With a communicator every rank evaluates its split_intervals share and an
+    Allgatherv hands all the results to every rank.  With a pool the
+    intervals are cut into nchunks pieces (by default one per CPU).
+    """
+    n = len(a)
+    if comm is not None and comm.Get_size() > 1:
+        size = comm.Get_size()
+        bounds = [split_intervals(n, r, size) for r in range(size)]
+        first, count = bounds[comm.Get_rank()]
+        with timer.phase('gauss-kronrod', 'compute'):
+            local = _gauss_kronrod_pairs(f, a[first:first + count],
+                                         b[first:first + count])
+        timer.count('intervals', count)
+        pairs = np.empty((n, 2))
+        with timer.phase('allgatherv', 'communication'):
+            comm.Allgatherv(local, [pairs, [2 * c for _, c in bounds],
+                                    [2 * s for s, _ in bounds], MPI.DOUBLE])
+        timer.count('bytes reduced', local.nbytes)
+    elif pool is not None:
+        nchunks = nchunks or os.cpu_count() or 1
+        bounds = [split_intervals(n, r, nchunks) for r in range(nchunks)]
+        pairs = np.concatenate(list(pool.map(
+            _gauss_kronrod_pairs, [f] * nchunks,
+            [a[s:s + c] for s, c in bounds], [b[s:s + c] for s, c in bounds])))
+    else:
+        with timer.phase('gauss-kronrod', 'compute'):
+            pairs = _gauss_kronrod_pairs(f, a, b)
+        timer.count('intervals', n)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def adaptive_integrate(f, xmin, xmax, tol=1e-10, initial=8,
+                       max_intervals=1 << 20, comm=None, pool=None,
+                       timer=NULL_TIMER):
+    """Globally adaptive Gauss-Kronrod integration of f on [xmin, xmax].
+
+    Intervals whose error estimate is above their share of tol, in
+    proportion to their length, are bisected and evaluated again; the others
+    are frozen.  Only the intervals still being refined are shared out over
+    comm or pool at every level, so the work follows the hard regions.
+
+    Returns (integral, error estimate, number of evaluations of f).
+    """
+    edges = np.linspace(xmin, xmax, initial + 1)
+    a, b = edges[:-1], edges[1:]
+    done_value = done_error = 0.
+    evaluations = 0
+    while True:
+        values, errors = distributed_gauss_kronrod(f, a, b, comm, pool,
+                                                   timer=timer)
+        evaluations += len(GK_NODES) * len(a)
+        refine = errors > tol * (b - a) / (xmax - xmin)
+        total_error = done_error + errors.sum()
+        if (not refine.any() or total_error <= tol
+                or 2 * refine.sum() > max_intervals):
+            return (done_value + values.sum(), total_error, evaluations)
+        done_value += values[~refine].sum()
+        done_error += errors[~refine].sum()
+        a, b = a[refine], b[refine]
+        middle = (a + b) / 2
+        a, b = np.concatenate((a, middle)), np.concatenate((middle, b))
+
+
+def _parallel_sum(comm, f, xmin, xmax, n, rule, timer):
+    if comm is None or comm.Get_size() == 1:
+        with timer.phase('integrate', 'compute'):
+            total = integrate(f, xmin, xmax, n, rule)
+        timer.count('intervals', n)
+        return total
+    first, count = split_intervals(n, comm.Get_rank(), comm.Get_size())
+    with timer.phase('integrate', 'compute'):
+        local = integrate(f, xmin, xmax, n, rule, first, count)
+    timer.count('intervals', count)
+    with timer.phase('allreduce', 'communication'):
+        total = comm.allreduce(local)
+    timer.count('bytes reduced', 8)
+    return total
+
+
+def romberg(f, xmin, xmax, tol=1e-10, initial=1, max_levels=25, comm=None,
+            timer=NULL_TIMER):
+    """Romberg extrapolation of the composite trapezoid rule.
+
+    Level k uses initial*2^k intervals; the trapezoid sum is updated with the
+    midpoint sum of the previous grid, which is split over comm, so every
+    point is evaluated once.  Stops when two diagonal entries of the
+    Richardson table agree to tol.
+
+    Returns (integral, error estimate, number of evaluations of f); a single
+    level has no error estimate and returns inf.
+    """
+    n = initial
+    row = [_parallel_sum(comm, f, xmin, xmax, n, 'trapezoid', timer)]
+    evaluations = n + 1
+    error = math.inf
+    for level in range(1, max_levels):
+        midpoint = _parallel_sum(comm, f, xmin, xmax, n, 'midpoint', timer)
+        evaluations += n
+        n *= 2
+        new = [(row[0] + midpoint) / 2]
+        for j in range(1, level + 1):
+            factor = 4. ** j
+            new.append(new[j - 1] + (new[j - 1] - row[j - 1]) / (factor - 1))
+        error = abs(new[-1] - row[-1])
+        row = new
+        if error <= tol:
+            break
+    return row[-1], error, evaluations
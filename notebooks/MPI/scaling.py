@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Strong- and weak-scaling runs of the MPI scripts.
+
+    python scaling.py pimontecarlo --ranks 1 2 4 8 --modes strong weak
+                      [--size 4000000] [--repeat 3] [--output-dir scaling]
+
+Every script is launched with mpirun for each rank count.  In strong
+scaling the problem size stays the same; in weak scaling it grows with the
+number of ranks, so that every rank keeps the same share of the work (for
+the 2D stencil both sides grow by sqrt(ranks)).  The scripts time their
+setup, compute, communication and idle phases with timing.PhaseTimer and
+the root writes them to the file named by SCALING_OUTPUT, which is set
+here.  Of the repeated runs the fastest is kept.
+
+For P ranks and the time T(P) of the slowest rank:
+
+  strong  speedup T(1) / T(P), efficiency T(1) / (P T(P))
+  weak    speedup P T(1) / T(P) (scaled speedup), efficiency T(1) / T(P)
+
+The tables are written as CSV, every run as JSON, and with matplotlib the
+speedup, efficiency and time breakdown plots as PNG files.  On a single
+machine with fewer cores than ranks pass --oversubscribe (Open MPI).
+"""
+import argparse
+import csv
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+
+from timing import OUTPUT, PHASES
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODES = ('strong', 'weak')
+
+
+class Script:
+    """An MPI script and the options that set its problem size."""
+
+    def __init__(self, path, options, size, args=()):
+        self.path = os.path.join(HERE, path)
+        self.options = options
+        self.size = size
+        self.args = list(args)
+
+    def arguments(self, size):
+        args = list(self.args)
+        for option in self.options:
+            args += [option, str(size)]
+        return args
+
+
+SCRIPTS = {
+    'pimontecarlo': Script('Parallel_pimontecarlo.py', ['--samples'], 4000000),
+    'pi': Script('Parallel_Pi_montecarlo.py', ['--samples'], 4000000),
+    'pi_dynamic': Script('Parallel_Pi_montecarlo.py', ['--samples'], 4000000,
+                         ['--schedule', 'dynamic', '--chunk', '4']),
+    'integral': Script('Parallel_Integral_MonteCarlo.py', ['--samples'],
+                       4000000),
+    'trapeze': Script('Parallel_TrapezeMethod.py', ['--nbx'], 10000000),
+    'rectangle': Script('Parallel_RectangleMethod.py', ['--nbx'], 10000000),
+    'stencil': Script('Parallel_Stencil2D.py', ['--nx', '--ny'], 1001,
+                      ['--nt', '100']),
+}
+
+
+def problem_size(script, size, ranks, mode):
+    if mode == 'strong':
+        return size
+    return int(round(size * ranks ** (1 / len(script.options))))
+
+
+def launch(script, ranks, size, mpirun='mpirun', oversubscribe=False):
+    """Run script on ranks processes; return the timings of its root."""
+    command = shlex.split(mpirun) + ['-n', str(ranks)]
+    if oversubscribe:
+        command.append('--oversubscribe')
+    command += [sys.executable, script.path] + script.arguments(size)
+    fd, path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL,
+                       env=dict(os.environ, **{OUTPUT: path}))
+        with open(path) as f:
+            return json.load(f)
+    finally:
+        os.remove(path)
+
+
+def summary(run):
+    """Wall time of the slowest rank and mean and max time of each phase."""
+    ranks = run['ranks']
+    row = {'ranks': run['size'], 'time': max(r['wall'] for r in ranks)}
+    for phase in PHASES:
+        times = [r[phase] for r in ranks]
+        row[phase] = sum(times) / len(times)
+        row[phase + '_max'] = max(times)
+    return row
+
+
+def scale(script, ranks, mode, size, repeat=1, **options):
+    """Run the script over ranks; return (table rows, raw runs)."""
+    rows = []
+    runs = []
+    for p in ranks:
+        n = problem_size(script, size, p, mode)
+        best = None
+        for _ in range(repeat):
+            run = launch(script, p, n, **options)
+            runs.append(dict(run, mode=mode, problem_size=n))
+            row = summary(run)
+            if best is None or row['time'] < best['time']:
+                best = row
+        best['problem_size'] = n
+        rows.append(best)
+    reference = rows[0]['time'] * rows[0]['ranks']
+    for row in rows:
+        if mode == 'strong':
+            row['speedup'] = reference / row['time']
+        else:
+            row['speedup'] = row['ranks'] * reference / row['time']
+        row['efficiency'] = row['speedup'] / row['ranks']
+    return rows, runs
+
+
+COLUMNS = (['ranks', 'problem_size', 'time']
+           + [p for phase in PHASES for p in (phase, phase + '_max')]
+           + ['speedup', 'efficiency'])
+
+
+def write_table(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def print_table(name, mode, rows):
+    print("%s, %s scaling" % (name, mode))
+    print("%6s %12s %10s %10s %10s %10s %10s %8s %6s" % (
+        'ranks', 'size', 'time', 'setup', 'compute', 'comm', 'idle',
+        'speedup', 'eff'))
+    for row in rows:
+        print("%6d %12d %10.4f %10.4f %10.4f %10.4f %10.4f %8.2f %6.2f" % (
+            row['ranks'], row['problem_size'], row['time'], row['setup'],
+            row['compute'], row['communication'], row['idle'],
+            row['speedup'], row['efficiency']))
+
+
+def plot(name, tables, output_dir):
+    """Speedup, efficiency and phase breakdown plots; [] without matplotlib."""
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib is not installed, no plots written")
+        return []
+    paths = []
+    for metric, ideal in (('speedup', lambda p: p), ('efficiency', lambda p: 1)):
+        fig, ax = plt.subplots()
+        for mode, rows in tables.items():
+            ranks = [row['ranks'] for row in rows]
+            ax.plot(ranks, [row[metric] for row in rows], 'o-', label=mode)
+        ranks = sorted({row['ranks'] for rows in tables.values() for row in rows})
+        ax.plot(ranks, [ideal(p) for p in ranks], 'k--', label='ideal')
+        ax.set_xlabel('ranks')
+        ax.set_ylabel(metric)
+        ax.set_title('%s %s' % (name, metric))
+        ax.legend()
+        paths.append(os.path.join(output_dir, '%s_%s.png' % (name, metric)))
+        fig.savefig(paths[-1])
+        plt.close(fig)
+
+    fig, axes = plt.subplots(1, len(tables), squeeze=False,
+                             figsize=(6 * len(tables), 4))
+    for ax, (mode, rows) in zip(axes[0], tables.items()):
+        labels = [str(row['ranks']) for row in rows]
+        bottom = [0.] * len(rows)
+        for phase in PHASES:
+            heights = [row[phase] for row in rows]
+            ax.bar(labels, heights, bottom=bottom, label=phase)
+            bottom = [b + h for b, h in zip(bottom, heights)]
+        ax.set_xlabel('ranks')
+        ax.set_ylabel('mean time per rank (s)')
+        ax.set_title('%s, %s scaling' % (name, mode))
+        ax.legend()
+    paths.append(os.path.join(output_dir, '%s_breakdown.png' % name))
+    fig.savefig(paths[-1])
+    plt.close(fig)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('scripts', nargs='+', choices=sorted(SCRIPTS))
+    parser.add_argument('--ranks', nargs='+', type=int, default=[1, 2, 4])
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--size', type=int, default=None,
+                        help='problem size on one rank (default per script)')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--mpirun', default='mpirun')
+    parser.add_argument('--oversubscribe', action='store_true')
+    parser.add_argument('--output-dir', default='scaling')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for name in args.scripts:
+        script = SCRIPTS[name]
+        tables = {}
+        runs = []
+        for mode in args.modes:
+            rows, mode_runs = scale(script, args.ranks, mode,
+                                    args.size or script.size, args.repeat,
+                                    mpirun=args.mpirun,
+                                    oversubscribe=args.oversubscribe)
+            tables[mode] = rows
+            runs += mode_runs
+            print_table(name, mode, rows)
+            write_table(os.path.join(args.output_dir,
+                                     '%s_%s.csv' % (name, mode)), rows)
+        with open(os.path.join(args.output_dir, name + '.json'), 'w') as f:
+            json.dump({'script': os.path.basename(script.path),
+                       'tables': tables, 'runs': runs}, f, indent=1)
+        plot(name, tables, args.output_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Static and dynamic distribution of global work blocks over MPI ranks.
+
+With the static schedule every rank takes the blocks rank, rank+size, ...
+With the dynamic schedule rank 0 acts as a master: it hands out chunks of
+consecutive blocks to the workers as they ask for them, so faster ranks end
+up computing more blocks.  Both schedules return, on each rank, the list of
+(block, result) pairs computed locally; gather_results collects them on the
+root in block order, so the accumulated result does not depend on which rank
+computed which block.
+
+Given a timing.PhaseTimer, the blocks are timed as compute, the requests and
+the gather as communication, and the blocks, messages and bytes counted.
+"""
+import numpy as np
+from mpi4py import MPI
+
+from montecarlo import rank_blocks
+from timing import NULL_TIMER
+
+MASTER = 0
+TAG_REQUEST = 1
+TAG_WORK = 2
+
+
+def static_map(comm, nblocks, kernel, timer=NULL_TIMER):
+    rank = comm.Get_rank()
+    size = comm.Get_size()
+    with timer.phase('blocks', 'compute'):
+        results = [(block, kernel(block))
+                   for block in rank_blocks(nblocks, rank, size)]
+    timer.count('blocks', len(results))
+    return results
+
+
+def _serve(comm, nblocks, chunk, timer):
+    """Master loop: answer work requests until every worker got a stop."""
+    status = MPI.Status()
+    request = np.empty(1, dtype='i8')
+    work = np.empty(2, dtype='i8')
+    next_block = 0
+    workers = comm.Get_size() - 1
+    messages = 0
+    with timer.phase('serve', 'communication'):
+        while workers > 0:
+            comm.Recv(request, source=MPI.ANY_SOURCE, tag=TAG_REQUEST,
+                      status=status)
+            start = min(next_block, nblocks)
+            stop = min(start + chunk, nblocks)
+            next_block = stop
+            work[0] = start
+            work[1] = stop
+            comm.Send(work, dest=status.Get_source(), tag=TAG_WORK)
+            messages += 1
+            if start == stop:
+                workers -= 1
+    # every rank counts the messages it sends
+    timer.count('messages', messages)
+    timer.count('bytes sent', messages * work.nbytes)
+
+
+def _work(comm, kernel, timer):
+    """Worker loop: ask the master for chunks until an empty one comes back."""
+    request = np.zeros(1, dtype='i8')
+    work = np.empty(2, dtype='i8')
+    results = []
+    while True:
+        with timer.phase('request', 'communication'):
+            comm.Send(request, dest=MASTER, tag=TAG_REQUEST)
+            comm.Recv(work, source=MASTER, tag=TAG_WORK)
+        timer.count('messages')
+        timer.count('bytes sent', request.nbytes)
+        start, stop = int(work[0]), int(work[1])
+        if start == stop:
+            return results
+        with timer.phase('blocks', 'compute'):
+            for block in range(start, stop):
+                results.append((block, kernel(block)))
+        timer.count('blocks', stop - start)
+        request[0] = stop - start
+
+
+def dynamic_map(comm, nblocks, kernel, chunk=1, timer=NULL_TIMER):
+    """Compute kernel(block) for all blocks, handed out on request by rank 0.
+
+    Rank 0 only serves requests and returns an empty list.  On a single rank
+    there is nobody to serve and the blocks are computed locally.
+    """
+    if comm.Get_size() == 1:
+        return static_map(comm, nblocks, kernel, timer)
+    if comm.Get_rank() == MASTER:
+        _serve(comm, nblocks, chunk, timer)
+        return []
+    return _work(comm, kernel, timer)
+
+
+def map_blocks(comm, nblocks, kernel, schedule='static', chunk=1,
+               timer=NULL_TIMER):
+    if schedule == 'static':
+        return static_map(comm, nblocks, kernel, timer)
+    if schedule == 'dynamic':
+        return dynamic_map(comm, nblocks, kernel, chunk, timer)
+    raise ValueError("unknown schedule %r" % schedule)
+
+
+def gather_results(comm, results, root=0, timer=NULL_TIMER):
+    """Return the block results of all ranks on root, in block order.
+
+    The results are numbers or NumPy arrays of one shape.  The ranks first
+    share how many they have and of which type, then send the block numbers
+    and the results as NumPy buffers with Gatherv.
+    """
+    blocks = np.array([block for block, _ in results], dtype=np.int64)
+    values = np.array([value for _, value in results])
+    with timer.phase('gather', 'communication'):
+        layouts = comm.allgather((len(results), values.dtype.str,
+                                  values.shape[1:]))
+        counts = [count for count, _, _ in layouts]
+        dtype, shape = next(((dtype, shape) for count, dtype, shape in layouts
+                             if count), ('f8', ()))
+        if not results:
+            values = np.empty((0,) + shape, dtype)
+        size = int(np.prod(shape))
+        if comm.Get_rank() == root:
+            all_blocks = np.empty(sum(counts), dtype=np.int64)
+            all_values = np.empty((sum(counts),) + shape, dtype)
+            comm.Gatherv(blocks, [all_blocks, counts], root=root)
+            comm.Gatherv(values, [all_values, [c * size for c in counts]],
+                         root=root)
+        else:
+            comm.Gatherv(blocks, None, root=root)
+            comm.Gatherv(values, None, root=root)
+    timer.count('bytes gathered', blocks.nbytes + values.nbytes)
+    if comm.Get_rank() != root:
+        return None
+    return list(all_values[np.argsort(all_blocks, kind='stable')])
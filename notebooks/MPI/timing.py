@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+The phase timers live in the kernels package (kernels/timing.py); this
+module keeps `from timing import ...` working for the MPI scripts.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from kernels.timing import *  # noqa: E402,F401,F403
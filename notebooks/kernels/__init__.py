@@ -0,0 +1,63 @@
+"""
+Numerical kernels of the notebooks as an importable package.
+
+stencil holds the engine generating every backend of an explicit stencil
+update from one description, equations the notebook PDEs described with it,
+ensemble their 1D solvers advancing a batch of independent members at once.
+multigrid solves the Poisson problem to a residual tolerance, spectral solves
+it exactly with sine and cosine transforms.  cavity runs the lid-driven
+cavity flow with the stencil engine, and driver stops any of them at a
+steady state; checkpoint saves their state to memory-mapped files and
+restarts them from it, snapshots streams it to a compressed store rendered
+offline.  adaptive integrates the nonlinear solvers to a final time with
+the largest stable time steps.  montecarlo is the block-streamed Monte
+Carlo engine of the MPI scripts.  threads sets the number of threads of
+the multithreaded backends and allocates arrays by first touch.
+decomp runs the 2D equations on an MPI Cartesian domain decomposition.
+
+Importing the package imports none of its modules: every name below is
+loaded from its module on first access, and backends (numba, pyccel, scipy,
+mpi4py) are only imported by the modules and kernels that use them.  Run
+`python -m kernels.build` once to compile the numba and pyccel kernels
+ahead of time into their on-disk caches.
+"""
+import importlib
+
+_EXPORTS = {
+    'adaptive': ('solve_1d_burger_adaptive', 'solve_1d_nonlinearconv_adaptive',
+                 'solve_2d_burger_adaptive', 'solve_2d_nonlinearconv_adaptive'),
+    'cavity': ('CavityFlow', 'cavity_flow'),
+    'checkpoint': ('Checkpoint',),
+    'driver': ('march', 'steady_state'),
+    'ensemble': ('solve_1d_burger_batch', 'solve_1d_diff_batch',
+                 'solve_1d_linearconv_batch', 'solve_1d_nonlinearconv_batch'),
+    'equations': ('solve_1d_burger', 'solve_1d_diff', 'solve_1d_linearconv',
+                  'solve_1d_nonlinearconv', 'solve_2d_burger', 'solve_2d_diff',
+                  'solve_2d_linearconv', 'solve_2d_nonlinearconv',
+                  'solve_2d_poisson'),
+    'montecarlo': ('circle_points_kernel', 'compute_circle_points'),
+    'multigrid': ('solve_2d_poisson_multigrid',),
+    'snapshots': ('SnapshotStore', 'SnapshotWriter'),
+    'spectral': ('solve_2d_poisson_spectral', 'spectral_poisson'),
+    'stencil': ('BACKENDS', 'Equation', 'compile_equation'),
+    'threads': ('get_threads', 'set_threads'),
+}
+_MODULES = {name: module for module, names in _EXPORTS.items()
+            for name in names}
+
+__all__ = sorted(_MODULES)
+
+
+def __getattr__(name):
+    try:
+        module = _MODULES[name]
+    except KeyError:
+        raise AttributeError("module %r has no attribute %r"
+                             % (__name__, name)) from None
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,112 @@
+"""
+Adaptive CFL time stepping of the nonlinear convection and Burgers solvers.
+
+1D_LinearConvectionCFL.ipynb picks dt = CFL*dx/|c| once, which is enough
+for a constant speed c.  For the nonlinear equations the speed is the
+solution itself, so the stable step changes as it evolves.  Here every step
+uses the largest step allowed by the current maximum speed m = max(|u|, |v|)
+and viscosity nu,
+
+    dt = cfl / (m * (1/dx + 1/dy) + 2 * nu * (1/dx**2 + 1/dy**2))
+
+(the 1/dy terms dropped in 1D), which keeps the upwind and centred
+coefficients of the explicit updates positive for cfl <= 1.  The kernels
+are compiled with speed=True and return the maximum of |u| and |v| they
+wrote on the interior, computed in the update loop itself, so choosing the
+next step costs no extra pass over the arrays.  Cells outside the interior
+only change through the boundary conditions; their contribution is taken
+once at the start.
+
+The run integrates to a final time t_final: the last step is shortened to
+land on it exactly, or lengthened by at most a relative ROUNDOFF when only
+the rounding errors of the sum of the steps are left.
+"""
+import numpy as np
+
+from .equations import (BURGER_1D, BURGER_2D, NONLINEARCONV_1D,
+                        NONLINEARCONV_2D, hat)
+from .stencil import compile_equation
+
+CFL = .9
+ROUNDOFF = 1e-12
+
+# the equations integrated with speed=True kernels
+EQUATIONS = (NONLINEARCONV_1D, BURGER_1D, NONLINEARCONV_2D, BURGER_2D)
+
+
+def stable_dt(speed, dx, dy=None, nu=0., cfl=CFL):
+    rate = speed / dx + 2 * nu / dx**2
+    if dy is not None:
+        rate += speed / dy + 2 * nu / dy**2
+    return cfl / rate if rate > 0. else np.inf
+
+
+def _edge_speed(eq, arrays):
+    """Largest |value| the interior updates never write."""
+    interior = tuple(slice(lower, n - upper) for lower, upper, n
+                     in zip(eq.lower, eq.upper, arrays[0].shape))
+    speed = 0.
+    for a in arrays:
+        edges = np.abs(a)
+        edges[interior] = 0.
+        speed = max(speed, edges.max())
+    for conditions in eq.bcs.values():
+        for condition in conditions.values():
+            if condition != 'neumann':
+                speed = max(speed, abs(condition))
+    return speed
+
+
+def advance_to(eq, arrays, t_final, dx, dy=None, nu=0., cfl=CFL,
+               backend='numpy', params=()):
+    """Integrate eq on arrays (in the order of eq.arrays) up to t_final.
+
+    params are the parameters of eq after dt, in order.  Returns the number
+    of steps taken and the array of the time steps used.
+    """
+    kernel = compile_equation(eq, backend, 'copy', speed=True)
+    fields = [arrays[2 * k] for k in range(len(eq.fields))]
+    edge = _edge_speed(eq, fields)
+    speed = max(edge, max(np.abs(a).max() for a in fields))
+    steps = []
+    t = 0.
+    while t < t_final:
+        dt = stable_dt(speed, dx, dy, nu, cfl)
+        # the step reaching t_final up to the roundoff accumulated in t lands
+        # on it, instead of leaving a last step of a few ulps
+        if dt >= (t_final - t) * (1 - ROUNDOFF):
+            dt = t_final - t
+            t = t_final
+        else:
+            t += dt
+        speed = max(edge, kernel(*arrays, 1, dt, *params))
+        steps.append(dt)
+    return len(steps), np.array(steps)
+
+
+def solve_1d_nonlinearconv_adaptive(u, un, t_final, nx, dx, cfl=CFL,
+                                    backend='numpy'):
+    return advance_to(NONLINEARCONV_1D, (u, un), t_final, dx, cfl=cfl,
+                      backend=backend, params=(dx,))
+
+
+def solve_1d_burger_adaptive(u, un, t_final, nx, dx, nu, cfl=CFL,
+                             backend='numpy'):
+    return advance_to(BURGER_1D, (u, un), t_final, dx, nu=nu, cfl=cfl,
+                      backend=backend, params=(dx, nu))
+
+
+def solve_2d_nonlinearconv_adaptive(u, un, v, vn, t_final, dx, dy, cfl=CFL,
+                                    backend='numpy'):
+    hat(u, dx, dy)
+    hat(v, dx, dy)
+    return advance_to(NONLINEARCONV_2D, (u, un, v, vn), t_final, dx, dy,
+                      cfl=cfl, backend=backend, params=(dx, dy))
+
+
+def solve_2d_burger_adaptive(u, un, v, vn, t_final, dx, dy, nu, cfl=CFL,
+                             backend='numpy'):
+    hat(u, dx, dy)
+    hat(v, dx, dy)
+    return advance_to(BURGER_2D, (u, un, v, vn), t_final, dx, dy, nu, cfl,
+                      backend, params=(dx, dy, nu))
@@ -0,0 +1,301 @@
+"""
+Benchmark suite of the solvers over backends and grid sizes.
+
+    python -m kernels.bench [--cases ...] [--backends ...] [--repeat 5]
+                            [--output results.json]
+                            [--baseline baseline.json --threshold .1]
+
+The %timeit cells of the notebooks time solvers that update their inputs in
+place, so every repetition starts from the state the previous one left.
+Here every repetition gets freshly built inputs, and three costs are
+measured separately for each (case, backend, size):
+
+  compile  generating and compiling the kernels (pyccel builds, codegen)
+           and any per-grid setup such as a multigrid hierarchy
+  warmup   the first call, which includes the numba JIT or cache load
+  times    the following calls, on fresh inputs, with the GC disabled
+
+Results are written as JSON with a description of the machine.  Given a
+baseline file from an earlier run, every result slower than the baseline
+median by more than threshold is reported as a regression and the exit
+status is 1.
+"""
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from . import cavity, ensemble, equations
+from .stencil import BACKENDS, PARALLEL, compile_batch, compile_equation
+
+# the python backend is only run up to this many cell updates per call
+PYTHON_LIMIT = 2e5
+SIZES = {1: (1000, 10000, 100000), 2: (64, 128, 256)}
+# members of the ensemble cases
+BATCH = 64
+
+
+class Case:
+    """One solver: its fresh inputs, the call and the one-time preparation.
+
+    updates is the number of updates of every cell in one call, used for
+    the cells/s rate (nt by default); the python backend is skipped when
+    n**ndim * nt exceeds python_limit.
+    """
+
+    def __init__(self, name, ndim, nt, inputs, run, prepare,
+                 backends=BACKENDS, updates=None, python_limit=PYTHON_LIMIT):
+        self.name = name
+        self.ndim = ndim
+        self.nt = nt
+        self.inputs = inputs
+        self.run = run
+        self.prepare = prepare
+        self.backends = backends
+        self.updates = nt if updates is None else updates
+        self.python_limit = python_limit
+
+
+def _compile(*eqs):
+    return lambda backend, n: [compile_equation(eq, backend) for eq in eqs]
+
+
+def _line(n):
+    dx = 2 / (n - 1)
+    u = np.ones(n)
+    u[int(.5 / dx):int(1 / dx + 1)] = 2
+    return u, np.ones(n), dx
+
+
+def _grid(n):
+    return np.ones((n, n)), np.ones((n, n)), 2 / (n - 1)
+
+
+def _batch(n):
+    u, un, dx = _line(n)
+    return np.tile(u, (BATCH, 1)), np.ones((BATCH, n)), dx
+
+
+def _poisson_inputs(n):
+    return np.zeros((n, n)), np.zeros((n, n)), np.zeros((n, n)), 2 / (n - 1)
+
+
+def _cavity_prepare(backend, n):
+    for eq, monitor in ((cavity.VELOCITY, True), (cavity.SOURCE, False),
+                        (cavity.PRESSURE, True)):
+        compile_equation(eq, backend, 'copy', monitor)
+
+
+def _cavity_run(args, backend, nt):
+    u, v, p, dx = args
+    n = len(u)
+    cavity.cavity_flow(nt, u, v, .001, n, n, dx, dx, p, 1., .1,
+                       backend=backend)
+
+
+def _multigrid_prepare(backend, n):
+    from .multigrid import multigrid
+    dx = 2 / (n - 1)
+    multigrid((n, n), dx, dx)
+
+
+def _multigrid_run(args, backend, nt):
+    from .multigrid import solve_2d_poisson_multigrid
+    p, pd, b, dx = args
+    n = len(p)
+    solve_2d_poisson_multigrid(p, pd, b, n, n, nt, dx, dx)
+
+
+def _spectral_prepare(backend, n):
+    from .spectral import spectral_poisson
+    dx = 2 / (n - 1)
+    spectral_poisson((n, n), dx, dx)
+
+
+def _spectral_run(args, backend, nt):
+    from .spectral import solve_2d_poisson_spectral
+    p, pd, b, dx = args
+    n = len(p)
+    solve_2d_poisson_spectral(p, pd, b, n, n, nt, dx, dx)
+
+
+CASES = [
+    Case('linearconv_1d', 1, 100, _line,
+         lambda a, backend, nt: equations.solve_1d_linearconv(
+             a[0], a[1], nt, len(a[0]), .2 * a[2], a[2], 1., backend),
+         _compile(equations.LINEARCONV_1D)),
+    Case('nonlinearconv_1d', 1, 100, _line,
+         lambda a, backend, nt: equations.solve_1d_nonlinearconv(
+             a[0], a[1], nt, len(a[0]), .2 * a[2], a[2], backend),
+         _compile(equations.NONLINEARCONV_1D)),
+    Case('diff_1d', 1, 100, _line,
+         lambda a, backend, nt: equations.solve_1d_diff(
+             a[0], a[1], nt, len(a[0]), .2 * a[2]**2 / .3, a[2], .3, backend),
+         _compile(equations.DIFF_1D)),
+    Case('burger_1d', 1, 100, _line,
+         lambda a, backend, nt: equations.solve_1d_burger(
+             a[0], a[1], nt, len(a[0]), .1 * a[2]**2 / .07, a[2], .07,
+             backend),
+         _compile(equations.BURGER_1D)),
+    Case('linearconv_2d', 2, 20, _grid,
+         lambda a, backend, nt: equations.solve_2d_linearconv(
+             a[0], a[1], nt, .2 * a[2], a[2], a[2], 1., backend),
+         _compile(equations.LINEARCONV_2D)),
+    Case('nonlinearconv_2d', 2, 20,
+         lambda n: _grid(n) + _grid(n)[:2],
+         lambda a, backend, nt: equations.solve_2d_nonlinearconv(
+             a[0], a[1], a[3], a[4], nt, .2 * a[2], a[2], a[2], 1., backend),
+         _compile(equations.NONLINEARCONV_2D)),
+    Case('diff_2d', 2, 20, _grid,
+         lambda a, backend, nt: equations.solve_2d_diff(
+             a[0], a[1], nt, .25 * a[2]**2 / .05, a[2], a[2], .05, backend),
+         _compile(equations.DIFF_2D)),
+    Case('burger_2d', 2, 20,
+         lambda n: _grid(n) + _grid(n)[:2],
+         lambda a, backend, nt: equations.solve_2d_burger(
+             a[0], a[1], a[3], a[4], nt, .0009 * a[2]**2 / .01, a[2], a[2],
+             .01, backend),
+         _compile(equations.BURGER_2D)),
+    Case('poisson_2d', 2, 20, _poisson_inputs,
+         lambda a, backend, nt: equations.solve_2d_poisson(
+             a[0], a[1], a[2], len(a[0]), len(a[0]), nt, a[3], a[3], backend),
+         _compile(equations.POISSON_2D)),
+    Case('cavity_flow', 2, 20,
+         lambda n: (np.zeros((n, n)), np.zeros((n, n)), np.zeros((n, n)),
+                    2 / (n - 1)),
+         _cavity_run, _cavity_prepare, python_limit=PYTHON_LIMIT / 50),
+    Case('linearconv_1d_batch', 1, 100, _batch,
+         lambda a, backend, nt: ensemble.solve_1d_linearconv_batch(
+             a[0], a[1], nt, a[0].shape[1], .2 * a[2], a[2],
+             np.linspace(.5, 1., BATCH), backend),
+         lambda backend, n: compile_batch(equations.LINEARCONV_1D, backend),
+         updates=100 * BATCH, python_limit=PYTHON_LIMIT / BATCH),
+    Case('burger_1d_batch', 1, 100, _batch,
+         lambda a, backend, nt: ensemble.solve_1d_burger_batch(
+             a[0], a[1], nt, a[0].shape[1], .1 * a[2]**2 / .07, a[2],
+             np.linspace(.05, .07, BATCH), backend),
+         lambda backend, n: compile_batch(equations.BURGER_1D, backend),
+         updates=100 * BATCH, python_limit=PYTHON_LIMIT / BATCH),
+    Case('poisson_multigrid', 2, 100, _poisson_inputs, _multigrid_run,
+         _multigrid_prepare, backends=('numpy',), updates=1),
+    Case('poisson_spectral', 2, 1, _poisson_inputs, _spectral_run,
+         _spectral_prepare, backends=('numpy',), updates=1),
+]
+
+
+def available(backend):
+    backend = PARALLEL.get(backend, (backend,))[0]
+    if backend in ('numba', 'pyccel'):
+        return importlib.util.find_spec(backend) is not None
+    return True
+
+
+def machine():
+    return {'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpus': os.cpu_count(),
+            'python': platform.python_version(),
+            'numpy': np.__version__}
+
+
+def measure(case, backend, n, repeat):
+    start = time.perf_counter()
+    case.prepare(backend, n)
+    compile_time = time.perf_counter() - start
+
+    args = case.inputs(n)
+    start = time.perf_counter()
+    case.run(args, backend, case.nt)
+    warmup = time.perf_counter() - start
+
+    times = []
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            args = case.inputs(n)
+            start = time.perf_counter()
+            case.run(args, backend, case.nt)
+            times.append(time.perf_counter() - start)
+    finally:
+        if enabled:
+            gc.enable()
+    median = statistics.median(times)
+    return {'case': case.name, 'backend': backend, 'n': n, 'nt': case.nt,
+            'compile_s': compile_time, 'warmup_s': warmup, 'times_s': times,
+            'median_s': median, 'min_s': min(times),
+            'cells_per_s': n**case.ndim * case.updates / median}
+
+
+def run(cases, backends, sizes, repeat):
+    results = []
+    for case in cases:
+        for backend in backends:
+            if backend not in case.backends or not available(backend):
+                continue
+            for n in sizes[case.ndim]:
+                if (backend == 'python'
+                        and n**case.ndim * case.nt > case.python_limit):
+                    continue
+                result = measure(case, backend, n, repeat)
+                print("%-18s %-7s n=%-7d compile %8.4f s  warmup %8.4f s  "
+                      "median %9.6f s  %.3e cells/s"
+                      % (case.name, backend, n, result['compile_s'],
+                         result['warmup_s'], result['median_s'],
+                         result['cells_per_s']))
+                results.append(result)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return the results slower than their baseline by more than threshold."""
+    reference = {(r['case'], r['backend'], r['n']): r['median_s']
+                 for r in baseline['results']}
+    regressions = []
+    for result in results:
+        key = (result['case'], result['backend'], result['n'])
+        if key in reference and result['median_s'] > reference[key] * (1 + threshold):
+            regressions.append((key, reference[key], result['median_s']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--cases', nargs='+', choices=[c.name for c in CASES],
+                        default=[c.name for c in CASES])
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS,
+                        default=list(BACKENDS))
+    parser.add_argument('--sizes-1d', nargs='+', type=int, default=SIZES[1])
+    parser.add_argument('--sizes-2d', nargs='+', type=int, default=SIZES[2])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--threshold', type=float, default=.1)
+    args = parser.parse_args(argv)
+
+    cases = [c for c in CASES if c.name in args.cases]
+    sizes = {1: args.sizes_1d, 2: args.sizes_2d}
+    results = run(cases, args.backends, sizes, args.repeat)
+    report = {'machine': machine(), 'repeat': args.repeat, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for (name, backend, n), before, after in regressions:
+            print("REGRESSION %s %s n=%d: %.6f s -> %.6f s (%+.0f%%)"
+                  % (name, backend, n, before, after, 100 * (after / before - 1)))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Ahead-of-time build of the compiled kernels.
+
+    python -m kernels.build [--backend numba pyccel]
+
+compiles every kernel variant the package uses, so that later processes
+only load them: numba kernels are called once on small arrays, which stores
+their machine code in the cache=True cache next to the generated source,
+and pyccel kernels are built into the extension cache of compile_cache.
+Without --backend every backend whose compiler is installed is built and
+the others are skipped.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from . import adaptive, bench, cavity, ensemble, equations
+from .stencil import PARALLEL, compile_batch, compile_equation
+
+AOT_BACKENDS = ('numba', 'pyccel', 'numba_parallel', 'pyccel_openmp')
+
+
+def variants():
+    """Yield (equation, mode, monitor, speed) of every kernel of the package."""
+    for eq in equations.EQUATIONS:
+        yield eq, 'pingpong', False, False
+        yield eq, 'pingpong', True, False
+    for eq in adaptive.EQUATIONS:
+        yield eq, 'copy', False, True
+    yield cavity.VELOCITY, 'copy', True, False
+    yield cavity.SOURCE, 'copy', False, False
+    yield cavity.PRESSURE, 'copy', True, False
+
+
+def build(backend, eq, mode, monitor, speed):
+    kernel = compile_equation(eq, backend, mode, monitor, speed)
+    if backend in ('numba', 'numba_parallel'):
+        arrays = [np.zeros((4,) * eq.ndim) for _ in eq.arrays]
+        kernel(*arrays, 0, *[1.] * len(eq.params))
+    return kernel
+
+
+def build_batch(backend, eq):
+    kernel = compile_batch(eq, backend)
+    if backend == 'numba':
+        arrays = [np.zeros((2, 4)) for _ in eq.arrays]
+        kernel(*arrays, 0, *[np.ones(2)] * len(eq.params))
+    return kernel
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--backend', nargs='+', choices=AOT_BACKENDS)
+    args = parser.parse_args(argv)
+    backends = args.backend
+    if backends is None:
+        backends = []
+        for backend in AOT_BACKENDS:
+            if bench.available(backend):
+                backends.append(backend)
+            else:
+                print("%s is not installed, %s skipped"
+                      % (PARALLEL.get(backend, (backend,))[0], backend))
+    for backend in backends:
+        for eq, mode, monitor, speed in variants():
+            start = time.perf_counter()
+            build(backend, eq, mode, monitor, speed)
+            print("%-7s %-20s %-9s%s%s %.3f s" % (
+                backend, eq.name, mode, ' monitor' if monitor else '',
+                ' speed' if speed else '', time.perf_counter() - start))
+        if backend in PARALLEL:
+            # the batch kernels of the serial backend are already parallel
+            continue
+        for eq in ensemble.EQUATIONS:
+            start = time.perf_counter()
+            build_batch(backend, eq)
+            print("%-7s %-20s batch     %.3f s" % (
+                backend, eq.name, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Lid-driven cavity flow of 2D_NavierStokes.ipynb on the stencil engine.
+
+The three stages of cavity_flow_pure are stencil Equations, so every
+backend of stencil.BACKENDS is available and each stage compiles once:
+
+  VELOCITY  the momentum update of u and v from un, vn and p
+  SOURCE    the right-hand side b of the pressure equation
+  PRESSURE  one Jacobi sweep of the pressure equation
+
+The expressions are those of the notebook.  SOURCE has no previous level;
+its bn array is only scratch for the generated copy.
+
+CavityFlow allocates every work array once, by first touch on the threads
+of a parallel backend (threads.zeros).  Instead of the fixed nit = 50
+sweeps per step, the pressure iteration starts from the pressure of the
+previous step and stops as soon as a sweep changes p by less than tol
+relative to max|p|, checking every check_every sweeps.  The time loop is
+run by driver.march and stops early when a step changes the velocity by
+less than steady_tol.  Both changes are computed inside the kernels.
+Given a checkpoint.Checkpoint, the run restarts from its snapshot of u, v,
+p and b and saves them every checkpoint.every steps; a
+snapshots.SnapshotWriter records them every snapshots.every steps.
+"""
+import numpy as np
+
+from . import threads
+from .driver import march, march_observed
+from .stencil import PARALLEL, Equation, compile_equation
+
+VELOCITY = Equation(
+    'cavity_velocity', 2, ['u', 'v'],
+    {'u': 'un[i,j]-un[i,j]*dt*(un[i,j]-un[i,j-1])/dx'
+          '-vn[i,j]*dt*(un[i,j]-un[i,j-1])/dy'
+          '-dt*(p[i+1,j]-p[i-1,j])/(rho*2*dx)'
+          '+nu*(dt*(un[i+1,j]-2*un[i,j]+un[i-1,j])/dx**2'
+          '+dt*(un[i,j+1]-2*un[i,j]+un[i,j-1])/dy**2)',
+     'v': 'vn[i,j]-un[i,j]*dt*(vn[i,j]-vn[i,j-1])/dx'
+          '-vn[i,j]*dt*(vn[i,j]-vn[i,j-1])/dy'
+          '-dt*(p[i,j+1]-p[i,j-1])/(rho*2*dx)'
+          '+nu*(dt*(vn[i+1,j]-2*vn[i,j]+vn[i-1,j])/dx**2'
+          '+dt*(vn[i,j+1]-2*vn[i,j]+vn[i,j-1])/dy**2)'},
+    params=['dt', 'dx', 'dy', 'rho', 'nu'], aux=['p'])
+
+SOURCE = Equation(
+    'cavity_source', 2, ['b'],
+    {'b': 'rho*(dx*dy)**2*(((u[i+1,j]-u[i-1,j])/(2*dx)'
+          '+(v[i,j+1]-v[i,j-1])/(2*dy))/dt'
+          '-(u[i+1,j]-u[i-1,j])**2/(4*dx*dx)'
+          '-2*(u[i,j+1]-u[i,j-1])*(v[i+1,j]-v[i-1,j])/(4*dy*dx)'
+          '-(v[i,j+1]-v[i,j-1])**2/(4*dy*dy))/(2*(dx**2+dy**2))'},
+    params=['rho', 'dt', 'dx', 'dy'], aux=['u', 'v'])
+
+PRESSURE = Equation(
+    'cavity_pressure', 2, ['p'],
+    {'p': '((pn[i+1,j]+pn[i-1,j])*dy**2+(pn[i,j+1]+pn[i,j-1])*dy**2)'
+          '/(2*(dx**2+dy**2))-b[i,j]'},
+    params=['dx', 'dy'], aux=['b'],
+    bcs={'p': {(0, 0): 'neumann', (0, -1): 'neumann',
+               (1, 0): 'neumann', (1, -1): 0.}})
+
+
+class CavityFlow:
+    """State and preallocated work arrays of one cavity-flow run.
+
+    u, v and p are updated in place.  With tol=0 every step runs exactly nit
+    pressure sweeps; nit=1, tol=0 is the run of cavity_flow_pure, whose
+    pressure_poisson_pure does a single sweep per step.
+    """
+
+    def __init__(self, u, v, p, dt, dx, dy, rho, nu, nit=50, tol=1e-4,
+                 check_every=2, backend='numpy'):
+        self.u, self.v, self.p = u, v, p
+        if backend in PARALLEL:
+            # written first by the threads that update them
+            self.un, self.vn, self.pn, self.b, self.bn = (
+                threads.zeros(p.shape) for _ in range(5))
+        else:
+            self.un = np.empty_like(u)
+            self.vn = np.empty_like(v)
+            self.pn = np.empty_like(p)
+            self.b = np.zeros_like(p)
+            self.bn = np.empty_like(p)
+        self.dt, self.dx, self.dy, self.rho, self.nu = dt, dx, dy, rho, nu
+        self.nit = nit
+        self.tol = tol
+        self.check_every = check_every
+        # whole Jacobi sweeps are run in copy mode so that pn holds the
+        # previous sweep for the convergence check
+        self._velocity = compile_equation(VELOCITY, backend, 'copy',
+                                          monitor=True)
+        self._source = compile_equation(SOURCE, backend, 'copy')
+        self._pressure = compile_equation(PRESSURE, backend, 'copy',
+                                          monitor=True)
+        self.steps = 0
+        self.sweeps = 0
+
+    def pressure(self):
+        """Iterate on p until converged or nit sweeps; return the sweeps run."""
+        done = 0
+        while done < self.nit:
+            sweeps = min(self.check_every, self.nit - done)
+            change = self._pressure(self.p, self.pn, self.b, sweeps,
+                                    self.dx, self.dy)
+            done += sweeps
+            if self.tol and change <= self.tol * np.abs(self.p).max():
+                break
+        self.sweeps += done
+        return done
+
+    def step(self):
+        """Advance one time step; return the largest change of u or v."""
+        change = self._velocity(self.u, self.un, self.v, self.vn, self.p, 1,
+                                self.dt, self.dx, self.dy, self.rho, self.nu)
+        self._source(self.b, self.bn, self.u, self.v, 1,
+                     self.rho, self.dt, self.dx, self.dy)
+        self.pressure()
+        self.steps += 1
+        return change
+
+    def advance(self, n):
+        for _ in range(n):
+            change = self.step()
+        return change
+
+    def run(self, nt, steady_tol=0., check_every=1, checkpoint=None,
+            snapshots=None):
+        """Run up to nt steps, stopping once a step changes the velocity by
+        at most steady_tol; return the (steps, history) of driver.march.
+
+        With a checkpoint, nt counts the steps done before the restart.
+        """
+        if checkpoint is None and snapshots is None:
+            return march(self.advance, nt, steady_tol, check_every)
+        state = {'u': self.u, 'v': self.v, 'p': self.p, 'b': self.b}
+        return march_observed(self.advance, nt, state, steady_tol,
+                              check_every, checkpoint, snapshots)
+
+
+def cavity_flow(nt, u, v, dt, nx, ny, dx, dy, p, rho, nu, nit=50, tol=1e-4,
+                steady_tol=0., backend='numpy', checkpoint=None,
+                snapshots=None):
+    """cavity_flow_pure with convergence-controlled pressure and early stop.
+
+    Keeps the notebook signature and return value.
+    """
+    # the initial condition at y=2
+    u[:, -1] = 1
+    CavityFlow(u, v, p, dt, dx, dy, rho, nu, nit, tol,
+               backend=backend).run(nt, steady_tol, checkpoint=checkpoint,
+                                    snapshots=snapshots)
+    return u, v, p
@@ -0,0 +1,207 @@
+"""
+Checkpoint and restart of the time-marching solvers.
+
+A Checkpoint keeps the state of a run (its named arrays and the number of
+steps done) in a directory of memory-mapped .npy files, in two slots used
+alternately:
+
+    directory/state.json            the step held by each committed slot
+    directory/slot0/<name>.npy
+    directory/slot1/<name>.npy
+
+save copies the arrays into the slot not holding the last committed
+snapshot, which is a memory copy into the page cache, and hands the slot to
+a writer thread.  The thread flushes the memory maps to disk and only then
+rewrites state.json (atomically, with os.replace) to commit the slot, so the
+solver goes on while the data is written, and a run killed at any point
+leaves the previous snapshot intact.  A save only waits when the previous
+one is still being flushed.
+
+Given an MPI communicator every rank keeps its own store in
+directory/rank<k>, and the ranks write in parallel.  On restart they agree
+on the latest step committed by all of them; a barrier before every save
+makes sure that step is still on disk everywhere.
+
+open binds the arrays of a run and, when the directory holds a snapshot of
+the same arrays, loads it into them and returns its step.  The solvers
+(equations.solve_*, cavity.cavity_flow, decomp.solve) take a checkpoint
+keyword and restart from it this way (see driver.march_observed): calling
+them again with the same checkpoint after a crash continues the run up to
+the same nt.
+"""
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+CHECKPOINT_EVERY = 100
+SLOTS = 2
+
+
+def _open_map(path, a):
+    """The memory map at path with the shape and dtype of a, reusing the
+    file when it already has them."""
+    if os.path.exists(path):
+        existing = np.lib.format.open_memmap(path, mode='r+')
+        if existing.shape == a.shape and existing.dtype == a.dtype:
+            return existing
+        # a leftover of a run on other arrays, with no state.json to catch it
+        del existing
+    return np.lib.format.open_memmap(path, mode='w+', dtype=a.dtype,
+                                     shape=a.shape)
+
+
+class Checkpoint:
+    """Memory-mapped store of the arrays of a run, saved every few steps."""
+
+    def __init__(self, directory, every=CHECKPOINT_EVERY, comm=None,
+                 restart=True):
+        if comm is not None:
+            directory = os.path.join(directory, 'rank%05d' % comm.Get_rank())
+        self.directory = directory
+        self.every = every
+        self.comm = comm
+        self.restart = restart
+        self.arrays = None
+        self.maps = None
+        self.steps = [None] * SLOTS
+        self.latest = None
+        self._queue = queue.Queue()
+        self._error = None
+        self._thread = None
+
+    @property
+    def _state_path(self):
+        return os.path.join(self.directory, 'state.json')
+
+    def _layout(self):
+        return {name: [list(a.shape), a.dtype.str]
+                for name, a in self.arrays.items()}
+
+    def _read_state(self):
+        """Committed steps of the slots on disk, or None without a store."""
+        try:
+            with open(self._state_path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        if state['arrays'] != self._layout():
+            raise ValueError("checkpoint in %s holds arrays %s, not %s"
+                             % (self.directory, state['arrays'],
+                                self._layout()))
+        return state['steps']
+
+    def _restart_step(self, steps):
+        """Latest step committed here, and by every rank with a comm."""
+        committed = [s for s in steps or () if s is not None]
+        step = max(committed) if committed and self.restart else -1
+        if self.comm is not None:
+            from mpi4py import MPI
+            step = self.comm.allreduce(step, op=MPI.MIN)
+        return step
+
+    def open(self, arrays):
+        """Bind the arrays {name: array} of the run; return the step to
+        start from, after loading it into arrays if a snapshot exists."""
+        self.arrays = dict(arrays)
+        for slot in range(SLOTS):
+            os.makedirs(os.path.join(self.directory, 'slot%d' % slot),
+                        exist_ok=True)
+        steps = self._read_state()
+        step = self._restart_step(steps)
+        self.maps = []
+        for slot in range(SLOTS):
+            maps = {}
+            for name, a in self.arrays.items():
+                path = os.path.join(self.directory, 'slot%d' % slot,
+                                    name + '.npy')
+                maps[name] = _open_map(path, a)
+            self.maps.append(maps)
+        steps = steps or [None] * SLOTS
+        if step >= 0 and step not in steps:
+            raise ValueError("step %d is not committed in %s"
+                             % (step, self.directory))
+        # forget every other snapshot before overwriting any of them, so a
+        # crash can only restart from this one or from a newer one
+        self.steps = [s if s == step else None for s in steps]
+        self.latest = self.steps.index(step) if step >= 0 else None
+        if self.steps != steps:
+            self._commit(self.steps)
+        if step < 0:
+            return 0
+        for name, a in self.arrays.items():
+            np.copyto(a, self.maps[self.latest][name])
+        return step
+
+    def save(self, step, arrays=None):
+        """Snapshot the bound arrays as the state at step.
+
+        arrays maps some of the bound names to the arrays holding their
+        current values instead, for solvers whose buffers swap roles.
+        """
+        self.wait()
+        if self.latest is not None and self.steps[self.latest] == step:
+            return
+        if self.comm is not None:
+            # every rank has committed its previous snapshot before any
+            # overwrites the one before, which the others may restart from
+            self.comm.Barrier()
+        slot = 0 if self.latest is None else (self.latest + 1) % SLOTS
+        # the slot is overwritten: it no longer holds a committed step
+        self.steps[slot] = None
+        for name, a in dict(self.arrays, **(arrays or {})).items():
+            np.copyto(self.maps[slot][name], a)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._write, daemon=True)
+            self._thread.start()
+        self.latest = slot
+        self._queue.put((slot, step))
+
+    def _write(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                slot, step = item
+                for m in self.maps[slot].values():
+                    m.flush()
+                steps = list(self.steps)
+                steps[slot] = step
+                self._commit(steps)
+                self.steps = steps
+            except Exception as error:
+                self._error = error
+            finally:
+                self._queue.task_done()
+
+    def _commit(self, steps):
+        temporary = self._state_path + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump({'steps': steps, 'arrays': self._layout(),
+                       'every': self.every}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self._state_path)
+
+    def wait(self):
+        """Block until the pending snapshot is on disk."""
+        self._queue.join()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def close(self):
+        self.wait()
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
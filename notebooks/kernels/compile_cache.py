@@ -0,0 +1,162 @@
+"""
+Content-addressed cache of the extension modules built by epyccel.
+
+epyccel compiles every call into a new __epyccel__/mod_<random> module next
+to the caller, with a __pyccel__ build directory whose setup script bakes
+in absolute paths, and never reuses them: a notebook restart recompiles
+everything and the build directories pile up.
+
+cached_epyccel keys a compiled function by the SHA-256 of its source (which
+includes its @types signature), the epyccel options (language, compiler,
+flags, accelerator), the pyccel version and the Python ABI and platform.
+On a miss the function is compiled in a temporary directory and only the
+extension module is kept, under CACHE_DIR/<key>/ with a small entry.json;
+the build directory is deleted.  An entry holds no absolute path, so the cache
+directory can be moved or shared between machines of the same platform.
+
+Entries are evicted least recently used first once the cache holds more
+than MAX_ENTRIES entries or MAX_BYTES bytes; a hit refreshes the access
+time of its entry.json.
+"""
+import glob
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import shutil
+import sys
+import sysconfig
+import tempfile
+import textwrap
+import time
+
+CACHE_DIR = os.environ.get(
+    'EPYCCEL_CACHE_DIR',
+    os.path.join(os.environ.get('XDG_CACHE_HOME',
+                                os.path.join(os.path.expanduser('~'), '.cache')),
+                 'epyccel'))
+MAX_ENTRIES = int(os.environ.get('EPYCCEL_CACHE_ENTRIES', 256))
+MAX_BYTES = int(os.environ.get('EPYCCEL_CACHE_BYTES', 512 << 20))
+
+_loaded = {}
+
+
+def _pyccel_version():
+    try:
+        from pyccel.version import __version__
+    except ImportError:
+        return 'unknown'
+    return __version__
+
+
+def cache_key(source, language='fortran', compiler=None, flags=None,
+              accelerator=None):
+    """SHA-256 of everything the compiled extension depends on."""
+    parts = [textwrap.dedent(source), language, compiler or '', flags or '',
+             _pyccel_version(), sys.implementation.cache_tag,
+             sysconfig.get_platform(), sysconfig.get_config_var('EXT_SUFFIX')]
+    if accelerator:
+        # only keyed when set, so the entries built without it stay valid
+        parts.append(accelerator)
+    return hashlib.sha256('\0'.join(parts).encode()).hexdigest()
+
+
+def _load(entry_dir, entry):
+    path = os.path.join(entry_dir, entry['file'])
+    spec = importlib.util.spec_from_file_location(entry['module'], path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return getattr(module, entry['function'])
+
+
+def _build(function, build_dir, language, compiler, flags, accelerator):
+    """Compile function with epyccel in build_dir; return its entry."""
+    from pyccel.epyccel import epyccel
+    options = {'accelerator': accelerator} if accelerator else {}
+    compiled = epyccel(function, language=language, compiler=compiler,
+                       fflags=flags, folder=build_dir, **options)
+    module = sys.modules[compiled.__module__]
+    return {'module': module.__name__,
+            'function': function.__name__,
+            'file': os.path.basename(module.__file__),
+            'path': module.__file__}
+
+
+def cached_epyccel(function, language='fortran', compiler=None, flags=None,
+                   accelerator=None, cache_dir=None):
+    """epyccel(function) through the cache; returns the compiled function.
+
+    accelerator='openmp' compiles the OpenMP pragmas of the source.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    key = cache_key(inspect.getsource(function), language, compiler, flags,
+                    accelerator)
+    if key in _loaded:
+        return _loaded[key]
+    entry_dir = os.path.join(cache_dir, key)
+    index = os.path.join(entry_dir, 'entry.json')
+    if not os.path.exists(index):
+        os.makedirs(cache_dir, exist_ok=True)
+        build_dir = tempfile.mkdtemp(prefix='build-', dir=cache_dir)
+        try:
+            entry = _build(function, build_dir, language, compiler, flags,
+                           accelerator)
+            staging = tempfile.mkdtemp(prefix='entry-', dir=cache_dir)
+            shutil.copy2(entry.pop('path'), os.path.join(staging, entry['file']))
+            entry['created'] = time.time()
+            with open(os.path.join(staging, 'entry.json'), 'w') as f:
+                json.dump(entry, f)
+            try:
+                os.rename(staging, entry_dir)
+            except OSError:
+                # another process stored the same key first
+                shutil.rmtree(staging)
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+        evict(cache_dir, keep=key)
+    with open(index) as f:
+        entry = json.load(f)
+    os.utime(index)
+    _loaded[key] = _load(entry_dir, entry)
+    return _loaded[key]
+
+
+def _entries(cache_dir):
+    """[(last access, size in bytes, entry directory)] of the cache."""
+    entries = []
+    for index in glob.glob(os.path.join(cache_dir, '*', 'entry.json')):
+        entry_dir = os.path.dirname(index)
+        size = sum(os.path.getsize(os.path.join(entry_dir, name))
+                   for name in os.listdir(entry_dir))
+        entries.append((os.stat(index).st_mtime, size, entry_dir))
+    return sorted(entries)
+
+
+def evict(cache_dir=None, max_entries=None, max_bytes=None, keep=None):
+    """Remove least recently used entries beyond the count and size limits.
+
+    Returns the number of entries removed.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    max_entries = MAX_ENTRIES if max_entries is None else max_entries
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    entries = _entries(cache_dir)
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, entry_dir in entries:
+        if len(entries) - removed <= max_entries and total <= max_bytes:
+            break
+        if os.path.basename(entry_dir) == keep:
+            continue
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        total -= size
+        removed += 1
+    return removed
+
+
+def clean_epyccel(folder):
+    """Delete the __epyccel__ build directory left by plain epyccel calls."""
+    path = os.path.join(folder, '__epyccel__')
+    if os.path.isdir(path):
+        shutil.rmtree(path)
@@ -0,0 +1,420 @@
+"""
+Cartesian domain decomposition of the 2D stencil solvers over MPI.
+
+CartDomain splits a global grid over a Cartesian communicator built with
+MPI.Compute_dims and Create_cart.  Every rank stores its block of cells
+surrounded by `ghost` layers of halo cells.  Halos are exchanged with
+Isend/Irecv of contiguous NumPy buffers packed from the edges of the block;
+only the four face neighbours are exchanged, which is all the cross-shaped
+stencils of the notebooks read.
+
+Every rank builds its own blocks: local_index maps the cells of a global
+index to those of the local array, so initial conditions are set without
+allocating the global grid.
+
+solve advances an Equation of the stencil engine on the local blocks: at
+every step it posts the halo exchange of the previous level, updates the
+cells that only read owned data while the messages are in flight, waits,
+then updates the strips along the block edges.  Field and old level swap
+roles at every step as in the ping-pong kernels.  The region updates are
+compiled for any backend of the engine.  CartCavityFlow runs the three
+stages of the cavity flow of cavity.py the same way.  Given a
+timing.PhaseTimer they time the kernel compilation, the inner and strip
+updates and the posting and completion of the halo exchange, and count the
+messages and bytes sent.
+Given a checkpoint.Checkpoint opened with the cartesian communicator, every
+rank restarts from and saves its own local arrays.
+"""
+import numpy as np
+from mpi4py import MPI
+
+from .cavity import PRESSURE, SOURCE, VELOCITY
+from .driver import march, march_observed
+from .stencil import compile_region_step
+from .timing import NULL_TIMER
+
+
+def split(n, size, rank):
+    """Return (start, stop) of the contiguous cells of rank among size."""
+    count, extra = divmod(n, size)
+    start = rank * count + min(rank, extra)
+    return start, start + count + (rank < extra)
+
+
+class Halo:
+    """Send and receive buffers of the halo exchange of one local array."""
+
+    def __init__(self, domain, array):
+        self.domain = domain
+        self.array = array
+        self.requests = []
+        self.buffers = []
+        for axis in range(array.ndim):
+            lower, upper = domain.neighbours[axis]
+            shape = list(array.shape)
+            shape[axis] = domain.ghost
+            for side, neighbour in ((0, lower), (1, upper)):
+                if neighbour == MPI.PROC_NULL:
+                    continue
+                self.buffers.append((axis, side, neighbour, np.empty(shape),
+                                     np.empty(shape)))
+
+    def _slab(self, axis, side, ghost):
+        """Owned edge layers (ghost=False) or halo layers (ghost=True)."""
+        g = self.domain.ghost
+        n = self.domain.counts[axis]
+        if side == 0:
+            start = 0 if ghost else g
+        else:
+            start = g + n if ghost else n
+        index = [slice(None)] * self.array.ndim
+        index[axis] = slice(start, start + g)
+        return tuple(index)
+
+    def start(self):
+        cart = self.domain.cart
+        for axis, side, neighbour, send, recv in self.buffers:
+            # data going up is tagged 2*axis, data going down 2*axis+1
+            self.requests.append(cart.Irecv(recv, neighbour,
+                                            2 * axis + (1 - side)))
+            send[...] = self.array[self._slab(axis, side, ghost=False)]
+            self.requests.append(cart.Isend(send, neighbour, 2 * axis + side))
+        return self
+
+    def wait(self):
+        MPI.Request.Waitall(self.requests)
+        self.requests = []
+        for axis, side, _, _, recv in self.buffers:
+            self.array[self._slab(axis, side, ghost=True)] = recv
+
+
+class CartDomain:
+    """Block of a global grid owned by this rank, with ghost layers."""
+
+    def __init__(self, comm, shape, ghost=1):
+        self.shape = tuple(shape)
+        self.ghost = ghost
+        self.dims = MPI.Compute_dims(comm.Get_size(), len(shape))
+        self.cart = comm.Create_cart(self.dims, periods=[False] * len(shape),
+                                     reorder=True)
+        self.coords = self.cart.Get_coords(self.cart.Get_rank())
+        bounds = [split(n, d, c)
+                  for n, d, c in zip(self.shape, self.dims, self.coords)]
+        self.start = tuple(b[0] for b in bounds)
+        self.stop = tuple(b[1] for b in bounds)
+        self.counts = tuple(b - a for a, b in bounds)
+        if min(self.counts) < ghost:
+            raise ValueError("blocks of %s cells are thinner than the %d ghost "
+                             "layers" % (self.counts, ghost))
+        self.local_shape = tuple(n + 2 * ghost for n in self.counts)
+        self.neighbours = [self.cart.Shift(axis, 1) for axis in range(len(shape))]
+
+    @property
+    def owned(self):
+        """Slices of the owned cells in a local array."""
+        g = self.ghost
+        return tuple(slice(g, g + n) for n in self.counts)
+
+    def zeros(self):
+        return np.zeros(self.local_shape)
+
+    def local_index(self, index):
+        """Index of a local array holding the cells of a global index.
+
+        index has an int or a step-less slice per axis.  The result covers
+        the owned and halo cells it selects, or is None if there are none.
+        """
+        g = self.ghost
+        local = []
+        for axis, (n, i) in enumerate(zip(self.shape, index)):
+            if isinstance(i, slice):
+                lo, hi, _ = i.indices(n)
+            else:
+                lo = i + n if i < 0 else i
+                hi = lo + 1
+            lo = max(lo, self.start[axis] - g, 0)
+            hi = min(hi, self.stop[axis] + g, n)
+            if lo >= hi:
+                return None
+            local.append(slice(lo - self.start[axis] + g,
+                               hi - self.start[axis] + g))
+        return tuple(local)
+
+    def from_global(self, array):
+        """Local array with the owned and halo cells of a global array."""
+        local = self.zeros()
+        g = self.ghost
+        source = []
+        target = []
+        for axis, n in enumerate(self.shape):
+            lo = max(self.start[axis] - g, 0)
+            hi = min(self.stop[axis] + g, n)
+            source.append(slice(lo, hi))
+            target.append(slice(lo - self.start[axis] + g,
+                                hi - self.start[axis] + g))
+        local[tuple(target)] = array[tuple(source)]
+        return local
+
+    def gather(self, local, root=0):
+        """Assemble the owned cells of every rank into a global array on root."""
+        block = np.ascontiguousarray(local[self.owned])
+        sizes = self.cart.gather(block.size, root=root)
+        if self.cart.Get_rank() != root:
+            self.cart.Gatherv(block, None, root=root)
+            return None
+        received = np.empty(sum(sizes))
+        self.cart.Gatherv(block, [received, sizes], root=root)
+        result = np.empty(self.shape)
+        offset = 0
+        for rank, size in enumerate(sizes):
+            coords = self.cart.Get_coords(rank)
+            bounds = [split(n, d, c)
+                      for n, d, c in zip(self.shape, self.dims, coords)]
+            index = tuple(slice(a, b) for a, b in bounds)
+            result[index] = received[offset:offset + size].reshape(
+                [b - a for a, b in bounds])
+            offset += size
+        return result
+
+    def regions(self, eq):
+        """Local update regions of eq: the inner one, then the edge strips.
+
+        The global interior of eq intersected with the owned block is cut
+        into the cells whose stencil only reads owned cells, which can be
+        updated before the halos arrive, and the strips around them.
+        """
+        g = self.ghost
+        region = []
+        inner = []
+        for axis, n in enumerate(self.shape):
+            lo = max(self.start[axis], eq.lower[axis]) - self.start[axis] + g
+            hi = min(self.stop[axis], n - eq.upper[axis]) - self.start[axis] + g
+            region.append((lo, max(lo, hi)))
+            inner_lo = min(max(lo, g + eq.lower[axis]), region[-1][1])
+            inner_hi = max(min(hi, g + self.counts[axis] - eq.upper[axis]),
+                           inner_lo)
+            inner.append((inner_lo, inner_hi))
+        (i0, i1), (j0, j1) = region
+        (k0, k1), (l0, l1) = inner
+        strips = [(i0, k0, j0, j1), (k1, i1, j0, j1),
+                  (k0, k1, j0, l0), (k0, k1, l1, j1)]
+        return (k0, k1, l0, l1), [s for s in strips if s[0] < s[1] and s[2] < s[3]]
+
+    def apply_bcs(self, eq, arrays):
+        """Apply the boundary conditions of eq on the global edges we own.
+
+        arrays maps the field names of eq to the local arrays to update.
+        """
+        g = self.ghost
+        for field, conditions in eq.bcs.items():
+            a = arrays[field]
+            for (axis, end), condition in conditions.items():
+                if end == 0 and self.start[axis] != 0:
+                    continue
+                if end != 0 and self.stop[axis] != self.shape[axis]:
+                    continue
+                edge = g if end == 0 else g + self.counts[axis] - 1
+                inner = edge + 1 if end == 0 else edge - 1
+                index = list(self.owned)
+                index[axis] = edge
+                if condition == 'neumann':
+                    source = list(self.owned)
+                    source[axis] = inner
+                    a[tuple(index)] = a[tuple(source)]
+                else:
+                    a[tuple(index)] = condition
+
+
+def ghost_width(eq):
+    return max(max(eq.lower), max(eq.upper), 1)
+
+
+def solve(eq, domain, arrays, nt, *params, timer=NULL_TIMER,
+          checkpoint=None, backend='numpy'):
+    """Advance eq by nt steps on the local arrays of domain.
+
+    arrays are the local arrays in the order of eq.arrays (fields, old
+    levels, aux).  The result is left in the field arrays.  With a
+    checkpoint, nt counts the steps done before the restart.
+    """
+    with timer.phase('compile', 'setup'):
+        update = compile_region_step(eq, backend)
+    names = dict(zip(eq.arrays, arrays))
+    inner, strips = domain.regions(eq)
+    start = 0
+    if checkpoint is not None:
+        state = [field for field, _ in eq.fields] + list(eq.aux)
+        with timer.phase('restart', 'io'):
+            start = checkpoint.open({name: names[name] for name in state})
+
+    with timer.phase('aux halos', 'communication'):
+        for aux in eq.aux:
+            Halo(domain, names[aux]).start().wait()
+    current = {}
+    previous = {}
+    for field, old in eq.fields:
+        np.copyto(names[old], names[field])
+        current[field] = names[field]
+        previous[field] = names[old]
+    halos = {id(a): Halo(domain, a) for a in arrays[:2 * len(eq.fields)]}
+    aux = [names[a] for a in eq.aux]
+    # both levels of a field have the same buffers, every step sends one
+    sent = [b[3] for field, _ in eq.fields
+            for b in halos[id(names[field])].buffers]
+    sent_bytes = sum(b.nbytes for b in sent)
+
+    for step in range(start, nt):
+        # the level being read is the one written at the previous step
+        current, previous = previous, current
+        with timer.phase('halo start', 'communication'):
+            pending = [halos[id(previous[field])].start()
+                       for field, _ in eq.fields]
+        timer.count('messages', len(sent))
+        timer.count('bytes sent', sent_bytes)
+        args = [a for field, _ in eq.fields
+                for a in (current[field], previous[field])] + aux + list(params)
+        with timer.phase('inner', 'compute'):
+            update(*args, *inner)
+        with timer.phase('halo wait', 'communication'):
+            for halo in pending:
+                halo.wait()
+        with timer.phase('strips', 'compute'):
+            for strip in strips:
+                update(*args, *strip)
+            domain.apply_bcs(eq, current)
+        if checkpoint is not None and (step + 1) % checkpoint.every == 0:
+            with timer.phase('checkpoint', 'io'):
+                checkpoint.save(step + 1, current)
+
+    for field, _ in eq.fields:
+        if current[field] is not names[field]:
+            np.copyto(names[field], current[field])
+    if checkpoint is not None:
+        with timer.phase('checkpoint', 'io'):
+            checkpoint.save(max(nt, start))
+            checkpoint.wait()
+    return 0
+
+
+def _overlapped(update, args, regions, halos, timer):
+    """Update the inner region during the exchange of halos, then the strips."""
+    inner, strips = regions
+    with timer.phase('halo start', 'communication'):
+        for halo in halos:
+            halo.start()
+    timer.count('messages', sum(len(halo.buffers) for halo in halos))
+    timer.count('bytes sent', sum(b[3].nbytes for halo in halos
+                                  for b in halo.buffers))
+    with timer.phase('inner', 'compute'):
+        update(*args, *inner)
+    with timer.phase('halo wait', 'communication'):
+        for halo in halos:
+            halo.wait()
+    with timer.phase('strips', 'compute'):
+        for strip in strips:
+            update(*args, *strip)
+
+
+class CartCavityFlow:
+    """cavity.CavityFlow on the local arrays u, v and p of a CartDomain.
+
+    Each stage runs in copy mode like the serial kernels, with the halos it
+    reads exchanged during its inner update: the velocity reads those of
+    un, vn and p, the source those of the new u and v, every pressure sweep
+    those of pn.  The changes and max|p| that the serial kernels compute
+    are taken over the owned cells and reduced with a max Allreduce, so all
+    ranks take the same decisions and, with the numpy backend, end with the
+    same values as the serial run.
+    """
+
+    def __init__(self, domain, u, v, p, dt, dx, dy, rho, nu, nit=50,
+                 tol=1e-4, check_every=2, backend='numpy', timer=NULL_TIMER):
+        self.domain = domain
+        self.u, self.v, self.p = u, v, p
+        self.un, self.vn, self.pn, self.b = (domain.zeros() for _ in range(4))
+        self.dt, self.dx, self.dy, self.rho, self.nu = dt, dx, dy, rho, nu
+        self.nit = nit
+        self.tol = tol
+        self.check_every = check_every
+        self.timer = timer
+        with timer.phase('compile', 'setup'):
+            self._velocity = compile_region_step(VELOCITY, backend)
+            self._source = compile_region_step(SOURCE, backend)
+            self._pressure = compile_region_step(PRESSURE, backend)
+        self.regions = {eq: domain.regions(eq)
+                        for eq in (VELOCITY, SOURCE, PRESSURE)}
+        self.halos = {name: Halo(domain, getattr(self, name))
+                      for name in ('u', 'v', 'p', 'un', 'vn', 'pn')}
+        self.steps = 0
+        self.sweeps = 0
+
+    def _max(self, *values):
+        """Largest of values over all ranks."""
+        local = np.array(values, dtype=float)
+        with self.timer.phase('allreduce', 'communication'):
+            self.domain.cart.Allreduce(MPI.IN_PLACE, local, op=MPI.MAX)
+        return local
+
+    def _change(self, *pairs):
+        owned = self.domain.owned
+        return max(float(np.abs(a[owned] - b[owned]).max()) for a, b in pairs)
+
+    def pressure(self):
+        """Iterate on p until converged or nit sweeps; return the sweeps run."""
+        halos = [self.halos['pn']]
+        args = (self.p, self.pn, self.b, self.dx, self.dy)
+        done = 0
+        while done < self.nit:
+            sweeps = min(self.check_every, self.nit - done)
+            for _ in range(sweeps):
+                np.copyto(self.pn, self.p)
+                _overlapped(self._pressure, args, self.regions[PRESSURE],
+                            halos, self.timer)
+                self.domain.apply_bcs(PRESSURE, {'p': self.p})
+            done += sweeps
+            if self.tol:
+                change, pmax = self._max(
+                    self._change((self.p, self.pn)),
+                    np.abs(self.p[self.domain.owned]).max())
+                if change <= self.tol * pmax:
+                    break
+        self.sweeps += done
+        return done
+
+    def step(self):
+        """Advance one time step; return the largest change of u or v here."""
+        np.copyto(self.un, self.u)
+        np.copyto(self.vn, self.v)
+        _overlapped(self._velocity,
+                    (self.u, self.un, self.v, self.vn, self.p, self.dt,
+                     self.dx, self.dy, self.rho, self.nu),
+                    self.regions[VELOCITY],
+                    [self.halos[name] for name in ('un', 'vn', 'p')],
+                    self.timer)
+        change = self._change((self.u, self.un), (self.v, self.vn))
+        # SOURCE has no previous level to read, b stands in for it
+        _overlapped(self._source,
+                    (self.b, self.b, self.u, self.v, self.rho, self.dt,
+                     self.dx, self.dy),
+                    self.regions[SOURCE],
+                    [self.halos['u'], self.halos['v']], self.timer)
+        self.pressure()
+        self.steps += 1
+        return change
+
+    def advance(self, n):
+        for _ in range(n):
+            change = self.step()
+        return self._max(change)[0]
+
+    def run(self, nt, steady_tol=0., check_every=1, checkpoint=None):
+        """Run up to nt steps as CavityFlow.run; return (steps, history).
+
+        A checkpoint must be opened with the cartesian communicator, every
+        rank saving its local arrays.
+        """
+        if checkpoint is None:
+            return march(self.advance, nt, steady_tol, check_every)
+        state = {'u': self.u, 'v': self.v, 'p': self.p, 'b': self.b}
+        return march_observed(self.advance, nt, state, steady_tol,
+                              check_every, checkpoint)
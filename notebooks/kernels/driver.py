@@ -0,0 +1,89 @@
+"""
+Time-marching driver stopping at a steady state.
+
+march runs a solver by chunks of check_every steps.  After each chunk the
+solver reports the largest absolute change of its fields over the last
+step; the run stops once that change is at most tol, and the changes are
+kept in a float64 array, one entry per check, as convergence history.
+
+The stencil kernels compute the change inside the compiled kernel
+(compile_equation(..., monitor=True)), so a check costs one pass over the
+arrays every check_every steps and no Python-level array operation.
+
+march_observed also hands the state of the run to a checkpoint.Checkpoint,
+which it restarts from, and to a snapshots.SnapshotWriter.  Both have an
+`every` and a save(step) method, called whenever the step count reaches a
+multiple of their every; the chunks of advance are cut at those steps.
+"""
+import numpy as np
+
+from .stencil import compile_equation
+
+CHECK_EVERY = 10
+
+
+def march(advance, nt, tol=0., check_every=CHECK_EVERY):
+    """Run up to nt steps of advance, stopping at a change of at most tol.
+
+    advance(n) runs n steps and returns the change of the last one.
+    Returns (number of steps run, history of the changes).
+    """
+    history = np.empty(-(-nt // check_every))
+    done = 0
+    checks = 0
+    while done < nt:
+        n = min(check_every, nt - done)
+        history[checks] = advance(n)
+        done += n
+        checks += 1
+        if history[checks - 1] <= tol:
+            break
+    return done, history[:checks]
+
+
+def every_steps(advance, observers, start=0):
+    """advance(n) calling observer.save(step) at the multiples of
+    observer.every, counting steps from start."""
+    done = [start]
+
+    def run(n):
+        while n > 0:
+            chunk = min([n] + [o.every - done[0] % o.every for o in observers])
+            change = advance(chunk)
+            done[0] += chunk
+            n -= chunk
+            for observer in observers:
+                if done[0] % observer.every == 0:
+                    observer.save(done[0])
+        return change
+
+    return run
+
+
+def march_observed(advance, nt, state, tol=0., check_every=CHECK_EVERY,
+                   checkpoint=None, snapshots=None):
+    """march with checkpoints and snapshots of state {name: array}.
+
+    The steps already done by the snapshot found in checkpoint are skipped,
+    so nt counts the steps done before the restart.  Both observers also
+    save the final state, snapshots the initial one too.  Returns (total
+    number of steps done, history of the changes since the restart).
+    """
+    start = 0 if checkpoint is None else checkpoint.open(state)
+    observers = [o for o in (checkpoint, snapshots) if o is not None]
+    if snapshots is not None:
+        snapshots.open(state)
+        snapshots.save(start)
+    steps, history = march(every_steps(advance, observers, start),
+                           max(nt - start, 0), tol, check_every)
+    for observer in observers:
+        observer.save(start + steps)
+        observer.wait()
+    return start + steps, history
+
+
+def steady_state(eq, arrays, nt, params, tol=0., check_every=CHECK_EVERY,
+                 backend='numpy'):
+    """march the stencil Equation eq on arrays (in the order of eq.arrays)."""
+    kernel = compile_equation(eq, backend, monitor=True)
+    return march(lambda n: kernel(*arrays, n, *params), nt, tol, check_every)
@@ -0,0 +1,58 @@
+"""
+Batched 1D solvers advancing an ensemble of independent members at once.
+
+Uncertainty quantification runs the 1D solvers of equations on thousands of
+initial conditions and coefficients.  One call per member is dominated by
+the Python call overhead, so these solvers take a whole ensemble: u and un
+are (batch, nx) arrays, one member per row, and every coefficient (dt, dx,
+c, nu) is either one value for all members or an array of one value per
+member.
+
+The kernels come from stencil.compile_batch.  The arrays must be
+C-contiguous, so that a member is one contiguous row; the numba and pyccel
+kernels then run each member through its nt steps while its two rows stay
+in cache, with the members spread over threads (numba prange, OpenMP for
+pyccel), and numpy updates all the members on slices of the batch.  Every
+member gets exactly the updates of the single-member solver.
+"""
+import numpy as np
+
+from .equations import BURGER_1D, DIFF_1D, LINEARCONV_1D, NONLINEARCONV_1D
+from .stencil import compile_batch
+
+EQUATIONS = (LINEARCONV_1D, NONLINEARCONV_1D, DIFF_1D, BURGER_1D)
+
+
+def members(value, batch):
+    """Coefficient value as a contiguous array of one float per member."""
+    value = np.asarray(value, dtype=float)
+    if value.ndim == 0:
+        return np.full(batch, float(value))
+    if value.shape != (batch,):
+        raise ValueError("expected one value or %d, got shape %s"
+                         % (batch, value.shape))
+    return np.ascontiguousarray(value)
+
+
+def _solve(eq, u, un, nt, params, backend):
+    if u.ndim != 2 or not (u.flags.c_contiguous and un.flags.c_contiguous):
+        raise ValueError("%s: u and un must be C-contiguous (batch, nx) "
+                         "arrays" % eq.name)
+    params = [members(p, len(u)) for p in params]
+    return compile_batch(eq, backend)(u, un, nt, *params)
+
+
+def solve_1d_linearconv_batch(u, un, nt, nx, dt, dx, c, backend='numpy'):
+    return _solve(LINEARCONV_1D, u, un, nt, (dt, dx, c), backend)
+
+
+def solve_1d_nonlinearconv_batch(u, un, nt, nx, dt, dx, backend='numpy'):
+    return _solve(NONLINEARCONV_1D, u, un, nt, (dt, dx), backend)
+
+
+def solve_1d_diff_batch(u, un, nt, nx, dt, dx, nu, backend='numpy'):
+    return _solve(DIFF_1D, u, un, nt, (dt, dx, nu), backend)
+
+
+def solve_1d_burger_batch(u, un, nt, nx, dt, dx, nu, backend='numpy'):
+    return _solve(BURGER_1D, u, un, nt, (dt, dx, nu), backend)
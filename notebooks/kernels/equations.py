@@ -0,0 +1,185 @@
+"""
+The convection, diffusion, Burgers and Poisson solvers of the notebooks,
+each described once as a stencil Equation.
+
+Every solve_* function keeps the signature of the notebook versions
+(solve_1d_linearconv_pure, ..._numba, ..._pyccel) plus a backend keyword
+choosing among stencil.BACKENDS, and returns 0 after updating its arrays in
+place.  The 2D solvers set their hat initial condition and the Poisson
+solver its two point sources first, as the notebook versions do.
+
+Given tol, a solver instead stops as soon as a step changes its fields by
+at most tol, checking every check_every steps, and returns the (steps,
+history) of driver.steady_state.
+
+Given a checkpoint.Checkpoint, a solver first restarts from the snapshot it
+holds, if any, then saves its fields and auxiliary arrays every
+checkpoint.every steps and at the end.  Given a snapshots.SnapshotWriter,
+it records them every snapshots.every steps (see driver.march_observed).
+"""
+from .driver import CHECK_EVERY, march_observed, steady_state
+from .stencil import Equation, compile_equation
+
+LINEARCONV_1D = Equation(
+    'linearconv_1d', 1, ['u'],
+    {'u': 'un[i]-c*dt*(un[i]-un[i-1])/dx'},
+    params=['dt', 'dx', 'c'])
+
+NONLINEARCONV_1D = Equation(
+    'nonlinearconv_1d', 1, ['u'],
+    {'u': 'un[i]-un[i]*dt*(un[i]-un[i-1])/dx'},
+    params=['dt', 'dx'])
+
+DIFF_1D = Equation(
+    'diff_1d', 1, ['u'],
+    {'u': 'un[i]+nu*dt*(un[i-1]+un[i+1]-2*un[i])/(dx**2)'},
+    params=['dt', 'dx', 'nu'])
+
+BURGER_1D = Equation(
+    'burger_1d', 1, ['u'],
+    {'u': 'un[i]+nu*dt*(un[i-1]+un[i+1]-2*un[i])/(dx**2)'
+          '-un[i]*dt*(un[i]-un[i-1])/dx'},
+    params=['dt', 'dx', 'nu'])
+
+LINEARCONV_2D = Equation(
+    'linearconv_2d', 2, ['u'],
+    {'u': 'un[i,j]-c*dt*((un[i,j]-un[i-1,j])/dx+(un[i,j]-un[i,j-1])/dy)'},
+    params=['dt', 'dx', 'dy', 'c'])
+
+NONLINEARCONV_2D = Equation(
+    'nonlinearconv_2d', 2, ['u', 'v'],
+    {'u': 'un[i,j]-un[i,j]*dt*(un[i,j]-un[i-1,j])/dx'
+          '-vn[i,j]*dt*(un[i,j]-un[i,j-1])/dy',
+     'v': 'vn[i,j]-un[i,j]*dt*(vn[i,j]-vn[i-1,j])/dx'
+          '-vn[i,j]*dt*(vn[i,j]-vn[i,j-1])/dy'},
+    params=['dt', 'dx', 'dy'])
+
+DIFF_2D = Equation(
+    'diff_2d', 2, ['u'],
+    {'u': 'un[i,j]-nu*dt*((2*un[i,j]-un[i-1,j]-un[i+1,j])/dx**2'
+          '+(2*un[i,j]-un[i,j-1]-un[i,j+1])/dy**2)'},
+    params=['dt', 'dx', 'dy', 'nu'])
+
+BURGER_2D = Equation(
+    'burger_2d', 2, ['u', 'v'],
+    {'u': 'un[i,j]-un[i,j]*dt*(un[i,j]-un[i-1,j])/dx'
+          '-vn[i,j]*dt*(un[i,j]-un[i,j-1])/dy'
+          '+nu*dt*((un[i+1,j]-2*un[i,j]+un[i-1,j])/dx**2'
+          '+(un[i,j+1]-2*un[i,j]+un[i,j-1])/dy**2)',
+     'v': 'vn[i,j]-un[i,j]*dt*(vn[i,j]-vn[i-1,j])/dx'
+          '-vn[i,j]*dt*(vn[i,j]-vn[i,j-1])/dy'
+          '+nu*dt*((vn[i+1,j]-2*vn[i,j]+vn[i-1,j])/dx**2'
+          '+(vn[i,j+1]-2*vn[i,j]+vn[i,j-1])/dy**2)'},
+    params=['dt', 'dx', 'dy', 'nu'])
+
+# Jacobi sweep of the Poisson equation; the notebooks write it shifted by one
+# (p[j-1, i-1] from pd[j-1, i], pd[j-1, i-2], ...), this is the same update
+POISSON_2D = Equation(
+    'poisson_2d', 2, [('p', 'pd')],
+    {'p': '((pd[i,j+1]+pd[i,j-1])*dy**2+(pd[i+1,j]+pd[i-1,j])*dx**2'
+          '-b[i,j]*dx**2*dy**2)/(2*(dx**2+dy**2))'},
+    params=['dx', 'dy'], aux=['b'],
+    bcs={'p': {(0, 0): 0., (0, -1): 0., (1, 0): 0., (1, -1): 0.}})
+
+EQUATIONS = (LINEARCONV_1D, NONLINEARCONV_1D, DIFF_1D, BURGER_1D,
+             LINEARCONV_2D, NONLINEARCONV_2D, DIFF_2D, BURGER_2D, POISSON_2D)
+
+
+def hat_index(dx, dy):
+    """Global index of the cells .5<=x<=1 && .5<=y<=1 of the hat."""
+    return (slice(int(.5 / dy), int(1 / dy + 1)),
+            slice(int(.5 / dx), int(1 / dx + 1)))
+
+
+def hat(u, dx, dy):
+    """Set the hat initial condition u(.5<=x<=1 && .5<=y<=1) = 2."""
+    u[hat_index(dx, dy)] = 2
+
+
+def _solve(eq, arrays, nt, params, backend, tol, check_every, checkpoint,
+           snapshots):
+    if checkpoint is not None or snapshots is not None:
+        kernel = compile_equation(eq, backend, monitor=tol is not None)
+        names = dict(zip(eq.arrays, arrays))
+        state = {name: names[name]
+                 for name in [f for f, _ in eq.fields] + list(eq.aux)}
+        result = march_observed(
+            lambda n: kernel(*arrays, n, *params), nt, state,
+            -float('inf') if tol is None else tol,
+            max(nt, 1) if tol is None else check_every, checkpoint,
+            snapshots)
+        return 0 if tol is None else result
+    if tol is None:
+        return compile_equation(eq, backend)(*arrays, nt, *params)
+    return steady_state(eq, arrays, nt, params, tol, check_every, backend)
+
+
+def solve_1d_linearconv(u, un, nt, nx, dt, dx, c, backend='numpy', tol=None,
+                        check_every=CHECK_EVERY, checkpoint=None,
+                        snapshots=None):
+    return _solve(LINEARCONV_1D, (u, un), nt, (dt, dx, c), backend, tol,
+                  check_every, checkpoint, snapshots)
+
+
+def solve_1d_nonlinearconv(u, un, nt, nx, dt, dx, backend='numpy', tol=None,
+                           check_every=CHECK_EVERY, checkpoint=None,
+                           snapshots=None):
+    return _solve(NONLINEARCONV_1D, (u, un), nt, (dt, dx), backend, tol,
+                  check_every, checkpoint, snapshots)
+
+
+def solve_1d_diff(u, un, nt, nx, dt, dx, nu, backend='numpy', tol=None,
+                  check_every=CHECK_EVERY, checkpoint=None,
+                  snapshots=None):
+    return _solve(DIFF_1D, (u, un), nt, (dt, dx, nu), backend, tol,
+                  check_every, checkpoint, snapshots)
+
+
+def solve_1d_burger(u, un, nt, nx, dt, dx, nu, backend='numpy', tol=None,
+                    check_every=CHECK_EVERY, checkpoint=None,
+                    snapshots=None):
+    return _solve(BURGER_1D, (u, un), nt, (dt, dx, nu), backend, tol,
+                  check_every, checkpoint, snapshots)
+
+
+def solve_2d_linearconv(u, un, nt, dt, dx, dy, c, backend='numpy', tol=None,
+                        check_every=CHECK_EVERY, checkpoint=None,
+                        snapshots=None):
+    return _solve(LINEARCONV_2D, (u, un), nt, (dt, dx, dy, c), backend, tol,
+                  check_every, checkpoint, snapshots)
+
+
+def solve_2d_nonlinearconv(u, un, v, vn, nt, dt, dx, dy, c, backend='numpy',
+                           tol=None, check_every=CHECK_EVERY, checkpoint=None,
+                           snapshots=None):
+    hat(u, dx, dy)
+    hat(v, dx, dy)
+    return _solve(NONLINEARCONV_2D, (u, un, v, vn), nt, (dt, dx, dy), backend,
+                  tol, check_every, checkpoint, snapshots)
+
+
+def solve_2d_diff(u, un, nt, dt, dx, dy, nu, backend='numpy', tol=None,
+                  check_every=CHECK_EVERY, checkpoint=None,
+                  snapshots=None):
+    hat(u, dx, dy)
+    return _solve(DIFF_2D, (u, un), nt, (dt, dx, dy, nu), backend, tol,
+                  check_every, checkpoint, snapshots)
+
+
+def solve_2d_burger(u, un, v, vn, nt, dt, dx, dy, nu, backend='numpy',
+                    tol=None, check_every=CHECK_EVERY, checkpoint=None,
+                    snapshots=None):
+    hat(u, dx, dy)
+    hat(v, dx, dy)
+    return _solve(BURGER_2D, (u, un, v, vn), nt, (dt, dx, dy, nu), backend,
+                  tol, check_every, checkpoint, snapshots)
+
+
+def solve_2d_poisson(p, pd, b, nx, ny, nt, dx, dy, backend='numpy', tol=None,
+                     check_every=CHECK_EVERY, checkpoint=None,
+                     snapshots=None):
+    # Source
+    b[int(ny / 4), int(nx / 4)] = 100
+    b[int(3 * ny / 4), int(3 * nx / 4)] = -100
+    return _solve(POISSON_2D, (p, pd, b), nt, (dx, dy), backend, tol,
+                  check_every, checkpoint, snapshots)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Block-streamed Monte Carlo engine shared by the serial and MPI pi scripts.
+
+Points are drawn in NumPy blocks of fixed size from a numpy.random.Generator
+and tested against the unit circle with vectorized operations.  The block
+buffers are allocated once and reused, so memory stays flat whatever the
+number of samples.
+
+The sample space is cut into global blocks of BLOCK_SIZE points and block b
+always draws from its own Philox stream spawned from the root seed.  Which
+rank computes a block does not change its points, so a (seed, nsamples) pair
+gives the same count for any number of ranks.
+"""
+import numpy as np
+
+BLOCK_SIZE = 1 << 16
+SEED = 42
+
+
+def block_generator(seed, block):
+    """Return the generator of global block number block.
+
+    SeedSequence(seed, spawn_key=(block,)) is the block-th child of
+    SeedSequence(seed).spawn(), built directly without spawning the others.
+    """
+    seq = np.random.SeedSequence(seed, spawn_key=(block,))
+    return np.random.Generator(np.random.Philox(seq))
+
+
+def number_of_blocks(nsamples, block_size=BLOCK_SIZE):
+    return -(-nsamples // block_size)
+
+
+def block_length(block, nsamples, block_size=BLOCK_SIZE):
+    return min(block_size, nsamples - block * block_size)
+
+
+def rank_blocks(nblocks, rank, size):
+    """Blocks handled by rank under the static cyclic distribution."""
+    return range(rank, nblocks, size)
+
+
+def block_circle_points(rng, x, y, inside):
+    """Fill x, y with uniform points of [0, 1)^2 and count those in the circle.
+
+    Sampling the quarter disc of the unit square gives the same ratio pi/4 as
+    the [-1, 1]^2 square and saves the affine transform on every point.
+    """
+    rng.random(out=x)
+    rng.random(out=y)
+    np.multiply(x, x, out=x)
+    np.multiply(y, y, out=y)
+    np.add(x, y, out=x)
+    np.less_equal(x, 1., out=inside)
+    return int(np.count_nonzero(inside))
+
+
+def compute_circle_points(nsamples, rng=None, block_size=BLOCK_SIZE):
+    """Return the number of the nsamples random points that fall in the circle."""
+    if rng is None:
+        rng = np.random.default_rng()
+    block_size = max(1, min(block_size, nsamples))
+    x = np.empty(block_size)
+    y = np.empty(block_size)
+    inside = np.empty(block_size, dtype=bool)
+
+    circle_points = 0
+    done = 0
+    while done < nsamples:
+        n = min(block_size, nsamples - done)
+        circle_points += block_circle_points(rng, x[:n], y[:n], inside[:n])
+        done += n
+    return circle_points
+
+
+def circle_points_kernel(nsamples, seed=SEED, block_size=BLOCK_SIZE):
+    """Return kernel(block) counting the circle points of one global block.
+
+    The kernel owns its block buffers, so calling it repeatedly allocates
+    nothing.
+    """
+    x = np.empty(block_size)
+    y = np.empty(block_size)
+    inside = np.empty(block_size, dtype=bool)
+
+    def kernel(block):
+        n = block_length(block, nsamples, block_size)
+        rng = block_generator(seed, block)
+        return block_circle_points(rng, x[:n], y[:n], inside[:n])
+
+    return kernel
+
+
+def compute_circle_points_blocks(blocks, nsamples, seed=SEED,
+                                 block_size=BLOCK_SIZE):
+    """Count the circle points of the given global blocks of a nsamples run."""
+    kernel = circle_points_kernel(nsamples, seed, block_size)
+    return sum(kernel(block) for block in blocks)
+
+
+def samples_per_second(nsamples, elapsed):
+    if elapsed <= 0.:
+        return float('inf')
+    return nsamples / elapsed
+
+
+def report(circle_points, nsamples, elapsed):
+    pi = 4 * circle_points / nsamples
+    print("Circle points number :", circle_points)
+    print("Final Estimation of Pi=", pi, "cpu time :", elapsed)
+    print("Samples per second :", "%.3e" % samples_per_second(nsamples, elapsed))
+    return pi
@@ -0,0 +1,208 @@
+"""
+Geometric multigrid solver of the 2D Poisson equation of the notebooks.
+
+The discrete system is the one the Jacobi sweeps of solve_2d_poisson
+iterate on: the 5-point Laplacian of p (axis 0 spaced by dy, axis 1 by dx)
+equals b on the interior cells, with p = 0 on the four edges.  Instead of a
+fixed number of Jacobi sweeps, multigrid cycles are run until the residual
+drops below a tolerance; each cycle costs O(N) and reduces the error by a
+factor independent of the grid size.
+
+Every level halves the number of intervals of each axis longer than
+COARSEST points and rediscretises the Laplacian with the coarser spacing.
+When an axis has an odd number of intervals the coarse points are not a
+subset of the fine ones; the transfers then interpolate linearly between
+the two uniform grids, which reduces to the usual bilinear interpolation
+and full weighting when the grids are nested.  The smoother is red-black
+Gauss-Seidel and the coarsest level is solved directly.
+
+The hierarchy of a grid is built once and kept for the session, so calling
+the solver again on the same grid allocates nothing but NumPy temporaries.
+"""
+import numpy as np
+
+COARSEST = 5
+CYCLES = ('V', 'W', 'F')
+
+
+class _Transfer:
+    """Linear interpolation from a uniform grid of m points to one of n."""
+
+    def __init__(self, n, m):
+        self.n = n
+        self.m = m
+        position = np.arange(n) * ((m - 1) / (n - 1))
+        self.left = np.minimum(position.astype(np.intp), m - 2)
+        self.weight = (position - self.left)[:, None]
+        # fine points are sorted, so those interpolating from the same
+        # coarse interval are contiguous
+        self.starts = np.searchsorted(self.left, np.arange(m - 1))
+        self.scale = (m - 1) / (n - 1)
+
+    def prolong(self, coarse):
+        """Interpolate along axis 0."""
+        if self.m == self.n:
+            return coarse
+        return ((1 - self.weight) * coarse[self.left]
+                + self.weight * coarse[self.left + 1])
+
+    def restrict(self, fine):
+        """Transpose of prolong along axis 0, scaled to a weighted mean."""
+        if self.m == self.n:
+            return fine
+        coarse = np.zeros((self.m,) + fine.shape[1:])
+        coarse[:-1] = np.add.reduceat((1 - self.weight) * fine, self.starts)
+        coarse[1:] += np.add.reduceat(self.weight * fine, self.starts)
+        return coarse * self.scale
+
+
+class _Level:
+    def __init__(self, shape, dx, dy):
+        self.shape = shape
+        self.dx2 = dx * dx
+        self.dy2 = dy * dy
+        self.residual = np.zeros(shape)
+
+    def smooth(self, p, b, sweeps):
+        """Red-black Gauss-Seidel sweeps of the interior cells."""
+        ny, nx = self.shape
+        dx2, dy2 = self.dx2, self.dy2
+        diagonal = 2 * (dx2 + dy2)
+        for _ in range(sweeps):
+            for color in (0, 1):
+                # cells with (i + j) % 2 == color, for odd then even rows
+                for i0, j0 in ((1, 1 + color), (2, 2 - color)):
+                    I = slice(i0, ny - 1, 2)
+                    J = slice(j0, nx - 1, 2)
+                    west = slice(j0 - 1, nx - 2, 2)
+                    east = slice(j0 + 1, nx, 2)
+                    south = slice(i0 - 1, ny - 2, 2)
+                    north = slice(i0 + 1, ny, 2)
+                    p[I, J] = (((p[I, east] + p[I, west]) * dy2
+                                + (p[north, J] + p[south, J]) * dx2
+                                - b[I, J] * dx2 * dy2) / diagonal)
+
+    def compute_residual(self, p, b):
+        r = self.residual
+        r[1:-1, 1:-1] = b[1:-1, 1:-1] - (
+            (p[1:-1, 2:] - 2 * p[1:-1, 1:-1] + p[1:-1, :-2]) / self.dx2
+            + (p[2:, 1:-1] - 2 * p[1:-1, 1:-1] + p[:-2, 1:-1]) / self.dy2)
+        return r
+
+
+class Multigrid:
+    """Level hierarchy and cycles of the Poisson problem on one grid."""
+
+    def __init__(self, shape, dx, dy, presmooth=2, postsmooth=2):
+        self.presmooth = presmooth
+        self.postsmooth = postsmooth
+        self.levels = [_Level(tuple(shape), dx, dy)]
+        self.transfers = []
+        ny, nx = shape
+        while ny > COARSEST or nx > COARSEST:
+            my = (ny - 1) // 2 + 1 if ny > COARSEST else ny
+            mx = (nx - 1) // 2 + 1 if nx > COARSEST else nx
+            dy *= (ny - 1) / (my - 1)
+            dx *= (nx - 1) / (mx - 1)
+            self.transfers.append((_Transfer(ny, my), _Transfer(nx, mx)))
+            self.levels.append(_Level((my, mx), dx, dy))
+            ny, nx = my, mx
+        # work arrays of the coarse levels: correction and right-hand side
+        self.corrections = [None] + [np.zeros(l.shape) for l in self.levels[1:]]
+        self.rhs = [None] + [np.zeros(l.shape) for l in self.levels[1:]]
+        self._coarsest = self._coarsest_inverse()
+
+    def _coarsest_inverse(self):
+        level = self.levels[-1]
+        ny, nx = level.shape
+        ey = np.eye(ny - 2)
+        ex = np.eye(nx - 2)
+        second = lambda n: (np.diag(np.full(n, -2.)) + np.diag(np.ones(n - 1), 1)
+                            + np.diag(np.ones(n - 1), -1))
+        laplacian = (np.kron(ey, second(nx - 2)) / level.dx2
+                     + np.kron(second(ny - 2), ex) / level.dy2)
+        return np.linalg.inv(laplacian)
+
+    def _restrict(self, k, r):
+        ty, tx = self.transfers[k]
+        return tx.restrict(ty.restrict(r).T).T
+
+    def _prolong(self, k, e):
+        ty, tx = self.transfers[k]
+        return tx.prolong(ty.prolong(e).T).T
+
+    def cycle(self, p, b, k=0, kind='V'):
+        """Run one cycle of the given kind on level k, updating p in place."""
+        level = self.levels[k]
+        if k == len(self.levels) - 1:
+            ny, nx = level.shape
+            p[1:-1, 1:-1] = (self._coarsest @ b[1:-1, 1:-1].ravel()).reshape(
+                ny - 2, nx - 2)
+            return
+        level.smooth(p, b, self.presmooth)
+        r = level.compute_residual(p, b)
+        coarse_b = self.rhs[k + 1]
+        coarse_b[...] = self._restrict(k, r)
+        e = self.corrections[k + 1]
+        e.fill(0.)
+        if kind == 'V':
+            self.cycle(e, coarse_b, k + 1, 'V')
+        elif kind == 'W':
+            self.cycle(e, coarse_b, k + 1, 'W')
+            self.cycle(e, coarse_b, k + 1, 'W')
+        else:
+            self.cycle(e, coarse_b, k + 1, 'F')
+            self.cycle(e, coarse_b, k + 1, 'V')
+        correction = self._prolong(k, e)
+        p[1:-1, 1:-1] += correction[1:-1, 1:-1]
+        level.smooth(p, b, self.postsmooth)
+
+    def residual_norm(self, p, b):
+        return np.linalg.norm(self.levels[0].compute_residual(p, b)[1:-1, 1:-1])
+
+    def solve(self, p, b, tol=1e-10, max_cycles=100, kind='V'):
+        """Cycle until ||b - A p|| <= tol ||b|| on the interior.
+
+        p holds the initial guess, its edges must be zero.  Returns the
+        number of cycles run and the final relative residual.
+        """
+        if kind not in CYCLES:
+            raise ValueError("unknown cycle %r, expected one of %s"
+                             % (kind, ', '.join(CYCLES)))
+        scale = np.linalg.norm(b[1:-1, 1:-1]) or 1.
+        residual = self.residual_norm(p, b) / scale
+        cycles = 0
+        while residual > tol and cycles < max_cycles:
+            self.cycle(p, b, 0, kind)
+            residual = self.residual_norm(p, b) / scale
+            cycles += 1
+        return cycles, residual
+
+
+_hierarchies = {}
+
+
+def multigrid(shape, dx, dy):
+    """Return the Multigrid of a grid, building it once per session."""
+    key = (tuple(shape), dx, dy)
+    if key not in _hierarchies:
+        _hierarchies[key] = Multigrid(shape, dx, dy)
+    return _hierarchies[key]
+
+
+def solve_2d_poisson_multigrid(p, pd, b, nx, ny, nt, dx, dy, tol=1e-10,
+                               cycle='V'):
+    """Drop-in replacement of solve_2d_poisson converging to tol.
+
+    Sets the same two point sources and edge values, then runs up to nt
+    multigrid cycles from the current p.  pd is not needed and only kept
+    for the signature.
+    """
+    b[int(ny / 4), int(nx / 4)] = 100
+    b[int(3 * ny / 4), int(3 * nx / 4)] = -100
+    p[0, :] = 0
+    p[ny - 1, :] = 0
+    p[:, 0] = 0
+    p[:, nx - 1] = 0
+    multigrid(p.shape, dx, dy).solve(p, b, tol, nt, cycle)
+    return 0
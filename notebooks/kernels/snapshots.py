@@ -0,0 +1,268 @@
+"""
+Streaming output of the fields of a run, rendered offline.
+
+A SnapshotWriter attached to a solver (the snapshots keyword of
+equations.solve_* and cavity.cavity_flow) records its fields every `every`
+steps, at the start and at the end, into an append-only store:
+
+    directory/frames.bin    the frames, each compressed with zlib
+    directory/index.jsonl   one line per frame: step, field, offset, size,
+                            shape and dtype
+
+Frames can be decimated (every stride-th cell along each axis) and
+quantized (dtype=np.float16 halves float32 and quarters float64).  The
+solver thread only takes the strided copy; compression and writes are done
+by a writer thread, behind a bounded queue so that a slow disk holds the
+solver back instead of piling frames up in memory.  A record of the index
+is written after its frame, so a killed run leaves a readable store, and a
+store is appended to when reopened, e.g. by a run restarted from a
+checkpoint; a step recorded twice keeps its last frame.
+
+SnapshotStore reads a store lazily: the index is read (and refresh reads
+the records appended since, to follow a running job) and every frame is
+only decompressed when asked for.  render draws frames one at a time with
+matplotlib as contour, surface or quiver plots, or line plots in 1D.
+
+    python -m kernels.snapshots STORE [--fields p u v] [--kind quiver]
+                                      [--output frames] [--every 10]
+
+prints the content of a store, or renders it to PNG files with --output.
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import zlib
+
+import numpy as np
+
+SNAPSHOT_EVERY = 10
+QUEUE_SIZE = 8
+KINDS = ('contourf', 'surface', 'quiver')
+
+
+class SnapshotWriter:
+    """Append-only compressed store of the fields of a run."""
+
+    def __init__(self, directory, every=SNAPSHOT_EVERY, fields=None,
+                 stride=1, dtype=None, level=1, queue_size=QUEUE_SIZE):
+        self.directory = directory
+        self.every = every
+        self.fields = fields
+        self.stride = stride
+        self.dtype = dtype
+        self.level = level
+        self.arrays = None
+        self.last = None
+        self._queue = queue.Queue(queue_size)
+        self._error = None
+        self._thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    def open(self, arrays):
+        """Bind the arrays {name: array} of the run, keeping self.fields."""
+        names = self.fields or list(arrays)
+        self.arrays = {name: arrays[name] for name in names}
+        self.last = None
+
+    def save(self, step, arrays=None):
+        """Record the bound arrays (or those given by name) at step."""
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+        if step == self.last:
+            return
+        self.last = step
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._write, daemon=True)
+            self._thread.start()
+        index = (slice(None, None, self.stride),)
+        for name, a in dict(self.arrays, **(arrays or {})).items():
+            frame = np.array(a[index * a.ndim], dtype=self.dtype or a.dtype)
+            self._queue.put((step, name, frame))
+
+    def _write(self):
+        data_path = os.path.join(self.directory, 'frames.bin')
+        index_path = os.path.join(self.directory, 'index.jsonl')
+        with open(data_path, 'ab') as data, open(index_path, 'a') as index:
+            while True:
+                item = self._queue.get()
+                try:
+                    if item is None:
+                        return
+                    step, name, frame = item
+                    packed = zlib.compress(frame.tobytes(), self.level)
+                    offset = data.seek(0, os.SEEK_END)
+                    data.write(packed)
+                    data.flush()
+                    index.write(json.dumps({
+                        'step': step, 'field': name, 'offset': offset,
+                        'size': len(packed), 'shape': frame.shape,
+                        'dtype': frame.dtype.str, 'stride': self.stride})
+                        + '\n')
+                    index.flush()
+                except Exception as error:
+                    self._error = error
+                finally:
+                    self._queue.task_done()
+
+    def wait(self):
+        """Block until every recorded frame is written."""
+        self._queue.join()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def close(self):
+        self.wait()
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SnapshotStore:
+    """Lazy reader of the store written by a SnapshotWriter."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.records = {}
+        self._position = 0
+        self.refresh()
+
+    def refresh(self):
+        """Read the index records appended since the last call."""
+        path = os.path.join(self.directory, 'index.jsonl')
+        with open(path) as f:
+            f.seek(self._position)
+            for line in f:
+                if not line.endswith('\n'):
+                    # a record being written
+                    break
+                record = json.loads(line)
+                self.records[record['step'], record['field']] = record
+                self._position += len(line)
+        return self
+
+    @property
+    def steps(self):
+        return sorted({step for step, _ in self.records})
+
+    @property
+    def fields(self):
+        return sorted({field for _, field in self.records})
+
+    def __len__(self):
+        return len(self.steps)
+
+    def frame(self, step, field):
+        record = self.records[step, field]
+        with open(os.path.join(self.directory, 'frames.bin'), 'rb') as f:
+            f.seek(record['offset'])
+            packed = f.read(record['size'])
+        return np.frombuffer(zlib.decompress(packed),
+                             dtype=record['dtype']).reshape(record['shape'])
+
+    def frames(self, field, every=1):
+        """Yield (step, frame) of field, decompressed one at a time."""
+        for step in self.steps[::every]:
+            if (step, field) in self.records:
+                yield step, self.frame(step, field)
+
+
+def _coordinates(shape, extent):
+    return [np.linspace(lo, hi, n) for n, (lo, hi) in zip(shape, extent)]
+
+
+def render(store, fields, output, kind='contourf', every=1,
+           extent=((0., 2.), (0., 2.))):
+    """Draw frames of store to output/<field>_<step>.png; return the paths.
+
+    fields is one field name, or the (u, v) or (p, u, v) fields of a quiver
+    plot, drawn over the contours of p as in the notebooks.  extent
+    gives the (low, high) coordinates of every axis (the [0, 2] square of
+    the notebooks by default); 2D arrays are indexed [y, x].
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    if isinstance(store, str):
+        store = SnapshotStore(store)
+    if isinstance(fields, str):
+        fields = (fields,)
+    if kind not in KINDS:
+        raise ValueError("unknown kind %r" % kind)
+    os.makedirs(output, exist_ok=True)
+    fig = plt.figure(figsize=(8, 6))
+    paths = []
+    for step in store.steps[::every]:
+        if any((step, f) not in store.records for f in fields):
+            continue
+        frames = [store.frame(step, f).astype(float) for f in fields]
+        fig.clf()
+        if frames[0].ndim == 1:
+            ax = fig.add_subplot()
+            x, = _coordinates(frames[0].shape, extent)
+            for name, frame in zip(fields, frames):
+                ax.plot(x, frame, label=name)
+            ax.legend()
+        else:
+            y, x = _coordinates(frames[0].shape, extent[::-1])
+            X, Y = np.meshgrid(x, y)
+            if kind == 'surface':
+                ax = fig.add_subplot(projection='3d')
+                ax.plot_surface(X, Y, frames[0], cmap='viridis')
+            else:
+                ax = fig.add_subplot()
+                background = frames[:-2] if kind == 'quiver' else frames
+                if background:
+                    contour = ax.contourf(X, Y, background[0], alpha=.5,
+                                          cmap='viridis')
+                    fig.colorbar(contour)
+                if kind == 'quiver':
+                    ax.quiver(X, Y, frames[-2], frames[-1])
+        ax.set_title('%s, step %d' % (', '.join(fields), step))
+        paths.append(os.path.join(output, '%s_%06d.png'
+                                  % ('_'.join(fields), step)))
+        fig.savefig(paths[-1])
+    plt.close(fig)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('store')
+    parser.add_argument('--fields', nargs='+')
+    parser.add_argument('--kind', choices=KINDS, default='contourf')
+    parser.add_argument('--output')
+    parser.add_argument('--every', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    store = SnapshotStore(args.store)
+    if not args.output:
+        steps = store.steps
+        print("%d frames of %s, steps %s to %s" % (
+            len(steps), ', '.join(store.fields), steps[0] if steps else '-',
+            steps[-1] if steps else '-'))
+        for field in store.fields:
+            record = store.records[max(k for k in store.records
+                                       if k[1] == field)]
+            print("  %-8s shape %s %s stride %d" % (
+                field, tuple(record['shape']), record['dtype'],
+                record['stride']))
+        return
+    fields = args.fields or store.fields[:1]
+    for path in render(store, fields, args.output, args.kind, args.every):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Direct spectral solver of the 2D Poisson equation on a uniform rectangle.
+
+The 5-point Laplacian of the notebooks (axis 0 spaced by dy, axis 1 by dx)
+is a sum of one tridiagonal matrix per axis, so it is diagonal in the basis
+of their eigenvectors.  For the boundary conditions of the notebooks those
+are discrete sine or cosine transforms:
+
+  both ends Dirichlet 0      DST-I
+  both ends Neumann (copy)   DCT-II
+
+so the discrete system is solved exactly with one forward transform, a
+division by the eigenvalues and one inverse transform, in O(N log N).  An
+axis mixing the two conditions, as the lid-driven cavity does, has no
+scipy.fft transform; its eigenvectors are computed once with eigh and
+applied as a matrix product along that axis.
+
+Boundary conditions use the format of stencil.Equation, {(axis, end):
+condition} with condition 0. or 'neumann'; a missing edge is Dirichlet.
+The unknowns are the interior cells, the edges are set from them
+afterwards.  With Neumann conditions on every edge the problem is singular:
+the constant mode of the right-hand side is dropped and the solution has a
+zero mean on the interior.
+
+Right-hand sides may be stacked as (..., ny, nx) to solve many at once.
+Solvers are cached per grid and boundary conditions, and scipy.fft keeps
+its own plan cache, so repeated calls only pay for the transforms.
+"""
+import numpy as np
+from scipy import fft
+
+DIRICHLET = {(0, 0): 0., (0, -1): 0., (1, 0): 0., (1, -1): 0.}
+
+
+def _second_difference(m, first, last):
+    """Tridiagonal 1D second difference of m unknowns with the given ends."""
+    matrix = (np.diag(np.full(m, -2.)) + np.diag(np.ones(m - 1), 1)
+              + np.diag(np.ones(m - 1), -1))
+    if first == 'neumann':
+        matrix[0, 0] += 1
+    if last == 'neumann':
+        matrix[-1, -1] += 1
+    return matrix
+
+
+class _Axis:
+    """Transform diagonalising the second difference along one axis."""
+
+    def __init__(self, n, first, last, workers):
+        m = n - 2
+        self.workers = workers
+        self.vectors = None
+        if first != 'neumann' and last != 'neumann':
+            self.kind = 'dst'
+            self.eigenvalues = -4 * np.sin(np.pi * np.arange(1, m + 1)
+                                           / (2 * (m + 1)))**2
+        elif first == 'neumann' and last == 'neumann':
+            self.kind = 'dct'
+            self.eigenvalues = -4 * np.sin(np.pi * np.arange(m) / (2 * m))**2
+        else:
+            self.kind = 'eigh'
+            self.eigenvalues, self.vectors = np.linalg.eigh(
+                _second_difference(m, first, last))
+
+    def forward(self, x, axis):
+        if self.kind == 'dst':
+            return fft.dst(x, 1, axis=axis, norm='ortho', workers=self.workers)
+        if self.kind == 'dct':
+            return fft.dct(x, 2, axis=axis, norm='ortho', workers=self.workers)
+        return np.moveaxis(np.moveaxis(x, axis, -1) @ self.vectors, -1, axis)
+
+    def backward(self, x, axis):
+        if self.kind == 'dst':
+            return fft.dst(x, 1, axis=axis, norm='ortho', workers=self.workers)
+        if self.kind == 'dct':
+            return fft.idct(x, 2, axis=axis, norm='ortho', workers=self.workers)
+        return np.moveaxis(np.moveaxis(x, axis, -1) @ self.vectors.T, -1, axis)
+
+
+def _condition(bcs, axis, end):
+    condition = bcs.get((axis, end), 0.)
+    if condition != 'neumann' and condition != 0:
+        raise ValueError("only homogeneous conditions are supported, got %r "
+                         "on edge %r" % (condition, (axis, end)))
+    return condition
+
+
+class SpectralPoisson:
+    """Exact solver of the discrete Poisson problem on one grid."""
+
+    def __init__(self, shape, dx, dy, bcs=None, workers=None):
+        bcs = DIRICHLET if bcs is None else bcs
+        self.shape = tuple(shape)
+        self.conditions = [(_condition(bcs, axis, 0), _condition(bcs, axis, -1))
+                           for axis in range(2)]
+        ny, nx = self.shape
+        self.axes = [_Axis(ny, *self.conditions[0], workers),
+                     _Axis(nx, *self.conditions[1], workers)]
+        eigenvalues = (self.axes[0].eigenvalues[:, None] / dy**2
+                       + self.axes[1].eigenvalues[None, :] / dx**2)
+        # a zero eigenvalue only comes from Neumann on every edge: drop the
+        # constant mode instead of dividing by zero
+        singular = eigenvalues == 0.
+        eigenvalues[singular] = np.inf
+        self.inverse = 1. / eigenvalues
+
+    def solve(self, f, out=None):
+        """Return p with Laplacian(p) = f on the interior of the last two axes."""
+        if out is None:
+            out = np.empty(np.shape(f))
+        x = self.axes[0].forward(f[..., 1:-1, 1:-1], -2)
+        x = self.axes[1].forward(x, -1)
+        x *= self.inverse
+        x = self.axes[1].backward(x, -1)
+        out[..., 1:-1, 1:-1] = self.axes[0].backward(x, -2)
+        self.apply_bcs(out)
+        return out
+
+    def apply_bcs(self, p):
+        for axis, (first, last) in enumerate(self.conditions):
+            edge = [Ellipsis, slice(None), slice(None)]
+            inner = list(edge)
+            for end, neighbour, condition in ((0, 1, first), (-1, -2, last)):
+                edge[axis + 1] = end
+                inner[axis + 1] = neighbour
+                p[tuple(edge)] = p[tuple(inner)] if condition == 'neumann' else 0.
+
+
+_solvers = {}
+
+
+def spectral_poisson(shape, dx, dy, bcs=None, workers=None):
+    """Return the SpectralPoisson of a grid, building it once per session."""
+    key = (tuple(shape), dx, dy, tuple(sorted((bcs or DIRICHLET).items())),
+           workers)
+    if key not in _solvers:
+        _solvers[key] = SpectralPoisson(shape, dx, dy, bcs, workers)
+    return _solvers[key]
+
+
+def solve_2d_poisson_spectral(p, pd, b, nx, ny, nt, dx, dy):
+    """Drop-in replacement of solve_2d_poisson solving the system exactly.
+
+    Sets the same two point sources and solves with p = 0 on the edges; nt
+    and pd are not needed and only kept for the signature.
+    """
+    b[int(ny / 4), int(nx / 4)] = 100
+    b[int(3 * ny / 4), int(3 * nx / 4)] = -100
+    spectral_poisson(p.shape, dx, dy).solve(b, out=p)
+    return 0
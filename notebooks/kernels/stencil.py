@@ -0,0 +1,579 @@
+"""
+Stencil-solver engine for the explicit finite-difference kernels.
+
+A PDE is described once by an Equation: its state fields, the update
+expression of every field written in the loop-body notation of the notebooks
+(un[i-1,j], vn[i,j+1], ...), the auxiliary arrays and scalar parameters it
+reads, and its boundary conditions.  From that description the engine
+generates the solver for every backend:
+
+  python  the plain loops of the *_pure notebook functions
+  numpy   the same update on array slices
+  numba   the loops compiled with @njit(fastmath=True, cache=True)
+  pyccel  the loops with a @types header, compiled with epyccel
+
+and their multithreaded builds, numba_parallel (parallel=True, the outer
+loop of every sweep over the grid a prange) and pyccel_openmp (an OpenMP
+parallel for on the same loops).  Every cell is updated from the previous
+level only, so the threads write disjoint rows and the result is that of
+the serial kernel, up to the rounding of the arithmetic fastmath lets the
+compiler order differently; the monitored change and speed become max
+reductions.
+threads.set_threads chooses the number of threads, and the batch kernels
+of compile_batch are spread over the members by every compiled backend.
+
+By default the time loop swaps the roles of a field and its old level at
+every step (ping-pong buffers) rather than copying the field before each
+update; mode='copy' generates the copying loop of the notebooks.
+
+The generated source is written once to CACHE_DIR under a name derived
+from its hash and imported from there, so Numba can cache its machine code
+between sessions, pyccel kernels go through the extension cache of
+compile_cache, and every compiled kernel is kept for the rest of the
+session.
+
+The interior range of every axis follows from the stencil offsets: an
+update reading un[i-1] and un[i+1] runs over range(1, n-1), one reading
+only un[i-1] over range(1, n).  Cells outside it are only changed by the
+boundary conditions, given per field as {(axis, end): condition} with end 0
+or -1 and condition either a number (Dirichlet value) or 'neumann' (copy
+of the neighbouring cell).
+"""
+import hashlib
+import importlib.util
+import os
+import re
+import sys
+from functools import partial
+
+BACKENDS = ('python', 'numpy', 'numba', 'pyccel', 'numba_parallel',
+            'pyccel_openmp')
+# the serial backend of each parallel one, and the way its loops are spread
+PARALLEL = {'numba_parallel': ('numba', 'prange'),
+            'pyccel_openmp': ('pyccel', 'omp')}
+MODES = ('pingpong', 'copy')
+INDICES = ('i', 'j')
+
+CACHE_DIR = os.environ.get(
+    'STENCIL_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '__stencil__'))
+
+_ACCESS = re.compile(r'\b([A-Za-z_]\w*)\[([^\[\]]+)\]')
+_INDEX = re.compile(r'^\s*([a-z])\s*(?:([+-])\s*(\d+))?\s*$')
+
+
+class Equation:
+    """Description of one explicit stencil update.
+
+    fields are the names of the state arrays, or (name, old name) pairs when
+    the previous time level is not called name + 'n'.  updates maps every
+    field to its update expression, which may read the previous level of
+    the fields and the aux arrays, but not the fields being written.
+    """
+
+    def __init__(self, name, ndim, fields, updates, params=(), aux=(),
+                 bcs=None):
+        self.name = name
+        self.ndim = ndim
+        self.fields = [(f, f + 'n') if isinstance(f, str) else tuple(f)
+                       for f in fields]
+        self.updates = dict(updates)
+        self.params = tuple(params)
+        self.aux = tuple(aux)
+        self.bcs = dict(bcs or {})
+        self.lower, self.upper = self._extent()
+
+    @property
+    def arrays(self):
+        return [name for field in self.fields for name in field] + list(self.aux)
+
+    @property
+    def arguments(self):
+        return self.arrays + ['nt'] + list(self.params)
+
+    def _extent(self):
+        new = {field for field, _ in self.fields}
+        readable = {old for _, old in self.fields} | set(self.aux)
+        lower = [0] * self.ndim
+        upper = [0] * self.ndim
+        for field, _ in self.fields:
+            if field not in self.updates:
+                raise ValueError("%s: no update for field %r" % (self.name, field))
+        for expression in self.updates.values():
+            for array, offsets in accesses(expression, self.ndim):
+                if array in new:
+                    raise ValueError("%s: update reads the new level of %r"
+                                     % (self.name, array))
+                if array not in readable:
+                    raise ValueError("%s: unknown array %r" % (self.name, array))
+                for axis, offset in enumerate(offsets):
+                    lower[axis] = max(lower[axis], -offset)
+                    upper[axis] = max(upper[axis], offset)
+        return tuple(lower), tuple(upper)
+
+
+def accesses(expression, ndim):
+    """Yield (array, offsets) for every indexed access of the expression."""
+    for match in _ACCESS.finditer(expression):
+        components = match.group(2).split(',')
+        if len(components) != ndim:
+            raise ValueError("bad access %r for %dD" % (match.group(0), ndim))
+        offsets = []
+        for axis, component in enumerate(components):
+            index = _INDEX.match(component)
+            if index is None or index.group(1) != INDICES[axis]:
+                raise ValueError("bad index %r in %r" % (component, match.group(0)))
+            offset = int(index.group(3) or 0)
+            offsets.append(-offset if index.group(2) == '-' else offset)
+        yield match.group(1), tuple(offsets)
+
+
+def _dims(eq):
+    first = eq.fields[0][0]
+    return ['    n%d = %s.shape[%d]' % (axis, first, axis)
+            for axis in range(eq.ndim)]
+
+
+def _rename(expression, names):
+    """Replace the arrays of the accesses of expression following names."""
+    return _ACCESS.sub(lambda m: '%s[%s]' % (names.get(m.group(1), m.group(1)),
+                                              m.group(2)), expression)
+
+
+def _targets(eq, swapped):
+    """Return [(written array, update expression)] of one time step.
+
+    A plain step writes the fields from their old level; a swapped step
+    writes the old-level arrays from the fields.
+    """
+    if not swapped:
+        return [(field, eq.updates[field]) for field, _ in eq.fields]
+    names = {old: field for field, old in eq.fields}
+    return [(old, _rename(eq.updates[field], names)) for field, old in eq.fields]
+
+
+def _bc_lines(eq, indent, swapped=False):
+    arrays = dict(eq.fields) if swapped else {}
+    lines = []
+    for field, conditions in eq.bcs.items():
+        field = arrays.get(field, field)
+        for (axis, end), condition in conditions.items():
+            edge = '0' if end == 0 else 'n%d-1' % axis
+            inner = '1' if end == 0 else 'n%d-2' % axis
+            index = [':'] * eq.ndim
+            index[axis] = edge
+            target = '%s[%s]' % (field, ','.join(index))
+            if condition == 'neumann':
+                index[axis] = inner
+                value = '%s[%s]' % (field, ','.join(index))
+            else:
+                value = repr(float(condition))
+            lines.append('%s%s = %s' % (indent, target, value))
+    return lines
+
+
+def _for(indent, axis, bounds, threads=None, reduction=None):
+    """Header of the loop over axis, spread over threads if it is the
+    outer one, with reduction the variable of a max reduction."""
+    if threads is None or axis > 0:
+        return ['%sfor %s in range(%s):' % (indent, INDICES[axis], bounds)]
+    if threads == 'prange':
+        return ['%sfor %s in prange(%s):' % (indent, INDICES[axis], bounds)]
+    pragma = '%s#$ omp parallel for' % indent
+    if reduction:
+        pragma += ' reduction(max:%s)' % reduction
+    return [pragma, '%sfor %s in range(%s):' % (indent, INDICES[axis], bounds)]
+
+
+def _loop_copy(eq, pairs, indent, threads=None):
+    index = ','.join(INDICES[:eq.ndim])
+    lines = []
+    for axis in range(eq.ndim):
+        lines += _for(indent, axis, 'n%d' % axis, threads)
+        indent += '    '
+    for target, source in pairs:
+        lines.append('%s%s[%s] = %s[%s]' % (indent, target, index, source, index))
+    return lines
+
+
+def _loop_step(eq, indent, swapped=False, speed=False, threads=None):
+    index = ','.join(INDICES[:eq.ndim])
+    lines = ['%sspeed = 0.' % indent] if speed else []
+    inner = indent
+    for axis in range(eq.ndim):
+        lines += _for(inner, axis, '%d, n%d-%d' % (eq.lower[axis], axis,
+                                                   eq.upper[axis]),
+                      threads, 'speed' if speed else None)
+        inner += '    '
+    for target, expression in _targets(eq, swapped):
+        lines.append('%s%s[%s] = %s' % (inner, target, index, expression))
+        if speed and threads:
+            lines.append('%sspeed = max(speed, abs(%s[%s]))'
+                         % (inner, target, index))
+        elif speed:
+            # fused with the update, while the value is still in a register
+            lines += ['%sdelta = abs(%s[%s])' % (inner, target, index),
+                      '%sif delta > speed:' % inner,
+                      '%s    speed = delta' % inner]
+    return lines + _bc_lines(eq, indent, swapped)
+
+
+def _slice(eq, axis, offset):
+    start = eq.lower[axis] + offset
+    stop = offset - eq.upper[axis]
+    if stop == 0:
+        return '%d:n%d' % (start, axis)
+    return '%d:n%d%+d' % (start, axis, stop)
+
+
+def _region_slice(eq, axis, offset):
+    if offset == 0:
+        return '%s0:%s1' % (INDICES[axis], INDICES[axis])
+    return '%s0%+d:%s1%+d' % (INDICES[axis], offset, INDICES[axis], offset)
+
+
+def vectorize(eq, expression, slicer=_slice):
+    """Rewrite the point accesses of expression as slices of the interior,
+    or of the region given by slicer."""
+    def replace(match):
+        offsets = next(accesses(match.group(0), eq.ndim))[1]
+        slices = [slicer(eq, axis, offset) for axis, offset in enumerate(offsets)]
+        return '%s[%s]' % (match.group(1), ', '.join(slices))
+    return _ACCESS.sub(replace, expression)
+
+
+def _numpy_copy(eq, pairs, indent):
+    return ['%snp.copyto(%s, %s)' % (indent, target, source)
+            for target, source in pairs]
+
+
+def _numpy_step(eq, indent, swapped=False, speed=False):
+    interior = ', '.join(_slice(eq, axis, 0) for axis in range(eq.ndim))
+    lines = ['%s%s[%s] = %s' % (indent, target, interior, vectorize(eq, expression))
+             for target, expression in _targets(eq, swapped)]
+    if speed:
+        lines += ['%sspeed = 0.' % indent] + [
+            '%sspeed = max(speed, float(np.abs(%s[%s]).max()))'
+            % (indent, target, interior) for target, _ in _targets(eq, swapped)]
+    return lines + _bc_lines(eq, indent, swapped)
+
+
+def _loop_change(eq, indent, threads=None):
+    index = ','.join(INDICES[:eq.ndim])
+    lines = ['%schange = 0.' % indent]
+    for axis in range(eq.ndim):
+        lines += _for(indent, axis, 'n%d' % axis, threads, 'change')
+        indent += '    '
+    for field, old in eq.fields:
+        if threads:
+            lines.append('%schange = max(change, abs(%s[%s] - %s[%s]))'
+                         % (indent, field, index, old, index))
+            continue
+        lines += ['%sdelta = abs(%s[%s] - %s[%s])' % (indent, field, index, old,
+                                                      index),
+                  '%sif delta > change:' % indent,
+                  '%s    change = delta' % indent]
+    return lines
+
+
+def _numpy_change(eq, indent):
+    return ['%schange = 0.' % indent] + [
+        '%schange = max(change, float(np.abs(%s - %s).max()))'
+        % (indent, field, old) for field, old in eq.fields]
+
+
+def _body(eq, copy, step, mode, change=None, speed=False):
+    """Time loop of the kernel.
+
+    In 'copy' mode every step first copies the fields to their old level.
+    In 'pingpong' mode the fields and their old level swap roles at every
+    step instead: one copy up front makes the cells no step writes equal in
+    both arrays, and after an odd number of steps the result is copied back.
+
+    With change, the largest absolute change of the fields during the last
+    step is computed from the two levels before the copy back.  With speed,
+    every step also computes the largest absolute value it writes on the
+    interior, in the same loop as the update.
+    """
+    to_old = [(old, field) for field, old in eq.fields]
+    monitor = change(eq, '    ') if change else []
+    lines = ['    speed = 0.'] if speed else []
+    if mode == 'copy':
+        return (lines + ['    for step in range(nt):']
+                + copy(eq, to_old, '        ')
+                + step(eq, '        ', speed=speed) + monitor)
+    if mode == 'pingpong':
+        lines += (copy(eq, to_old, '    ')
+                  + ['    for step in range(nt // 2):']
+                  + step(eq, '        ', swapped=True, speed=speed)
+                  + step(eq, '        ', speed=speed)
+                  + ['    if nt % 2 == 1:']
+                  + step(eq, '        ', swapped=True, speed=speed))
+        if monitor:
+            lines += monitor + ['    if nt % 2 == 1:']
+        return lines + copy(eq, [(field, old) for old, field in to_old],
+                            '        ')
+    raise ValueError("unknown mode %r, expected one of %s"
+                     % (mode, ', '.join(MODES)))
+
+
+def _return(monitor, speed):
+    if monitor and speed:
+        raise ValueError("a kernel returns either the change or the speed")
+    if monitor:
+        return '    return change'
+    return '    return speed' if speed else '    return 0'
+
+
+def _loop_source(eq, header, mode, monitor, speed, threads=None):
+    lines = header + ['def %s(%s):' % (eq.name, ', '.join(eq.arguments))]
+    lines += _dims(eq)
+    copy, step, change = _loop_copy, _loop_step, _loop_change
+    if threads:
+        copy, step, change = (partial(f, threads=threads)
+                              for f in (copy, step, change))
+    lines += _body(eq, copy, step, mode, change if monitor else None, speed)
+    lines.append(_return(monitor, speed))
+    return lines
+
+
+def _numpy_source(eq, mode, monitor, speed):
+    lines = ['import numpy as np', '', '',
+             'def %s(%s):' % (eq.name, ', '.join(eq.arguments))]
+    lines += _dims(eq)
+    lines += _body(eq, _numpy_copy, _numpy_step, mode,
+                   _numpy_change if monitor else None, speed)
+    lines.append(_return(monitor, speed))
+    return lines
+
+
+def _pyccel_types(eq):
+    array = "'float[%s]'" % ','.join([':'] * eq.ndim)
+    return ([array] * len(eq.arrays) + ["'int'"]
+            + ["'float'"] * len(eq.params))
+
+
+def generate_source(eq, backend, mode='pingpong', monitor=False, speed=False):
+    if backend == 'python':
+        lines = _loop_source(eq, [], mode, monitor, speed)
+    elif backend == 'numpy':
+        lines = _numpy_source(eq, mode, monitor, speed)
+    elif backend == 'numba':
+        lines = _loop_source(eq, ['from numba import njit', '', '',
+                                  '@njit(fastmath=True, cache=True)'], mode,
+                             monitor, speed)
+    elif backend == 'pyccel':
+        lines = _loop_source(eq, ['from pyccel.decorators import types', '', '',
+                                  '@types(%s)' % ', '.join(_pyccel_types(eq))],
+                             mode, monitor, speed)
+    elif backend == 'numba_parallel':
+        lines = _loop_source(eq, ['from numba import njit, prange', '', '',
+                                  '@njit(fastmath=True, cache=True, '
+                                  'parallel=True)'], mode, monitor, speed,
+                             'prange')
+    elif backend == 'pyccel_openmp':
+        lines = _loop_source(eq, ['from pyccel.decorators import types', '', '',
+                                  '@types(%s)' % ', '.join(_pyccel_types(eq))],
+                             mode, monitor, speed, 'omp')
+    else:
+        raise ValueError("unknown backend %r, expected one of %s"
+                         % (backend, ', '.join(BACKENDS)))
+    return '\n'.join(lines) + '\n'
+
+
+def _load(source, module_name):
+    """Write source to CACHE_DIR (once) and import it as module_name."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, module_name + '.py')
+    if not os.path.exists(path):
+        tmp = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp, 'w') as f:
+            f.write(source)
+        os.replace(tmp, path)
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    # Numba looks the module up by name when it loads a cached kernel
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+_kernels = {}
+
+
+def compile_equation(eq, backend='numpy', mode='pingpong', monitor=False,
+                     speed=False):
+    """Return the kernel of eq for backend, generating and compiling it once.
+
+    The kernel takes eq.arguments: the arrays, nt, then the parameters.  In
+    both modes the result is left in the field arrays; in 'pingpong' mode
+    the old-level arrays hold an intermediate step instead of step nt-1.
+    The kernel returns 0, or with monitor the largest absolute change of a
+    field over the last step, or with speed the largest absolute value the
+    last step wrote on the interior, both computed inside the kernel.
+    """
+    key = (eq, backend, mode, monitor, speed)
+    if key not in _kernels:
+        source = generate_source(eq, backend, mode, monitor, speed)
+        digest = hashlib.sha1(source.encode()).hexdigest()[:12]
+        module = _load(source, '%s_%s_%s' % (eq.name, backend, digest))
+        kernel = getattr(module, eq.name)
+        if backend == 'pyccel':
+            from .compile_cache import cached_epyccel
+            kernel = cached_epyccel(kernel)
+        elif backend == 'pyccel_openmp':
+            from .compile_cache import cached_epyccel
+            kernel = cached_epyccel(kernel, accelerator='openmp')
+        _kernels[key] = kernel
+    return _kernels[key]
+
+
+def _batch_lines(eq, lines, member):
+    """Index the arrays of the 1D kernel lines by member first."""
+    arrays = set(eq.arrays)
+
+    def replace(match):
+        if match.group(1) not in arrays:
+            return match.group(0)
+        return '%s[%s, %s]' % (match.group(1), member, match.group(2))
+    return [_ACCESS.sub(replace, line) for line in lines]
+
+
+def batch_source(eq, backend, mode='pingpong'):
+    """Source of the kernel of a 1D eq advancing a batch of members at once.
+
+    The arrays are (batch, nx), one member per row, and every parameter is
+    an array of one value per member.  The loop backends run one member at
+    a time through all nt steps, so the two rows it works on stay in cache,
+    and spread the members over threads (numba prange, an OpenMP pragma for
+    pyccel); numpy updates every member at once on slices of the batch.
+    """
+    if eq.ndim != 1:
+        raise ValueError("%s: batches are of 1D equations" % eq.name)
+    # the members are spread over threads by every compiled backend
+    backend = PARALLEL.get(backend, (backend,))[0]
+    name = eq.name + '_batch'
+    first = eq.fields[0][0]
+    lines = ['def %s(%s):' % (name, ', '.join(eq.arguments)),
+             '    n0 = %s.shape[1]' % first]
+    if backend == 'numpy':
+        lines = ['import numpy as np', '', ''] + lines
+        lines += ['    %s = np.reshape(%s, (-1, 1))' % (param, param)
+                  for param in eq.params]
+        body = _body(eq, _numpy_copy, _numpy_step, mode)
+        return '\n'.join(lines + _batch_lines(eq, body, ':')
+                         + ['    return 0']) + '\n'
+    members = 'range(nb)'
+    if backend == 'numba':
+        lines = ['from numba import njit, prange', '', '',
+                 '@njit(fastmath=True, cache=True, parallel=True)'] + lines
+        members = 'prange(nb)'
+    elif backend == 'pyccel':
+        types = (["'float[:,:]'"] * len(eq.arrays) + ["'int'"]
+                 + ["'float[:]'"] * len(eq.params))
+        lines = ['from pyccel.decorators import types', '', '',
+                 '@types(%s)' % ', '.join(types)] + lines
+    elif backend != 'python':
+        raise ValueError("unknown backend %r, expected one of %s"
+                         % (backend, ', '.join(BACKENDS)))
+    lines.append('    nb = %s.shape[0]' % first)
+    if backend == 'pyccel':
+        private = ', '.join(param + '_m' for param in eq.params)
+        lines.append('    #$ omp parallel for%s' % (
+            ' private(%s)' % private if private else ''))
+    lines.append('    for m in %s:' % members)
+    lines += ['        %s_m = %s[m]' % (param, param) for param in eq.params]
+    body = _batch_lines(eq, _body(eq, _loop_copy, _loop_step, mode), 'm')
+    if eq.params:
+        scalar = re.compile(r'\b(%s)\b' % '|'.join(map(re.escape, eq.params)))
+        body = [scalar.sub(r'\1_m', line) for line in body]
+    lines += ['    ' + line for line in body]
+    return '\n'.join(lines + ['    return 0']) + '\n'
+
+
+def compile_batch(eq, backend='numpy', mode='pingpong'):
+    """Return the batch kernel of the 1D eq for backend (see batch_source).
+
+    It takes the same arguments as the kernel of compile_equation, with
+    (batch, nx) arrays and parameters of one value per member.
+    """
+    backend = PARALLEL.get(backend, (backend,))[0]
+    key = (eq, 'batch-' + backend, mode, False, False)
+    if key not in _kernels:
+        source = batch_source(eq, backend, mode)
+        digest = hashlib.sha1(source.encode()).hexdigest()[:12]
+        module = _load(source, '%s_batch_%s_%s' % (eq.name, backend, digest))
+        kernel = getattr(module, eq.name + '_batch')
+        if backend == 'pyccel':
+            from .compile_cache import cached_epyccel
+            kernel = cached_epyccel(kernel, accelerator='openmp')
+        _kernels[key] = kernel
+    return _kernels[key]
+
+
+def region_source(eq, backend='numpy'):
+    """Source of one step of eq restricted to a region of the arrays.
+
+    The step takes the arrays and parameters of eq followed by the bounds
+    i0, i1[, j0, j1] of the cells to update, and applies no boundary
+    condition.  Passing every (field, old) pair swapped runs the step in the
+    other direction, which is how callers ping-pong the buffers.  numpy
+    updates slices of the region, the other backends loop over it with the
+    header of their generate_source kernel.
+    """
+    bounds = ['%s0, %s1' % (index, index) for index in INDICES[:eq.ndim]]
+    arguments = eq.arrays + list(eq.params) + bounds
+    header = 'def %s_region(%s):' % (eq.name, ', '.join(arguments))
+    if backend == 'numpy':
+        region = ', '.join(_region_slice(eq, axis, 0)
+                           for axis in range(eq.ndim))
+        lines = [header]
+        for field, _ in eq.fields:
+            lines.append('    %s[%s] = %s' % (field, region, vectorize(
+                eq, eq.updates[field], _region_slice)))
+        lines.append('    return 0')
+        return '\n'.join(lines) + '\n'
+    serial, threads = PARALLEL.get(backend, (backend, None))
+    if serial == 'python':
+        lines = []
+    elif serial == 'numba':
+        lines = ['from numba import njit%s' % (', prange' if threads else ''),
+                 '', '', '@njit(fastmath=True, cache=True%s)'
+                 % (', parallel=True' if threads else '')]
+    elif serial == 'pyccel':
+        types = _pyccel_types(eq)
+        types = (types[:len(eq.arrays)] + types[len(eq.arrays) + 1:]
+                 + ["'int'"] * (2 * eq.ndim))
+        lines = ['from pyccel.decorators import types', '', '',
+                 '@types(%s)' % ', '.join(types)]
+    else:
+        raise ValueError("unknown backend %r, expected one of %s"
+                         % (backend, ', '.join(BACKENDS)))
+    lines.append(header)
+    indent = '    '
+    for axis, index in enumerate(INDICES[:eq.ndim]):
+        lines += _for(indent, axis, '%s0, %s1' % (index, index), threads)
+        indent += '    '
+    index = ','.join(INDICES[:eq.ndim])
+    for target, expression in _targets(eq, False):
+        lines.append('%s%s[%s] = %s' % (indent, target, index, expression))
+    lines.append('    return 0')
+    return '\n'.join(lines) + '\n'
+
+
+def compile_region_step(eq, backend='numpy'):
+    """Return the region step of eq for backend (see region_source)."""
+    key = (eq, 'region-' + backend, None, False, False)
+    if key not in _kernels:
+        source = region_source(eq, backend)
+        digest = hashlib.sha1(source.encode()).hexdigest()[:12]
+        module = _load(source, '%s_region_%s_%s' % (eq.name, backend, digest))
+        kernel = getattr(module, eq.name + '_region')
+        if backend == 'pyccel':
+            from .compile_cache import cached_epyccel
+            kernel = cached_epyccel(kernel)
+        elif backend == 'pyccel_openmp':
+            from .compile_cache import cached_epyccel
+            kernel = cached_epyccel(kernel, accelerator='openmp')
+        _kernels[key] = kernel
+    return _kernels[key]
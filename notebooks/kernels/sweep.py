@@ -0,0 +1,420 @@
+"""
+Parameter sweeps of the solvers.
+
+    python -m kernels.sweep burger_2d --grid nx=31,61,121 nu=.01,.05
+                            [--backend numba] [--workers 4] [--cache sweeps]
+                            [--output burger.npz]
+    mpirun -n 4 python -m kernels.sweep ... --mpi
+
+The notebooks explore their parameters by hand ("nx = 81 #change to 83, 85,
+91" in 1D_LinearConvectionCFL.ipynb).  A Problem wraps one solver with the
+parameters of its notebook as defaults and builds its initial state, so
+that a case is only a dict of the parameters that change.  The time step
+is either given as dt or derived from the CFL number sigma as in the
+notebook (e.g. dt = sigma * dx / c); dt wins when both are set.
+
+sweep runs every case of a grid, the product of the values given for each
+parameter or an explicit list of cases:
+
+  - on the workers of a ProcessPoolExecutor, each of which loads the
+    compiled kernels of the problem once when it starts (build.build), or
+  - given an MPI communicator, on its ranks, every rank taking every
+    size-th case left to run; the rows are then allgathered.
+
+Every finished case is stored in the cache directory as
+<problem>/<key>.npz, with its final fields and its row, where key is a hash
+of the problem, backend and parameters: a sweep run again, extended or
+interrupted only runs the cases missing from the cache.
+
+The result is a table of columns, {name: numpy array} with one entry per
+case in grid order: the parameters, the wall time of the case, whether the
+fields stayed finite, and the min, max and mean of every field.  save
+writes it as a compressed .npz or as CSV.
+"""
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import cavity, equations
+from .build import build
+
+CACHE_DIR = 'sweeps'
+
+
+class Problem:
+    """One solver, the defaults of its notebook and its compiled kernels.
+
+    run(backend, **parameters) builds the initial state, calls the solver
+    and returns its final fields {name: array}; kernels lists the
+    (equation, mode, monitor) of the kernels it calls.
+    """
+
+    def __init__(self, name, defaults, run, kernels):
+        self.name = name
+        self.defaults = defaults
+        self.run = run
+        self.kernels = kernels
+
+    def parameters(self, case):
+        unknown = set(case) - set(self.defaults)
+        if unknown:
+            raise ValueError("%s has no parameter %s (it takes %s)" % (
+                self.name, ', '.join(sorted(unknown)),
+                ', '.join(self.defaults)))
+        return dict(self.defaults, **case)
+
+
+def _hat_1d(nx, dx):
+    u = np.ones(nx)
+    u[int(.5 / dx):int(1 / dx + 1)] = 2
+    return u
+
+
+def _sawtooth(x, nu):
+    """u(t=0) = -2 nu phi'/phi + 4 of 1D_Burger.ipynb, without overflow."""
+    a = -x**2 / (4 * nu)
+    b = -(x - 2 * np.pi)**2 / (4 * nu)
+    top = np.maximum(a, b)
+    ea, eb = np.exp(a - top), np.exp(b - top)
+    return (x * ea + (x - 2 * np.pi) * eb) / (ea + eb) + 4
+
+
+def _grid(nx, ny, hat=True):
+    u = np.ones((ny, nx))
+    if hat:
+        equations.hat(u, 2 / (nx - 1), 2 / (ny - 1))
+    return u, np.ones((ny, nx))
+
+
+def _linearconv_1d(backend, nx, nt, c, sigma, dt):
+    dx = 2 / (nx - 1)
+    dt = dt or sigma * dx / abs(c)
+    u = _hat_1d(nx, dx)
+    equations.solve_1d_linearconv(u, np.ones(nx), nt, nx, dt, dx, c, backend)
+    return {'u': u}
+
+
+def _nonlinearconv_1d(backend, nx, nt, sigma, dt):
+    dx = 2 / (nx - 1)
+    dt = dt or sigma * dx
+    u = _hat_1d(nx, dx)
+    equations.solve_1d_nonlinearconv(u, np.ones(nx), nt, nx, dt, dx, backend)
+    return {'u': u}
+
+
+def _diff_1d(backend, nx, nt, nu, sigma, dt):
+    dx = 2 / (nx - 1)
+    dt = dt or sigma * dx**2 / nu
+    u = _hat_1d(nx, dx)
+    equations.solve_1d_diff(u, np.ones(nx), nt, nx, dt, dx, nu, backend)
+    return {'u': u}
+
+
+def _burger_1d(backend, nx, nt, nu, sigma, dt):
+    dx = 2 * np.pi / (nx - 1)
+    dt = dt or sigma * dx * nu
+    u = _sawtooth(np.linspace(0, 2 * np.pi, nx), nu)
+    equations.solve_1d_burger(u, np.empty(nx), nt, nx, dt, dx, nu, backend)
+    return {'u': u}
+
+
+def _linearconv_2d(backend, nx, ny, nt, c, sigma, dt):
+    dx, dy = 2 / (nx - 1), 2 / (ny - 1)
+    dt = dt or sigma * dx
+    u, un = _grid(nx, ny)
+    equations.solve_2d_linearconv(u, un, nt, dt, dx, dy, c, backend)
+    return {'u': u}
+
+
+def _nonlinearconv_2d(backend, nx, ny, nt, c, sigma, dt):
+    dx, dy = 2 / (nx - 1), 2 / (ny - 1)
+    dt = dt or sigma * dx
+    (u, un), (v, vn) = _grid(nx, ny, False), _grid(nx, ny, False)
+    equations.solve_2d_nonlinearconv(u, un, v, vn, nt, dt, dx, dy, c, backend)
+    return {'u': u, 'v': v}
+
+
+def _diff_2d(backend, nx, ny, nt, nu, sigma, dt):
+    dx, dy = 2 / (nx - 1), 2 / (ny - 1)
+    dt = dt or sigma * dx * dy / nu
+    u, un = _grid(nx, ny, False)
+    equations.solve_2d_diff(u, un, nt, dt, dx, dy, nu, backend)
+    return {'u': u}
+
+
+def _burger_2d(backend, nx, ny, nt, nu, sigma, dt):
+    dx, dy = 2 / (nx - 1), 2 / (ny - 1)
+    dt = dt or sigma * dx * dy / nu
+    (u, un), (v, vn) = _grid(nx, ny, False), _grid(nx, ny, False)
+    equations.solve_2d_burger(u, un, v, vn, nt, dt, dx, dy, nu, backend)
+    return {'u': u, 'v': v}
+
+
+def _poisson_2d(backend, nx, ny, nt, xmax, ymax, tol):
+    dx, dy = xmax / (nx - 1), ymax / (ny - 1)
+    p, pd, b = np.zeros((ny, nx)), np.zeros((ny, nx)), np.zeros((ny, nx))
+    equations.solve_2d_poisson(p, pd, b, nx, ny, nt, dx, dy, backend, tol)
+    return {'p': p}
+
+
+def _cavity_flow(backend, nx, ny, nt, dt, rho, nu, nit, tol, steady_tol):
+    dx, dy = 2 / (nx - 1), 2 / (ny - 1)
+    u, v, p = np.zeros((ny, nx)), np.zeros((ny, nx)), np.zeros((ny, nx))
+    cavity.cavity_flow(nt, u, v, dt, nx, ny, dx, dy, p, rho, nu, nit, tol,
+                       steady_tol, backend)
+    return {'u': u, 'v': v, 'p': p}
+
+
+def _pingpong(eq):
+    return [(eq, 'pingpong', False)]
+
+
+PROBLEMS = {problem.name: problem for problem in [
+    Problem('linearconv_1d',
+            {'nx': 201, 'nt': 200, 'c': 1., 'sigma': .4, 'dt': None},
+            _linearconv_1d, _pingpong(equations.LINEARCONV_1D)),
+    Problem('nonlinearconv_1d', {'nx': 41, 'nt': 10, 'sigma': .02, 'dt': None},
+            _nonlinearconv_1d, _pingpong(equations.NONLINEARCONV_1D)),
+    Problem('diff_1d',
+            {'nx': 501, 'nt': 1500, 'nu': .3, 'sigma': .5, 'dt': None},
+            _diff_1d, _pingpong(equations.DIFF_1D)),
+    Problem('burger_1d',
+            {'nx': 201, 'nt': 100, 'nu': .07, 'sigma': 1., 'dt': None},
+            _burger_1d, _pingpong(equations.BURGER_1D)),
+    Problem('linearconv_2d',
+            {'nx': 101, 'ny': 101, 'nt': 100, 'c': 1., 'sigma': .2,
+             'dt': None},
+            _linearconv_2d, _pingpong(equations.LINEARCONV_2D)),
+    Problem('nonlinearconv_2d',
+            {'nx': 101, 'ny': 101, 'nt': 80, 'c': 1., 'sigma': .2,
+             'dt': None},
+            _nonlinearconv_2d, _pingpong(equations.NONLINEARCONV_2D)),
+    Problem('diff_2d',
+            {'nx': 101, 'ny': 101, 'nt': 51, 'nu': .05, 'sigma': .25,
+             'dt': None},
+            _diff_2d, _pingpong(equations.DIFF_2D)),
+    Problem('burger_2d',
+            {'nx': 31, 'ny': 31, 'nt': 120, 'nu': .01, 'sigma': .0009,
+             'dt': None},
+            _burger_2d, _pingpong(equations.BURGER_2D)),
+    Problem('poisson_2d',
+            {'nx': 50, 'ny': 50, 'nt': 100, 'xmax': 2., 'ymax': 1.,
+             'tol': None},
+            _poisson_2d, [(equations.POISSON_2D, 'pingpong', False),
+                          (equations.POISSON_2D, 'pingpong', True)]),
+    Problem('cavity_flow',
+            {'nx': 41, 'ny': 41, 'nt': 500, 'dt': .001, 'rho': 1., 'nu': .1,
+             'nit': 50, 'tol': 1e-4, 'steady_tol': 0.},
+            _cavity_flow, [(cavity.VELOCITY, 'copy', True),
+                           (cavity.SOURCE, 'copy', False),
+                           (cavity.PRESSURE, 'copy', True)]),
+]}
+
+
+def expand(grid):
+    """Cases of grid: a list of cases, or {parameter: values} whose product
+    is taken in order, the last parameter varying fastest."""
+    if not isinstance(grid, dict):
+        return [dict(case) for case in grid]
+    names = list(grid)
+    values = [np.asarray(v).tolist() if isinstance(v, np.ndarray)
+              else v if isinstance(v, (list, tuple)) else [v]
+              for v in grid.values()]
+    return [dict(zip(names, combination))
+            for combination in itertools.product(*values)]
+
+
+def case_key(problem, backend, parameters):
+    text = json.dumps([problem, backend, parameters], sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def _cache_path(cache, problem, key):
+    return os.path.join(cache, problem, key + '.npz')
+
+
+def load(cache, problem, backend, parameters):
+    """Row of a finished case, or None if it is not in the cache."""
+    path = _cache_path(cache, problem, case_key(problem, backend, parameters))
+    try:
+        with np.load(path) as data:
+            return json.loads(str(data['row']))
+    except FileNotFoundError:
+        return None
+
+
+def load_fields(cache, problem, backend, parameters):
+    """Final fields {name: array} of a finished case."""
+    path = _cache_path(cache, problem, case_key(problem, backend, parameters))
+    with np.load(path) as data:
+        return {name[6:]: data[name] for name in data.files
+                if name.startswith('field_')}
+
+
+def _initialize(problem, backend):
+    """Load the compiled kernels of problem once per worker."""
+    for eq, mode, monitor in PROBLEMS[problem].kernels:
+        build(backend, eq, mode, monitor, False)
+
+
+def run_case(problem, backend, parameters, cache=None):
+    """Run one case; return its row, after storing it in cache if given."""
+    start = time.perf_counter()
+    fields = PROBLEMS[problem].run(backend, **parameters)
+    seconds = time.perf_counter() - start
+    key = case_key(problem, backend, parameters)
+    row = dict(parameters, problem=problem, backend=backend, key=key,
+               seconds=seconds,
+               finite=all(bool(np.isfinite(a).all()) for a in fields.values()))
+    with np.errstate(all='ignore'):
+        for name, a in fields.items():
+            row[name + '_min'] = float(a.min())
+            row[name + '_max'] = float(a.max())
+            row[name + '_mean'] = float(a.mean())
+    if cache is not None:
+        path = _cache_path(cache, problem, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # written under another name first, so a killed run leaves no
+        # truncated case behind
+        temporary = path[:-4] + '.tmp.npz'
+        np.savez_compressed(temporary, row=json.dumps(row),
+                            **{'field_' + n: a for n, a in fields.items()})
+        os.replace(temporary, path)
+    return row
+
+
+def _run_star(args):
+    return run_case(*args)
+
+
+def sweep(problem, grid, backend='numpy', workers=None, cache=CACHE_DIR,
+          comm=None):
+    """Run problem over the cases of grid; return their table.
+
+    workers is the number of processes of the pool (os.cpu_count() by
+    default, 1 runs in this process); with comm the ranks share the cases
+    instead.  cache=None disables the cache.
+    """
+    cases = [PROBLEMS[problem].parameters(case) for case in expand(grid)]
+    rows = [None if cache is None else load(cache, problem, backend, case)
+            for case in cases]
+    todo = [i for i, row in enumerate(rows) if row is None]
+    if comm is not None:
+        mine = todo[comm.Get_rank()::comm.Get_size()]
+        if mine:
+            _initialize(problem, backend)
+        done = {i: run_case(problem, backend, cases[i], cache) for i in mine}
+        for part in comm.allgather(done):
+            for i, row in part.items():
+                rows[i] = row
+    elif todo and (workers == 1 or len(todo) == 1):
+        _initialize(problem, backend)
+        for i in todo:
+            rows[i] = run_case(problem, backend, cases[i], cache)
+    elif todo:
+        with ProcessPoolExecutor(min(workers or os.cpu_count(), len(todo)),
+                                 initializer=_initialize,
+                                 initargs=(problem, backend)) as pool:
+            done = pool.map(_run_star, [(problem, backend, cases[i], cache)
+                                        for i in todo])
+            for i, row in zip(todo, done):
+                rows[i] = row
+    return table(rows)
+
+
+def table(rows):
+    """Columns {name: array} of rows, in the order the names first appear;
+    a value missing from a row is NaN (or '' in a column of strings)."""
+    names = list(dict.fromkeys(name for row in rows for name in row))
+    columns = {}
+    for name in names:
+        values = [row.get(name) for row in rows]
+        present = [v for v in values if v is not None]
+        if present and all(isinstance(v, str) for v in present):
+            columns[name] = np.array(['' if v is None else v for v in values])
+        elif present and all(isinstance(v, bool) for v in present):
+            columns[name] = np.array([bool(v) for v in values])
+        elif all(isinstance(v, int) and not isinstance(v, bool)
+                 for v in present) and len(present) == len(values):
+            columns[name] = np.array(values, dtype=np.int64)
+        else:
+            columns[name] = np.array([np.nan if v is None else v
+                                      for v in values], dtype=float)
+    return columns
+
+
+def save(path, columns):
+    """Write a table as .csv, or as a compressed .npz otherwise."""
+    if path.endswith('.csv'):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(zip(*[c.tolist() for c in columns.values()]))
+    else:
+        np.savez_compressed(path, **columns)
+
+
+def print_table(columns, names=None):
+    names = names or [n for n in columns if n not in ('problem', 'key')]
+    widths = [max(10, len(n)) for n in names]
+    print(' '.join('%*s' % (w, n) for w, n in zip(widths, names)))
+    for i in range(len(columns[names[0]]) if names else 0):
+        cells = []
+        for w, n in zip(widths, names):
+            value = columns[n][i]
+            if columns[n].dtype.kind == 'f':
+                cells.append('%*.4g' % (w, value))
+            else:
+                cells.append('%*s' % (w, value))
+        print(' '.join(cells))
+
+
+def _value(text):
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return None if text == 'None' else text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('problem', choices=sorted(PROBLEMS))
+    parser.add_argument('--grid', nargs='*', default=[],
+                        metavar='NAME=V1,V2,...')
+    parser.add_argument('--backend', default='numpy')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--mpi', action='store_true',
+                        help='share the cases among the MPI ranks')
+    parser.add_argument('--cache', default=CACHE_DIR)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--output')
+    args = parser.parse_args(argv)
+
+    grid = {}
+    for item in args.grid:
+        name, _, values = item.partition('=')
+        grid[name] = [_value(v) for v in values.split(',')]
+    comm = None
+    if args.mpi:
+        from mpi4py import MPI
+        comm = MPI.COMM_WORLD
+    columns = sweep(args.problem, grid, args.backend, args.workers,
+                    None if args.no_cache else args.cache, comm)
+    if comm is not None and comm.Get_rank() != 0:
+        return
+    print_table(columns)
+    if args.output:
+        save(args.output, columns)
+
+
+if __name__ == '__main__':
+    main()
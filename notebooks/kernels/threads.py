@@ -0,0 +1,115 @@
+"""
+Thread count and first-touch allocation of the multithreaded backends.
+
+The numba_parallel and pyccel_openmp kernels of stencil spread the rows of
+every sweep over threads.  set_threads sets how many: numba's through
+numba.set_num_threads, bounded by NUMBA_NUM_THREADS (the number of cores
+unless set before numba is imported), and OpenMP's through
+omp_set_num_threads, with OMP_NUM_THREADS set for runtimes not started yet.
+Without a call the runtimes use their defaults, which the environment
+variables also set.
+
+On a machine with several memory domains (NUMA nodes) a page lives on the
+node of the thread that first writes it, and np.zeros or np.ones arrays
+are written by the main thread alone, so every thread but those of its
+node reads them remotely.  zeros, full and copy allocate arrays and write
+them in parallel by rows, the way the kernels split them, so that every
+row sits next to the thread that updates it.  They fall back on numpy
+without numba.
+"""
+import hashlib
+import importlib.util
+import os
+
+import numpy as np
+
+_touch = None
+_omp = None
+
+OMP_SOURCE = '''\
+from pyccel.decorators import types
+
+
+@types('int')
+def omp_set_threads(n):
+    from pyccel.stdlib.internal.openmp import omp_set_num_threads
+    omp_set_num_threads(n)
+'''
+
+
+def _have(module):
+    return importlib.util.find_spec(module) is not None
+
+
+def set_threads(n):
+    """Run the parallel kernels on n threads."""
+    global _omp
+    os.environ['OMP_NUM_THREADS'] = str(n)
+    if _have('numba'):
+        import numba
+        numba.set_num_threads(n)
+    if _have('pyccel'):
+        if _omp is None:
+            from .compile_cache import cached_epyccel
+            from .stencil import _load
+            digest = hashlib.sha1(OMP_SOURCE.encode()).hexdigest()[:12]
+            module = _load(OMP_SOURCE, 'omp_set_threads_%s' % digest)
+            _omp = cached_epyccel(module.omp_set_threads,
+                                  accelerator='openmp')
+        _omp(n)
+
+
+def get_threads():
+    """Number of threads of the parallel kernels."""
+    if _have('numba'):
+        import numba
+        return numba.get_num_threads()
+    return int(os.environ.get('OMP_NUM_THREADS', os.cpu_count()))
+
+
+def _kernels():
+    global _touch
+    if _touch is None:
+        from numba import njit, prange
+
+        @njit(parallel=True)
+        def fill(a, value):
+            for i in prange(a.shape[0]):
+                a[i] = value
+
+        @njit(parallel=True)
+        def copy(a, b):
+            for i in prange(a.shape[0]):
+                a[i] = b[i]
+
+        _touch = fill, copy
+    return _touch
+
+
+def _rows(a):
+    return a.reshape(len(a), -1) if a.ndim > 1 else a
+
+
+def full(shape, value, dtype=float):
+    """np.full, with the pages written by the threads of their rows."""
+    a = np.empty(shape, dtype)
+    if not _have('numba') or a.size == 0:
+        a.fill(value)
+        return a
+    _kernels()[0](_rows(a), a.dtype.type(value))
+    return a
+
+
+def zeros(shape, dtype=float):
+    return full(shape, 0, dtype)
+
+
+def copy(a):
+    """Contiguous copy of a, placed by rows like full."""
+    a = np.asarray(a)
+    b = np.empty(a.shape, a.dtype)
+    if not _have('numba') or a.size == 0:
+        np.copyto(b, a)
+        return b
+    _kernels()[1](_rows(b), _rows(np.ascontiguousarray(a)))
+    return b
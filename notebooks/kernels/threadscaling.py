@@ -0,0 +1,138 @@
+"""
+Thread scaling of the multithreaded kernels.
+
+    python -m kernels.threadscaling [--cases poisson_2d cavity_flow]
+                                    [--backends numba_parallel pyccel_openmp]
+                                    [--threads 1 2 4 8] [--size 512]
+                                    [--repeat 5] [--output threads.json]
+
+Every case of bench is timed with bench.measure on fresh inputs, once on
+the serial backend and then on the parallel one for each thread count, on
+the same grid (strong scaling).  One thread is always among the counts, so
+that T(1) is measured.  For P threads and the median time T(P):
+
+  speedup     T(1) / T(P), over the parallel kernel on one thread
+  vs serial   T(serial) / T(P), which includes the cost of the threading
+  efficiency  T(1) / (P T(P))
+
+and diff is the largest difference between the arrays left by the parallel
+and by the serial run, relative to their largest value, which only comes
+from the compilers reordering the arithmetic of the nonlinear updates
+differently (fastmath).  The parallel runs use arrays placed by
+threads.copy.  Thread counts above the number of cores are allowed
+(NUMBA_NUM_THREADS is raised to the largest) but only measure the overhead.
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from . import bench, threads
+from .stencil import PARALLEL
+
+CASES = ('linearconv_2d', 'nonlinearconv_2d', 'diff_2d', 'burger_2d',
+         'poisson_2d', 'cavity_flow')
+
+
+def _outputs(case, backend, n):
+    """Arrays left by one run of case on fresh inputs."""
+    args = case.inputs(n)
+    case.run(args, backend, case.nt)
+    return [a for a in args if isinstance(a, np.ndarray)]
+
+
+def difference(a, b):
+    """Largest |a - b| over max |b|, NaN in both counting as equal."""
+    both = np.isnan(a) & np.isnan(b)
+    d = np.where(both, 0., np.abs(a - b))
+    scale = np.abs(b[~both]).max(initial=0.)
+    return float(np.where(np.isnan(d), np.inf, d).max() / (scale or 1.))
+
+
+class _Placed:
+    """case with its inputs copied to first-touch arrays."""
+
+    def __init__(self, case):
+        self.case = case
+
+    def __getattr__(self, name):
+        return getattr(self.case, name)
+
+    def inputs(self, n):
+        return tuple(threads.copy(a) if isinstance(a, np.ndarray) else a
+                     for a in self.case.inputs(n))
+
+
+def scale(case, backend, counts, n, repeat):
+    """Rows of case on backend over the thread counts and one thread."""
+    counts = sorted(set(counts) | {1})
+    serial = PARALLEL[backend][0]
+    reference = bench.measure(case, serial, n, repeat)
+    expected = _outputs(case, serial, n)
+    placed = _Placed(case)
+    rows = []
+    for count in counts:
+        threads.set_threads(count)
+        result = bench.measure(placed, backend, n, repeat)
+        got = _outputs(placed, backend, n)
+        rows.append(dict(result, threads=count,
+                         serial_s=reference['median_s'],
+                         diff=max(difference(a, b)
+                                  for a, b in zip(got, expected))))
+    one = rows[0]['median_s']
+    for row in rows:
+        row['speedup'] = one / row['median_s']
+        row['vs_serial'] = row['serial_s'] / row['median_s']
+        row['efficiency'] = row['speedup'] / row['threads']
+    return rows
+
+
+def print_rows(rows):
+    print("%-17s %-14s %7s %6s %10s %8s %9s %6s %9s" % (
+        'case', 'backend', 'n', 'threads', 'median s', 'speedup',
+        'vs serial', 'eff', 'diff'))
+    for row in rows:
+        print("%-17s %-14s %7d %6d %10.6f %8.2f %9.2f %6.2f %9.1e" % (
+            row['case'], row['backend'], row['n'], row['threads'],
+            row['median_s'], row['speedup'], row['vs_serial'],
+            row['efficiency'], row['diff']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--cases', nargs='+', choices=CASES,
+                        default=list(CASES))
+    parser.add_argument('--backends', nargs='+', choices=sorted(PARALLEL),
+                        default=sorted(PARALLEL))
+    parser.add_argument('--threads', nargs='+', type=int,
+                        default=[1, 2, 4, os.cpu_count()])
+    parser.add_argument('--size', type=int, default=512)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output')
+    args = parser.parse_args(argv)
+
+    counts = sorted(set(args.threads))
+    # numba.set_num_threads is bounded by the threads numba starts with
+    if 'numba' not in sys.modules:
+        os.environ['NUMBA_NUM_THREADS'] = str(max(
+            counts + [int(os.environ.get('NUMBA_NUM_THREADS', 0))]))
+    rows = []
+    for backend in args.backends:
+        if not bench.available(PARALLEL[backend][0]):
+            print("%s is not installed, %s skipped"
+                  % (PARALLEL[backend][0], backend))
+            continue
+        for case in bench.CASES:
+            if case.name in args.cases:
+                rows += scale(case, backend, counts, args.size, args.repeat)
+    print_rows(rows)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'machine': bench.machine(), 'repeat': args.repeat,
+                       'results': rows}, f, indent=1)
+
+
+if __name__ == '__main__':
+    main()
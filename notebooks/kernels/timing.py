@@ -0,0 +1,200 @@
+"""
+Per-rank phase timers, counters and timeline traces of the MPI scripts.
+
+A PhaseTimer accumulates the wall time spent in named phases, each of one
+of five categories:
+
+  setup          initial conditions, domain creation, kernel compilation
+  compute        local work (sampling, quadrature, stencil updates)
+  communication  the messages and reductions themselves
+  idle           waiting for the other ranks, timed on a barrier placed
+                 just before the collectives, so that load imbalance is not
+                 counted as communication
+  io             checkpoints and snapshots written by the run
+
+and counters such as the samples drawn, the messages sent or the bytes
+reduced.  Phases of the same category must not be nested.
+
+report gathers the totals of every rank on the root in a single gather at
+the end of the run.  When the environment variable SCALING_OUTPUT names a
+file, the root writes them there as JSON; this is how MPI/scaling.py
+collects the timings of the runs it launches.  When TRACE_OUTPUT names a
+file, every phase and counter update is also recorded as a timeline event,
+the root writes them as a Chrome trace (one track per rank, open it in
+https://ui.perfetto.dev or chrome://tracing) and prints a per-phase summary
+of the ranks.
+
+Library code takes an optional timer and falls back on NULL_TIMER, whose
+phases and counters are a no-op, so profiling costs nothing unless a
+script asks for it.
+"""
+import json
+import os
+from contextlib import contextmanager, nullcontext
+
+from mpi4py import MPI
+
+PHASES = ('setup', 'compute', 'communication', 'idle', 'io')
+OUTPUT = 'SCALING_OUTPUT'
+TRACE = 'TRACE_OUTPUT'
+
+
+class PhaseTimer:
+    """Wall time spent by this rank in each phase since creation.
+
+    With trace set to a file name (by default the value of TRACE_OUTPUT) the
+    phases and counter updates are kept as timeline events for report.
+    """
+
+    enabled = True
+
+    def __init__(self, comm, trace=None):
+        self.comm = comm
+        self.times = dict.fromkeys(PHASES, 0.)
+        # name -> [category, calls, seconds]
+        self.phases = {}
+        self.counters = {}
+        self.trace = os.environ.get(TRACE) if trace is None else trace
+        self.events = [] if self.trace else None
+        self.start = MPI.Wtime()
+
+    @contextmanager
+    def phase(self, name, category=None):
+        """Time the block as phase name, of category name by default."""
+        category = category or name
+        start = MPI.Wtime()
+        try:
+            yield
+        finally:
+            elapsed = MPI.Wtime() - start
+            self.times[category] += elapsed
+            total = self.phases.get(name)
+            if total is None:
+                total = self.phases[name] = [category, 0, 0.]
+            total[1] += 1
+            total[2] += elapsed
+            if self.events is not None:
+                self.events.append((name, category, start, elapsed))
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + int(value)
+        if self.events is not None:
+            self.events.append((name, None, MPI.Wtime(), self.counters[name]))
+
+    def barrier(self):
+        """Wait for the other ranks, as idle time."""
+        with self.phase('idle'):
+            self.comm.Barrier()
+
+    def report(self, root=0, **info):
+        """Gather the times of every rank on root; return them there.
+
+        info is stored along with them, e.g. the problem size.
+        """
+        times = dict(self.times, rank=self.comm.Get_rank(), start=self.start,
+                     wall=MPI.Wtime() - self.start, phases=self.phases,
+                     counters=self.counters, events=self.events)
+        ranks = self.comm.gather(times, root=root)
+        if self.comm.Get_rank() != root:
+            return None
+        result = dict(info, size=self.comm.Get_size(), ranks=ranks)
+        path = os.environ.get(OUTPUT)
+        if path:
+            with open(path, 'w') as f:
+                json.dump(result, f)
+        if self.trace:
+            write_trace(self.trace, result)
+            print(summary(result))
+        return result
+
+
+def trace_events(result):
+    """Chrome trace events of the ranks of a report, one process per rank.
+
+    Times are taken from the earliest rank start, so late starts show up as
+    an offset of the whole track.
+    """
+    origin = min(r['start'] for r in result['ranks'])
+    events = []
+    for r in result['ranks']:
+        pid = r['rank']
+        events.append({'name': 'process_name', 'ph': 'M', 'pid': pid,
+                       'args': {'name': 'rank %d' % pid}})
+        events.append({'name': 'process_sort_index', 'ph': 'M', 'pid': pid,
+                       'args': {'sort_index': pid}})
+        events.append({'name': 'run', 'cat': 'run', 'ph': 'X', 'pid': pid,
+                       'tid': 0, 'ts': 1e6 * (r['start'] - origin),
+                       'dur': 1e6 * r['wall']})
+        for name, category, start, value in r['events'] or ():
+            if category is None:
+                events.append({'name': name, 'ph': 'C', 'pid': pid,
+                               'ts': 1e6 * (start - origin),
+                               'args': {name: value}})
+            else:
+                events.append({'name': name, 'cat': category, 'ph': 'X',
+                               'pid': pid, 'tid': 0,
+                               'ts': 1e6 * (start - origin),
+                               'dur': 1e6 * value})
+    return events
+
+
+def write_trace(path, result):
+    info = {k: v for k, v in result.items() if k != 'ranks'}
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': trace_events(result),
+                   'displayTimeUnit': 'ms', 'otherData': info}, f)
+
+
+def summary(result):
+    """Table of every phase and counter over the ranks of a report.
+
+    The imbalance is the max over the mean; a phase that only some ranks
+    run counts as 0 on the others.
+    """
+    ranks = result['ranks']
+    origin = min(r['start'] for r in ranks)
+    lines = ["%d ranks, wall %.4f s, last rank started after %.4f s"
+             % (len(ranks), max(r['wall'] for r in ranks),
+                max(r['start'] for r in ranks) - origin),
+             "%-20s %-13s %7s %10s %10s %10s %9s" % (
+                 'phase', 'category', 'calls', 'mean s', 'min s', 'max s',
+                 'imbalance')]
+    names = {}
+    for r in ranks:
+        for name, (category, _, _) in r['phases'].items():
+            names.setdefault(name, category)
+    for name, category in names.items():
+        totals = [r['phases'].get(name, (category, 0, 0.)) for r in ranks]
+        seconds = [t[2] for t in totals]
+        mean = sum(seconds) / len(seconds)
+        lines.append("%-20s %-13s %7d %10.4f %10.4f %10.4f %9.2f" % (
+            name, category, sum(t[1] for t in totals), mean, min(seconds),
+            max(seconds), max(seconds) / mean if mean else 1.))
+    counters = {}
+    for r in ranks:
+        for name in r['counters']:
+            counters.setdefault(name, [other['counters'].get(name, 0)
+                                       for other in ranks])
+    if counters:
+        lines.append("%-20s %14s %14s %14s" % ('counter', 'total', 'min',
+                                               'max'))
+    for name, values in counters.items():
+        lines.append("%-20s %14d %14d %14d" % (name, sum(values), min(values),
+                                               max(values)))
+    return '\n'.join(lines)
+
+
+class _NullTimer:
+    """PhaseTimer stand-in that records nothing."""
+
+    enabled = False
+    _untimed = nullcontext()
+
+    def phase(self, name, category=None):
+        return self._untimed
+
+    def count(self, name, value=1):
+        pass
+
+
+NULL_TIMER = _NullTimer()
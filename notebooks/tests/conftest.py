@@ -0,0 +1,39 @@
+"""
+Shared setup of the tests: the kernels package and the MPI modules are
+imported from the tree, and the reference kernels are the *_pure functions
+of the notebooks themselves.
+
+The MPI tests run on the ranks they are started with, one under plain
+pytest, where every schedule and decomposition falls back on a single
+block or rank.
+"""
+import glob
+import importlib.util
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+NOTEBOOKS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [NOTEBOOKS, os.path.join(NOTEBOOKS, 'MPI')]
+
+
+def have(module):
+    return importlib.util.find_spec(module) is not None
+
+
+@pytest.fixture(scope='session')
+def pure():
+    """The *_pure functions defined in the code cells of the notebooks."""
+    namespace = {'np': np}
+    for path in sorted(glob.glob(os.path.join(NOTEBOOKS, '*.ipynb'))):
+        with open(path) as f:
+            cells = json.load(f)['cells']
+        for cell in cells:
+            source = ''.join(cell['source'])
+            if (cell['cell_type'] == 'code' and '_pure' in source
+                    and source.lstrip().startswith('def ')):
+                exec(source, namespace)
+    return namespace
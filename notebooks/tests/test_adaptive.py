@@ -0,0 +1,76 @@
+"""
+Adaptive CFL stepping against the fixed-step solvers.
+"""
+import math
+
+import numpy as np
+import pytest
+
+from kernels import adaptive, equations
+from kernels.stencil import compile_equation
+
+NX = 81
+DX = 2 / (NX - 1)
+
+
+def _replay_1d(u0, steps, nu):
+    """The fixed-step solver run once per step with the steps taken."""
+    u = u0.copy()
+    for dt in steps:
+        # every step is within the limit of the speed it starts from
+        assert dt <= (adaptive.stable_dt(np.abs(u).max(), DX, nu=nu)
+                      * (1 + adaptive.ROUNDOFF))
+        if nu:
+            equations.solve_1d_burger(u, np.empty_like(u), 1, NX, dt, DX, nu)
+        else:
+            equations.solve_1d_nonlinearconv(u, np.empty_like(u), 1, NX, dt,
+                                             DX)
+    return u
+
+
+@pytest.mark.parametrize('backend', ['python', 'numpy'])
+@pytest.mark.parametrize('nu', [0., .07])
+def test_1d_lands_on_t_final_within_the_stable_step(backend, nu):
+    u0 = np.ones(NX)
+    u0[int(.5 / DX):int(1 / DX + 1)] = 2
+    u, t_final = u0.copy(), .37
+    if nu:
+        n, steps = adaptive.solve_1d_burger_adaptive(
+            u, np.empty_like(u), t_final, NX, DX, nu, backend=backend)
+    else:
+        n, steps = adaptive.solve_1d_nonlinearconv_adaptive(
+            u, np.empty_like(u), t_final, NX, DX, backend=backend)
+    assert n == len(steps) > 1
+    assert math.fsum(steps) == pytest.approx(t_final, rel=1e-14)
+    np.testing.assert_allclose(u, _replay_1d(u0, steps, nu), rtol=1e-14)
+
+
+def test_2d_burger_matches_fixed_steps():
+    n = 31
+    d = 2 / (n - 1)
+    nu = .01
+    u, v = np.ones((n, n)), np.ones((n, n))
+    count, steps = adaptive.solve_2d_burger_adaptive(
+        u, np.empty_like(u), v, np.empty_like(v), .1, d, d, nu)
+    assert math.fsum(steps) == pytest.approx(.1, rel=1e-14)
+    ur, vr = np.ones((n, n)), np.ones((n, n))
+    equations.hat(ur, d, d)
+    equations.hat(vr, d, d)
+    kernel = compile_equation(equations.BURGER_2D, 'numpy')
+    for dt in steps:
+        speed = max(np.abs(ur).max(), np.abs(vr).max())
+        assert dt <= (adaptive.stable_dt(speed, d, d, nu)
+                      * (1 + adaptive.ROUNDOFF))
+        kernel(ur, np.empty_like(ur), vr, np.empty_like(vr), 1, dt, d, d, nu)
+    np.testing.assert_allclose(u, ur, rtol=1e-14)
+    np.testing.assert_allclose(v, vr, rtol=1e-14)
+
+
+def test_constant_speed_takes_the_cfl_step():
+    u = np.full(NX, 2.)
+    count, steps = adaptive.solve_1d_nonlinearconv_adaptive(
+        u, np.empty_like(u), 1., NX, DX, cfl=.5)
+    dt = adaptive.stable_dt(2., DX, cfl=.5)
+    np.testing.assert_array_equal(steps[:-1], dt)
+    # no extra step of a few ulps for the rounding left by 160 steps
+    assert count == 160 and steps[-1] == pytest.approx(dt, rel=1e-12)
@@ -0,0 +1,64 @@
+"""
+The benchmark suite: fresh inputs, its JSON report and the baseline check.
+"""
+import json
+
+import numpy as np
+
+from kernels import bench
+
+
+def _result(case, n, median, backend='numpy'):
+    return {'case': case, 'backend': backend, 'n': n, 'median_s': median}
+
+
+def test_compare_flags_results_slower_than_the_threshold():
+    baseline = {'results': [_result('diff_1d', 1000, 1.),
+                            _result('diff_1d', 10000, 1.),
+                            _result('diff_1d', 1000, 1., 'numba')]}
+    results = [_result('diff_1d', 1000, 1.05),
+               _result('diff_1d', 10000, 1.5),
+               _result('diff_1d', 1000, .5, 'numba'),
+               # not in the baseline
+               _result('burger_1d', 1000, 9.)]
+    assert bench.compare(results, baseline, .1) == [
+        (('diff_1d', 'numpy', 10000), 1., 1.5)]
+    assert bench.compare(results, baseline, .01) == [
+        (('diff_1d', 'numpy', 1000), 1., 1.05),
+        (('diff_1d', 'numpy', 10000), 1., 1.5)]
+
+
+def test_every_repetition_gets_fresh_inputs():
+    calls = []
+
+    def run(args, backend, nt):
+        # a solver updating its input in place
+        calls.append(args[0][0])
+        args[0][0] += nt
+
+    case = bench.Case('fresh', 1, 3, lambda n: (np.zeros(n),), run,
+                      lambda backend, n: None)
+    result = bench.measure(case, 'numpy', 10, 4)
+    assert calls == [0.] * 5
+    assert len(result['times_s']) == 4
+    assert result['median_s'] > 0
+    assert result['cells_per_s'] == 10 * 3 / result['median_s']
+
+
+def test_main_writes_a_report_and_checks_a_baseline(tmp_path):
+    output = str(tmp_path / 'results.json')
+    argv = ['--cases', 'diff_1d', '--backends', 'numpy', 'python',
+            '--sizes-1d', '50', '--repeat', '2']
+    assert bench.main(argv + ['--output', output]) == 0
+    with open(output) as f:
+        report = json.load(f)
+    assert report['machine']['numpy'] == np.__version__
+    assert sorted(r['backend'] for r in report['results']) == ['numpy',
+                                                               'python']
+    # a baseline ten times faster than this run flags every result
+    for result in report['results']:
+        result['median_s'] /= 10
+    baseline = str(tmp_path / 'baseline.json')
+    with open(baseline, 'w') as f:
+        json.dump(report, f)
+    assert bench.main(argv + ['--baseline', baseline]) == 1
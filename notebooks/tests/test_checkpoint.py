@@ -0,0 +1,107 @@
+"""
+Restarting a solver from its checkpoint gives the run that never stopped.
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+from mpi4py import MPI
+
+from kernels import cavity, equations
+from kernels.checkpoint import Checkpoint
+from kernels.decomp import CartDomain, ghost_width, solve
+
+NY, NX = 31, 27
+DX, DY = 2 / (NX - 1), 2 / (NY - 1)
+BURGER = (.001, DX, DY, .01)
+
+
+def _burger(nt, checkpoint=None):
+    u, v = np.ones((NY, NX)), np.ones((NY, NX))
+    equations.solve_2d_burger(u, np.ones_like(u), v, np.ones_like(v), nt,
+                              *BURGER, checkpoint=checkpoint)
+    return u, v
+
+
+def test_burger_restart_is_exact(tmp_path):
+    with Checkpoint(str(tmp_path), every=7) as checkpoint:
+        _burger(30, checkpoint)
+    with open(os.path.join(str(tmp_path), 'state.json')) as f:
+        assert 30 in json.load(f)['steps']
+    # a fresh run over the same directory continues from step 30
+    with Checkpoint(str(tmp_path), every=7) as checkpoint:
+        restarted = _burger(50, checkpoint)
+    for got, want in zip(restarted, _burger(50)):
+        np.testing.assert_array_equal(got, want)
+
+
+def test_restart_false_starts_over(tmp_path):
+    with Checkpoint(str(tmp_path), every=7) as checkpoint:
+        _burger(30, checkpoint)
+    with Checkpoint(str(tmp_path), every=7, restart=False) as checkpoint:
+        u, v = _burger(20, checkpoint)
+    np.testing.assert_array_equal(u, _burger(20)[0])
+
+
+def test_layout_mismatch_raises(tmp_path):
+    with Checkpoint(str(tmp_path), every=7) as checkpoint:
+        _burger(10, checkpoint)
+    with Checkpoint(str(tmp_path)) as checkpoint:
+        with pytest.raises(ValueError):
+            checkpoint.open({'u': np.zeros((NY + 1, NX))})
+
+
+def test_leftover_slots_of_other_arrays_are_recreated(tmp_path):
+    with Checkpoint(str(tmp_path), every=7) as checkpoint:
+        _burger(10, checkpoint)
+    os.remove(os.path.join(str(tmp_path), 'state.json'))
+    a = np.ones((NY + 2, NX), dtype=np.float32)
+    with Checkpoint(str(tmp_path), every=7) as checkpoint:
+        assert checkpoint.open({'u': a}) == 0
+        checkpoint.save(1)
+    with Checkpoint(str(tmp_path), every=7) as checkpoint:
+        a[:] = 0
+        assert checkpoint.open({'u': a}) == 1
+    np.testing.assert_array_equal(a, 1)
+    for maps in checkpoint.maps:
+        assert maps['u'].shape == a.shape and maps['u'].dtype == a.dtype
+
+
+def _cavity(nt, checkpoint=None):
+    n = 21
+    u, v, p = (np.zeros((n, n)) for _ in range(3))
+    cavity.cavity_flow(nt, u, v, .001, n, n, 2 / (n - 1), 2 / (n - 1), p, 1.,
+                       .1, checkpoint=checkpoint)
+    return u, v, p
+
+
+def test_cavity_restart_is_exact(tmp_path):
+    with Checkpoint(str(tmp_path), every=4) as checkpoint:
+        _cavity(10, checkpoint)
+    with Checkpoint(str(tmp_path), every=4) as checkpoint:
+        restarted = _cavity(25, checkpoint)
+    for got, want in zip(restarted, _cavity(25)):
+        np.testing.assert_array_equal(got, want)
+
+
+def test_decomposed_restart_is_exact(tmp_path):
+    comm = MPI.COMM_WORLD
+    directory = comm.bcast(str(tmp_path))
+    eq = equations.DIFF_2D
+    params = (.2 * DX * DY / .05, DX, DY, .05)
+    domain = CartDomain(comm, (NY, NX), ghost_width(eq))
+
+    def run(nt, checkpoint=None):
+        u = domain.from_global(np.ones((NY, NX)))
+        solve(eq, domain, [u, domain.zeros()], nt, *params,
+              checkpoint=checkpoint)
+        return domain.gather(u)
+
+    with Checkpoint(directory, every=5, comm=domain.cart) as checkpoint:
+        run(12, checkpoint)
+    with Checkpoint(directory, every=5, comm=domain.cart) as checkpoint:
+        restarted = run(20, checkpoint)
+    expected = run(20)
+    if domain.cart.Get_rank() == 0:
+        np.testing.assert_array_equal(restarted, expected)
@@ -0,0 +1,95 @@
+"""
+Keys and eviction of the epyccel cache, which need no pyccel.
+"""
+import inspect
+import json
+import os
+
+from kernels import compile_cache
+from kernels.compile_cache import cache_key, cached_epyccel, evict
+
+SOURCE = '''
+def add(x: float, y: float):
+    return x + y
+'''
+
+
+def test_key_changes_with_what_the_build_depends_on(monkeypatch):
+    key = cache_key(SOURCE)
+    assert cache_key(SOURCE) == key
+    # indentation is not part of the source
+    assert cache_key(SOURCE.replace('\n', '\n    ')) == key
+    variants = [cache_key(SOURCE.replace('x + y', 'y + x')),
+                cache_key(SOURCE, language='c'),
+                cache_key(SOURCE, compiler='intel'),
+                cache_key(SOURCE, flags='-O3'),
+                cache_key(SOURCE, accelerator='openmp')]
+    monkeypatch.setattr(compile_cache, '_pyccel_version', lambda: '0.0.0')
+    variants.append(cache_key(SOURCE))
+    assert len(set(variants + [key])) == len(variants) + 1
+
+
+def _entry(cache_dir, name, size, atime):
+    entry_dir = os.path.join(cache_dir, name)
+    os.makedirs(entry_dir)
+    with open(os.path.join(entry_dir, 'mod.so'), 'wb') as f:
+        f.write(b'\0' * size)
+    index = os.path.join(entry_dir, 'entry.json')
+    with open(index, 'w') as f:
+        json.dump({}, f)
+    os.utime(index, (atime, atime))
+
+
+def _left(cache_dir):
+    return sorted(os.listdir(cache_dir))
+
+
+def test_evict_removes_the_least_recently_used(tmp_path):
+    cache_dir = str(tmp_path)
+    for k, name in enumerate('cadb'):
+        _entry(cache_dir, name, 1000, 1000 + k)
+    assert evict(cache_dir, max_entries=4, max_bytes=10 ** 6) == 0
+    assert evict(cache_dir, max_entries=2, max_bytes=10 ** 6) == 2
+    assert _left(cache_dir) == ['b', 'd']
+    # the byte limit counts every file of an entry
+    assert evict(cache_dir, max_entries=10, max_bytes=1500) == 1
+    assert _left(cache_dir) == ['b']
+
+
+def test_evict_spares_the_kept_entry(tmp_path):
+    cache_dir = str(tmp_path)
+    for k, name in enumerate('abc'):
+        _entry(cache_dir, name, 10, 1000 + k)
+    assert evict(cache_dir, max_entries=1, max_bytes=10 ** 6, keep='a') == 2
+    assert _left(cache_dir) == ['a']
+
+
+def add(x: float, y: float):
+    return x + y
+
+
+def test_hit_loads_the_stored_module_without_compiling(tmp_path,
+                                                        monkeypatch):
+    cache_dir = str(tmp_path)
+    key = cache_key(inspect.getsource(add))
+    entry_dir = os.path.join(cache_dir, key)
+    os.makedirs(entry_dir)
+    # a Python module stands in for the extension, both load the same way
+    with open(os.path.join(entry_dir, 'mod_add.py'), 'w') as f:
+        f.write('def add(x, y):\n    return 10 * (x + y)\n')
+    index = os.path.join(entry_dir, 'entry.json')
+    with open(index, 'w') as f:
+        json.dump({'module': 'mod_add', 'function': 'add',
+                   'file': 'mod_add.py'}, f)
+    os.utime(index, (0, 0))
+
+    def build(*args):
+        raise AssertionError('compiled on a hit')
+
+    monkeypatch.setattr(compile_cache, '_build', build)
+    monkeypatch.setattr(compile_cache, '_loaded', {})
+    assert cached_epyccel(add, cache_dir=cache_dir)(1, 2) == 30
+    # the hit refreshes the access time used by evict
+    assert os.stat(index).st_mtime > 0
+    assert cached_epyccel(add, cache_dir=cache_dir) is \
+        compile_cache._loaded[key]
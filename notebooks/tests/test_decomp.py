@@ -0,0 +1,90 @@
+"""
+The domain-decomposed solvers of decomp against the serial ones.
+"""
+import numpy as np
+import pytest
+from mpi4py import MPI
+
+from kernels import cavity, equations
+from kernels.decomp import CartCavityFlow, CartDomain, ghost_width, solve
+
+COMM = MPI.COMM_WORLD
+NY, NX, NT = 33, 29, 20
+DX, DY = 2 / (NX - 1), 2 / (NY - 1)
+
+
+def _local(domain, index, value, local=None):
+    if local is None:
+        local = domain.zeros()
+    index = domain.local_index(index)
+    if index is not None:
+        local[index] = value
+    return local
+
+
+def _hat(domain):
+    u = _local(domain, (slice(None), slice(None)), 1)
+    return _local(domain, equations.hat_index(DX, DY), 2, u)
+
+
+def test_local_index_matches_from_global():
+    domain = CartDomain(COMM, (NY, NX))
+    u = np.ones((NY, NX))
+    equations.hat(u, DX, DY)
+    np.testing.assert_array_equal(_hat(domain), domain.from_global(u))
+    assert domain.local_index((NY, 0)) is None
+
+
+@pytest.mark.parametrize('backend', ['python', 'numpy'])
+@pytest.mark.parametrize('eq, params', [
+    (equations.DIFF_2D, (.2 * DX * DY / .05, DX, DY, .05)),
+    (equations.BURGER_2D, (.001, DX, DY, .01))])
+def test_hat_solvers_match_serial(backend, eq, params):
+    domain = CartDomain(COMM, (NY, NX), ghost_width(eq))
+    arrays = []
+    for field in eq.fields:
+        arrays += [_hat(domain), domain.zeros()]
+    solve(eq, domain, arrays, NT, *params, backend=backend)
+    expected = [np.ones((NY, NX)) for _ in arrays]
+    if eq is equations.DIFF_2D:
+        equations.solve_2d_diff(*expected, NT, *params)
+    else:
+        equations.solve_2d_burger(*expected, NT, *params)
+    for got, want in zip(arrays[::2], expected[::2]):
+        result = domain.gather(got)
+        if domain.cart.Get_rank() == 0:
+            np.testing.assert_array_equal(result, want)
+
+
+@pytest.mark.parametrize('backend', ['python', 'numpy'])
+def test_poisson_matches_serial(backend):
+    eq = equations.POISSON_2D
+    domain = CartDomain(COMM, (NY, NX), ghost_width(eq))
+    b = _local(domain, (int(NY / 4), int(NX / 4)), 100)
+    _local(domain, (int(3 * NY / 4), int(3 * NX / 4)), -100, b)
+    arrays = [domain.zeros(), domain.zeros(), b]
+    solve(eq, domain, arrays, NT, DX, DY, backend=backend)
+    p = np.zeros((NY, NX))
+    equations.solve_2d_poisson(p, np.zeros_like(p), np.zeros_like(p), NX, NY,
+                               NT, DX, DY)
+    result = domain.gather(arrays[0])
+    if domain.cart.Get_rank() == 0:
+        np.testing.assert_array_equal(result, p)
+
+
+@pytest.mark.parametrize('backend', ['python', 'numpy'])
+def test_cavity_matches_serial(backend):
+    domain = CartDomain(COMM, (NY, NY))
+    d = 2 / (NY - 1)
+    u = _local(domain, (slice(None), -1), 1)
+    v, p = domain.zeros(), domain.zeros()
+    flow = CartCavityFlow(domain, u, v, p, .001, d, d, 1., .1,
+                          backend=backend)
+    flow.run(NT)
+    expected = [np.zeros((NY, NY)) for _ in range(3)]
+    cavity.cavity_flow(NT, expected[0], expected[1], .001, NY, NY, d, d,
+                       expected[2], 1., .1)
+    for got, want in zip((u, v, p), expected):
+        result = domain.gather(got)
+        if domain.cart.Get_rank() == 0:
+            np.testing.assert_array_equal(result, want)
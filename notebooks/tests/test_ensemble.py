@@ -0,0 +1,38 @@
+"""
+Every member of a batched 1D run against the single-member solver.
+"""
+import numpy as np
+import pytest
+
+from kernels import ensemble, equations
+
+BATCH, NX, NT, DX = 6, 41, 25, 2 / 40
+DT = np.linspace(.005, .01, BATCH)
+
+CASES = [('linearconv', (np.linspace(.5, 1., BATCH),)),
+         ('nonlinearconv', ()),
+         ('diff', (np.linspace(.1, .3, BATCH),)),
+         ('burger', (.07,))]
+
+
+@pytest.mark.parametrize('backend', ['python', 'numpy'])
+@pytest.mark.parametrize('name, params', CASES)
+def test_members_match_single_solver(backend, name, params):
+    u0 = 1 + np.random.default_rng(4).random((BATCH, NX))
+    u = u0.copy()
+    getattr(ensemble, 'solve_1d_%s_batch' % name)(
+        u, np.empty_like(u), NT, NX, DT, DX, *params, backend=backend)
+    single = getattr(equations, 'solve_1d_' + name)
+    for k in range(BATCH):
+        expected = u0[k].copy()
+        member = [ensemble.members(p, BATCH)[k] for p in params]
+        single(expected, np.empty_like(expected), NT, NX, DT[k], DX, *member,
+               backend=backend)
+        np.testing.assert_array_equal(u[k], expected)
+
+
+def test_batch_rejects_a_coefficient_of_the_wrong_length():
+    u = np.ones((BATCH, NX))
+    with pytest.raises(ValueError):
+        ensemble.solve_1d_diff_batch(u, np.empty_like(u), NT, NX, DT, DX,
+                                     np.ones(BATCH + 1))
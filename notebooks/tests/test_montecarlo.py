@@ -0,0 +1,174 @@
+"""
+Monte Carlo estimators, schedules and quadrature of the MPI scripts.
+
+Rank independence is checked by computing the blocks or intervals of every
+rank of a hypothetical run of size ranks in turn; the MPI calls run on the
+ranks of the test itself.
+"""
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from mpi4py import MPI
+
+import quadrature
+from estimator import (circle_stats_kernel, combine_stats, mean_and_error,
+                       merge_stats, run_to_tolerance, sample_stats)
+from integral_estimators import ESTIMATORS, estimator_kernel
+from montecarlo import (circle_points_kernel, compute_circle_points,
+                        compute_circle_points_blocks, number_of_blocks,
+                        rank_blocks)
+from scheduler import gather_results, map_blocks
+
+COMM = MPI.COMM_WORLD
+BLOCK = 1000
+NSAMPLES = 10 * BLOCK + 123
+XMAX = 3 * np.pi / 2
+CONTROL = dict(g=lambda x: (x - np.pi) ** 2, G=3 * np.pi ** 3 / 8)
+
+
+def _estimator(name, nsamples=NSAMPLES, block_size=BLOCK):
+    options = CONTROL if name == 'control' else {}
+    return estimator_kernel(name, np.cos, 0, XMAX, nsamples,
+                            block_size=block_size, **options)
+
+
+@pytest.mark.parametrize('block_size', [1, BLOCK, NSAMPLES, 2 * NSAMPLES])
+def test_blocks_stream_every_sample(block_size):
+    rng = np.random.default_rng(7)
+    expected = 0
+    for start in range(0, NSAMPLES, block_size):
+        x, y = rng.random((2, min(block_size, NSAMPLES - start)))
+        expected += np.count_nonzero(x * x + y * y <= 1.)
+    count = compute_circle_points(NSAMPLES, np.random.default_rng(7),
+                                  block_size)
+    assert count == expected
+    assert abs(4 * count / NSAMPLES - np.pi) < .05
+    assert compute_circle_points(0) == 0
+
+
+@pytest.mark.parametrize('size', [2, 3, 4, 7])
+def test_circle_points_do_not_depend_on_ranks(size):
+    nblocks = number_of_blocks(NSAMPLES, BLOCK)
+    serial = compute_circle_points_blocks(range(nblocks), NSAMPLES,
+                                          block_size=BLOCK)
+    split = sum(compute_circle_points_blocks(rank_blocks(nblocks, rank, size),
+                                             NSAMPLES, block_size=BLOCK)
+                for rank in range(size))
+    assert split == serial
+
+
+@pytest.mark.parametrize('schedule', ['static', 'dynamic'])
+def test_schedules_gather_blocks_in_order(schedule):
+    nblocks = number_of_blocks(NSAMPLES, BLOCK)
+    kernel = circle_points_kernel(NSAMPLES, block_size=BLOCK)
+    results = map_blocks(COMM, nblocks, kernel, schedule)
+    gathered = gather_results(COMM, results, root=0)
+    if COMM.Get_rank() == 0:
+        assert list(gathered) == [kernel(b) for b in range(nblocks)]
+
+
+@pytest.mark.parametrize('name', sorted(ESTIMATORS))
+def test_estimators_draw_nsamples_and_converge(name):
+    kernel = _estimator(name)
+    stats = combine_stats(kernel(b)
+                          for b in range(number_of_blocks(NSAMPLES, BLOCK)))
+    # an antithetic block of odd length completes its last pair
+    assert stats[3] - NSAMPLES in ((0, 1) if name == 'antithetic' else (0,))
+    mean, error = mean_and_error(stats)
+    assert 0 < error < .05
+    assert abs(mean + 1) < 5 * error
+
+
+@pytest.mark.parametrize('name', sorted(ESTIMATORS))
+def test_estimator_stats_gathered_on_one_rank(name):
+    kernel = _estimator(name)
+    nblocks = number_of_blocks(NSAMPLES, BLOCK)
+    gathered = gather_results(COMM, map_blocks(COMM, nblocks, kernel),
+                              root=0)
+    if COMM.Get_rank() == 0:
+        np.testing.assert_array_equal(
+            combine_stats(gathered),
+            combine_stats(kernel(b) for b in range(nblocks)))
+
+
+def test_merged_stats_match_numpy():
+    values = np.random.default_rng(0).normal(3., 2., 1001)
+    stats = combine_stats(sample_stats(chunk)
+                          for chunk in np.array_split(values, 7))
+    assert stats[0] == len(values)
+    assert stats[1] == pytest.approx(values.mean(), rel=1e-14)
+    assert stats[2] == pytest.approx(values.var() * len(values), rel=1e-12)
+    empty = sample_stats(values[:0])
+    np.testing.assert_array_equal(merge_stats(empty, stats), stats)
+
+
+def test_error_of_a_large_mean_with_a_small_spread():
+    values = 1e8 + np.random.default_rng(1).normal(0., 1e-3, 100000)
+    stats = combine_stats(sample_stats(chunk)
+                          for chunk in np.array_split(values, 50))
+    _, error = mean_and_error(stats)
+    assert error == pytest.approx(1e-3 / math.sqrt(len(values)), rel=.05)
+
+
+def test_run_to_tolerance_pi():
+    pi, error, evaluations = run_to_tolerance(
+        COMM, circle_stats_kernel(block_size=4096), 1e-2)
+    assert error < 1e-2
+    assert abs(pi - np.pi) < 5 * error
+    assert evaluations % 4096 == 0
+
+
+@pytest.mark.parametrize('name', ['sobol', 'halton'])
+def test_run_to_tolerance_qmc_replicates(name):
+    # the block means of the scrambled sequences are heavy tailed, a tight
+    # tol would test the noise of an estimate from a handful of replicates
+    tol = 1e-4
+    kernel = _estimator(name, nsamples=None, block_size=1024)
+    mean, error, _ = run_to_tolerance(COMM, kernel, tol, max_samples=10**7)
+    # the replicates give a real, nonzero error estimate; the stop is decided
+    # on a snapshot, the final reduction adds the blocks drawn since
+    assert 0 < error < 2 * tol
+    assert abs(mean + 1) < 10 * error
+
+
+@pytest.mark.parametrize('rule', quadrature.RULES)
+@pytest.mark.parametrize('size', [2, 3, 5])
+def test_quadrature_does_not_depend_on_ranks(rule, size):
+    n = 1001
+    whole = quadrature.integrate(np.cos, 0, XMAX, n, rule)
+    parts = [quadrature.integrate(np.cos, 0, XMAX, n, rule,
+                                  *quadrature.split_intervals(n, rank, size))
+             for rank in range(size)]
+    assert math.fsum(parts) == pytest.approx(whole, rel=1e-13, abs=1e-15)
+    result = quadrature.parallel_integrate(COMM, np.cos, 0, XMAX, n, rule)
+    if COMM.Get_rank() == 0:
+        assert result == pytest.approx(whole, rel=1e-13, abs=1e-15)
+
+
+def test_romberg():
+    integral, error, _ = quadrature.romberg(np.cos, 0, XMAX, comm=COMM)
+    assert integral == pytest.approx(-1, abs=1e-12)
+    assert error < 1e-10
+    _, error, evaluations = quadrature.romberg(np.cos, 0, XMAX, max_levels=1)
+    assert error == math.inf and evaluations == 2
+
+
+def test_gauss_kronrod_with_more_workers_than_intervals():
+    a, b = np.linspace(0, XMAX, 4)[:-1], np.linspace(0, XMAX, 4)[1:]
+    values, errors = quadrature.gauss_kronrod(np.cos, a[:0], b[:0])
+    assert values.shape == errors.shape == (0,)
+    expected = quadrature.gauss_kronrod(np.cos, a, b)
+    with ThreadPoolExecutor(2) as pool:
+        got = quadrature.distributed_gauss_kronrod(np.cos, a, b, pool=pool,
+                                                   nchunks=8)
+    np.testing.assert_allclose(got, expected, rtol=1e-14, atol=1e-15)
+    # a single interval leaves all ranks but one without a share
+    got = quadrature.distributed_gauss_kronrod(np.cos, a[:1], b[:1], COMM)
+    np.testing.assert_allclose(got, quadrature.gauss_kronrod(np.cos, a[:1],
+                                                             b[:1]),
+                               rtol=1e-14, atol=1e-15)
+    integral, _, _ = quadrature.adaptive_integrate(np.cos, 0, XMAX, initial=1,
+                                                   comm=COMM)
+    assert integral == pytest.approx(-1, abs=1e-10)
@@ -0,0 +1,76 @@
+"""
+Multigrid cycles on a manufactured Poisson problem.
+"""
+import numpy as np
+import pytest
+
+from kernels import equations
+from kernels.multigrid import Multigrid, multigrid, solve_2d_poisson_multigrid
+
+# p = sin(pi x) sin(2 pi y) on [0, 1]^2 vanishes on the edges
+GRIDS = [(33, 33), (41, 30), (30, 45)]
+
+
+def _manufactured(ny, nx):
+    y, x = np.linspace(0, 1, ny), np.linspace(0, 1, nx)
+    exact = np.sin(np.pi * x)[None, :] * np.sin(2 * np.pi * y)[:, None]
+    return exact, -5 * np.pi ** 2 * exact, 1 / (nx - 1), 1 / (ny - 1)
+
+
+@pytest.mark.parametrize('kind', ['V', 'W', 'F'])
+@pytest.mark.parametrize('shape', GRIDS)
+def test_cycles_reduce_the_residual(kind, shape):
+    exact, b, dx, dy = _manufactured(*shape)
+    solver = Multigrid(shape, dx, dy)
+    p = np.zeros(shape)
+    scale = np.linalg.norm(b[1:-1, 1:-1])
+    residuals = [solver.residual_norm(p, b) / scale]
+    # every cycle divides the residual until it reaches round-off
+    while residuals[-1] > 1e-12:
+        solver.cycle(p, b, 0, kind)
+        residuals.append(solver.residual_norm(p, b) / scale)
+    assert len(residuals) < 20
+    factors = np.array(residuals[1:]) / residuals[:-1]
+    assert factors.max() < .3
+    cycles, residual = solver.solve(p, b, 1e-11, kind=kind)
+    assert residual <= 1e-11
+    # the discrete solution is second-order accurate
+    error = np.abs(p - exact).max()
+    assert error < 2 * np.pi ** 2 * max(dx, dy) ** 2
+
+
+def test_matches_jacobi_to_discretisation_accuracy():
+    ny, nx = 17, 17
+    exact, b, dx, dy = _manufactured(ny, nx)
+    p = np.zeros((ny, nx))
+    multigrid((ny, nx), dx, dy).solve(p, b, 1e-12)
+    # Jacobi, the fixed iteration of the notebooks, run to convergence
+    jacobi = np.zeros((ny, nx))
+    for _ in range(3000):
+        jacobi[1:-1, 1:-1] = (
+            (jacobi[1:-1, 2:] + jacobi[1:-1, :-2]) * dy ** 2
+            + (jacobi[2:, 1:-1] + jacobi[:-2, 1:-1]) * dx ** 2
+            - b[1:-1, 1:-1] * dx ** 2 * dy ** 2) / (2 * (dx ** 2 + dy ** 2))
+    np.testing.assert_allclose(p, jacobi, atol=1e-9)
+    assert np.abs(p - exact).max() < 2 * np.pi ** 2 * dx ** 2
+
+
+def test_hierarchy_is_built_once():
+    assert multigrid((33, 33), .1, .1) is multigrid((33, 33), .1, .1)
+    with pytest.raises(ValueError):
+        Multigrid((33, 33), .1, .1).solve(np.zeros((33, 33)),
+                                          np.ones((33, 33)), kind='X')
+
+
+def test_drop_in_solver_converges_on_the_notebook_problem():
+    nx, ny = 50, 50
+    dx, dy = 2 / (nx - 1), 1 / (ny - 1)
+    p, b = np.zeros((ny, nx)), np.zeros((ny, nx))
+    solve_2d_poisson_multigrid(p, np.zeros_like(p), b, nx, ny, 50, dx, dy)
+    solver = multigrid(p.shape, dx, dy)
+    assert solver.residual_norm(p, b) <= 1e-10 * np.linalg.norm(b)
+    # a few Jacobi sweeps from the converged p barely move it
+    reference, rb = p.copy(), np.zeros_like(b)
+    equations.solve_2d_poisson(reference, np.zeros_like(p), rb, nx, ny, 5,
+                               dx, dy)
+    np.testing.assert_allclose(reference, p, atol=1e-8)
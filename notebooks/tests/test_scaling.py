@@ -0,0 +1,76 @@
+"""
+Problem sizes and speedup arithmetic of the scaling harness.
+"""
+import pytest
+
+import scaling
+from timing import PHASES
+
+
+def _run(ranks, wall):
+    """A report of ranks ranks, the last one the slowest."""
+    return {'size': ranks,
+            'ranks': [dict({phase: wall / (k + 2) for phase in PHASES},
+                           wall=wall * (k + 1) / ranks)
+                      for k in range(ranks)]}
+
+
+def test_problem_size():
+    pi, stencil = scaling.SCRIPTS['pi'], scaling.SCRIPTS['stencil']
+    assert scaling.problem_size(pi, 1000, 8, 'strong') == 1000
+    assert scaling.problem_size(pi, 1000, 8, 'weak') == 8000
+    assert scaling.problem_size(stencil, 1000, 4, 'strong') == 1000
+    # both sides grow, so the number of cells grows with the ranks
+    assert scaling.problem_size(stencil, 1000, 4, 'weak') == 2000
+    assert scaling.problem_size(stencil, 100, 2, 'weak') == 141
+
+
+def test_summary_takes_the_slowest_rank():
+    row = scaling.summary(_run(4, 2.))
+    assert row['ranks'] == 4 and row['time'] == 2.
+    assert row['compute_max'] == 1.
+    assert row['compute'] == pytest.approx(sum(2. / (k + 2)
+                                               for k in range(4)) / 4)
+
+
+def _stub(monkeypatch, times):
+    launched = []
+
+    def launch(script, ranks, size, **options):
+        launched.append((ranks, size))
+        return _run(ranks, times[ranks].pop(0))
+
+    monkeypatch.setattr(scaling, 'launch', launch)
+    return launched
+
+
+def test_strong_scaling(monkeypatch):
+    launched = _stub(monkeypatch, {1: [8., 6.], 2: [4., 5.], 4: [3., 3.]})
+    rows, runs = scaling.scale(scaling.SCRIPTS['pi'], [1, 2, 4], 'strong',
+                               1000, repeat=2)
+    assert launched == [(1, 1000)] * 2 + [(2, 1000)] * 2 + [(4, 1000)] * 2
+    assert len(runs) == 6 and runs[0]['mode'] == 'strong'
+    # the fastest of the repeats
+    assert [row['time'] for row in rows] == [6., 4., 3.]
+    assert [row['speedup'] for row in rows] == [1., 1.5, 2.]
+    assert [row['efficiency'] for row in rows] == [1., .75, .5]
+
+
+def test_weak_scaling(monkeypatch):
+    launched = _stub(monkeypatch, {1: [2.], 2: [2.5], 4: [4.]})
+    rows, _ = scaling.scale(scaling.SCRIPTS['pi'], [1, 2, 4], 'weak', 1000)
+    assert launched == [(1, 1000), (2, 2000), (4, 4000)]
+    assert [row['problem_size'] for row in rows] == [1000, 2000, 4000]
+    assert [row['efficiency'] for row in rows] == [1., .8, .5]
+    assert [row['speedup'] for row in rows] == [1., 1.6, 2.]
+
+
+def test_table_has_one_row_per_rank_count(monkeypatch, tmp_path):
+    _stub(monkeypatch, {1: [2.], 3: [1.]})
+    rows, _ = scaling.scale(scaling.SCRIPTS['trapeze'], [1, 3], 'strong', 10)
+    path = str(tmp_path / 'table.csv')
+    scaling.write_table(path, rows)
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert lines[0].split(',') == list(scaling.COLUMNS)
+    assert len(lines) == 3
@@ -0,0 +1,98 @@
+"""
+SnapshotWriter to SnapshotStore round trips.
+"""
+import os
+
+import numpy as np
+import pytest
+
+from kernels import equations
+from kernels.snapshots import SnapshotStore, SnapshotWriter, render
+
+NY, NX = 31, 27
+DX, DY = 2 / (NX - 1), 2 / (NY - 1)
+
+
+def _burger(nt, snapshots):
+    u, v = np.ones((NY, NX)), np.ones((NY, NX))
+    equations.solve_2d_burger(u, np.ones_like(u), v, np.ones_like(v), nt,
+                              .001, DX, DY, .01, snapshots=snapshots)
+    return u, v
+
+
+def test_full_precision_round_trip(tmp_path):
+    with SnapshotWriter(str(tmp_path), every=5) as writer:
+        u, v = _burger(23, writer)
+    store = SnapshotStore(str(tmp_path))
+    # the start, every 5 steps and the end
+    assert store.steps == [0, 5, 10, 15, 20, 23]
+    assert store.fields == ['u', 'v']
+    np.testing.assert_array_equal(store.frame(23, 'u'), u)
+    np.testing.assert_array_equal(store.frame(23, 'v'), v)
+    # the frames are stored compressed
+    raw = 2 * len(store) * u.nbytes
+    assert os.path.getsize(os.path.join(str(tmp_path), 'frames.bin')) < raw
+
+
+def test_strided_float16_frames(tmp_path):
+    with SnapshotWriter(str(tmp_path), every=4, fields=['u'], stride=2,
+                        dtype=np.float16) as writer:
+        u, _ = _burger(8, writer)
+    store = SnapshotStore(str(tmp_path))
+    assert store.fields == ['u']
+    frame = store.frame(8, 'u')
+    assert frame.dtype == np.float16
+    assert frame.shape == ((NY + 1) // 2, (NX + 1) // 2)
+    np.testing.assert_array_equal(frame, u[::2, ::2].astype(np.float16))
+    # float16 keeps about three significant digits
+    np.testing.assert_allclose(frame, u[::2, ::2], rtol=1e-3)
+    assert [step for step, _ in store.frames('u', every=2)] == [0, 8]
+
+
+def test_bounded_queue_writes_every_frame_on_close(tmp_path):
+    a = np.zeros((50, 50))
+    writer = SnapshotWriter(str(tmp_path), queue_size=1)
+    writer.open({'a': a})
+    for step in range(40):
+        a[:] = step
+        writer.save(step)
+    writer.close()
+    assert writer._thread is None
+    store = SnapshotStore(str(tmp_path))
+    assert store.steps == list(range(40))
+    assert store.frame(39, 'a')[0, 0] == 39
+
+
+def test_reopened_store_appends_and_keeps_the_last_frame(tmp_path):
+    a = np.zeros(5)
+    for value in (1., 2.):
+        with SnapshotWriter(str(tmp_path)) as writer:
+            writer.open({'a': a})
+            a[:] = value
+            writer.save(int(value))
+            writer.save(10)
+    store = SnapshotStore(str(tmp_path))
+    assert store.steps == [1, 2, 10]
+    np.testing.assert_array_equal(store.frame(10, 'a'), 2.)
+
+
+def test_refresh_follows_a_running_writer(tmp_path):
+    a = np.zeros(5)
+    with SnapshotWriter(str(tmp_path)) as writer:
+        writer.open({'a': a})
+        writer.save(0)
+        writer.wait()
+        store = SnapshotStore(str(tmp_path))
+        writer.save(1)
+        writer.wait()
+        assert store.steps == [0]
+        assert store.refresh().steps == [0, 1]
+
+
+def test_render_writes_one_image_per_frame(tmp_path):
+    pytest.importorskip('matplotlib')
+    with SnapshotWriter(str(tmp_path / 'store'), every=5) as writer:
+        _burger(10, writer)
+    paths = render(str(tmp_path / 'store'), ('u', 'v'), str(tmp_path / 'png'),
+                   kind='quiver')
+    assert len(paths) == 3 and all(os.path.exists(p) for p in paths)
@@ -0,0 +1,86 @@
+"""
+The spectral Poisson solver against the 5-point Laplacian it inverts.
+"""
+import numpy as np
+import pytest
+
+from kernels import spectral
+from kernels.spectral import SpectralPoisson, spectral_poisson
+
+NY, NX = 23, 30
+DX, DY = 2 / (NX - 1), 1 / (NY - 1)
+NEUMANN = {(0, 0): 'neumann', (0, -1): 'neumann', (1, 0): 'neumann',
+           (1, -1): 'neumann'}
+# the lid-driven cavity: p copied on three edges, p = 0 at the top
+CAVITY = {(0, 0): 'neumann', (0, -1): 0., (1, 0): 'neumann',
+          (1, -1): 'neumann'}
+
+
+def _laplacian(p):
+    f = np.zeros_like(p)
+    f[..., 1:-1, 1:-1] = (
+        (p[..., 1:-1, 2:] - 2 * p[..., 1:-1, 1:-1] + p[..., 1:-1, :-2]) / DX**2
+        + (p[..., 2:, 1:-1] - 2 * p[..., 1:-1, 1:-1] + p[..., :-2, 1:-1])
+        / DY**2)
+    return f
+
+
+def _random_field(solver, seed, batch=()):
+    p = np.zeros(batch + (NY, NX))
+    p[..., 1:-1, 1:-1] = np.random.default_rng(seed).random(
+        batch + (NY - 2, NX - 2))
+    solver.apply_bcs(p)
+    return p
+
+
+def test_sine_eigenmode_is_exact():
+    y, x = np.arange(NY) / (NY - 1), np.arange(NX) / (NX - 1)
+    k, l = 3, 5
+    mode = np.sin(k * np.pi * y)[:, None] * np.sin(l * np.pi * x)[None, :]
+    eigenvalue = (-4 * np.sin(k * np.pi / (2 * (NY - 1)))**2 / DY**2
+                  - 4 * np.sin(l * np.pi / (2 * (NX - 1)))**2 / DX**2)
+    p = SpectralPoisson((NY, NX), DX, DY).solve(eigenvalue * mode)
+    np.testing.assert_allclose(p, mode, atol=1e-13)
+
+
+@pytest.mark.parametrize('bcs, kinds', [(None, ['dst', 'dst']),
+                                        (CAVITY, ['eigh', 'dct']),
+                                        (NEUMANN, ['dct', 'dct'])],
+                         ids=['dirichlet', 'mixed', 'neumann'])
+def test_inverts_the_laplacian(bcs, kinds):
+    solver = SpectralPoisson((NY, NX), DX, DY, bcs)
+    assert [axis.kind for axis in solver.axes] == kinds
+    p = _random_field(solver, 0)
+    if bcs is NEUMANN:
+        # singular: the solution is the one of zero mean on the interior
+        p[1:-1, 1:-1] -= p[1:-1, 1:-1].mean()
+        solver.apply_bcs(p)
+    np.testing.assert_allclose(solver.solve(_laplacian(p)), p, atol=1e-11)
+
+
+def test_batched_right_hand_sides():
+    solver = SpectralPoisson((NY, NX), DX, DY, CAVITY)
+    f = _laplacian(_random_field(solver, 1, (2, 3)))
+    batched = solver.solve(f)
+    for index in np.ndindex(2, 3):
+        np.testing.assert_allclose(batched[index], solver.solve(f[index]),
+                                   rtol=1e-13, atol=1e-13)
+
+
+def test_solvers_are_cached():
+    solver = spectral_poisson((NY, NX), DX, DY, CAVITY)
+    assert spectral_poisson((NY, NX), DX, DY, dict(CAVITY)) is solver
+    assert spectral_poisson((NY, NX), DX, DY) is not solver
+    count = len(spectral._solvers)
+    p, b = np.zeros((NY, NX)), np.zeros((NY, NX))
+    for _ in range(2):
+        spectral.solve_2d_poisson_spectral(p, None, b, NX, NY, 0, DX, DY)
+    # the Dirichlet solver built above serves both calls
+    assert len(spectral._solvers) == count
+    np.testing.assert_allclose(_laplacian(p)[1:-1, 1:-1], b[1:-1, 1:-1],
+                               atol=1e-9)
+
+
+def test_inhomogeneous_condition_raises():
+    with pytest.raises(ValueError):
+        SpectralPoisson((NY, NX), DX, DY, {(0, 0): 1.})
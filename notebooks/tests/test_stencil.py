@@ -0,0 +1,109 @@
+"""
+The kernels generated by the stencil engine against the notebook loops.
+"""
+import numpy as np
+import pytest
+
+from conftest import have
+from kernels import cavity, equations
+from kernels.stencil import compile_equation
+
+BACKENDS = ['python', 'numpy',
+            pytest.param('numba', marks=pytest.mark.skipif(
+                not have('numba'), reason='numba is not installed'))]
+
+CASES_1D = [('linearconv', (1.,)), ('nonlinearconv', ()), ('diff', (.3,)),
+            ('burger', (.07,))]
+
+
+def assert_same(a, b, backend):
+    # numba reorders the arithmetic of its kernels (fastmath)
+    if backend == 'numba':
+        np.testing.assert_allclose(a, b, rtol=1e-13, atol=1e-13)
+    else:
+        np.testing.assert_array_equal(a, b)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('name, params', CASES_1D)
+def test_1d_matches_notebook(pure, backend, name, params):
+    nx, nt, dx = 41, 21, 2 / 40
+    u0 = 1 + np.random.default_rng(0).random(nx)
+    u, expected = u0.copy(), u0.copy()
+    getattr(equations, 'solve_1d_' + name)(u, np.ones(nx), nt, nx, .01, dx,
+                                           *params, backend=backend)
+    pure['solve_1d_%s_pure' % name](expected, expected.copy(), nt, nx, .01,
+                                    dx, *params)
+    assert_same(u, expected, backend)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('name, params', [('linearconv', (1.,)),
+                                          ('diff', (.05,))])
+def test_2d_one_field_matches_notebook(pure, backend, name, params):
+    ny, nx, nt = 31, 27, 11
+    u0 = 1 + np.random.default_rng(1).random((ny, nx))
+    u, expected = u0.copy(), u0.copy()
+    getattr(equations, 'solve_2d_' + name)(u, np.ones_like(u), nt, .001,
+                                           2 / (nx - 1), 2 / (ny - 1), *params,
+                                           backend=backend)
+    pure['solve_2d_%s_pure' % name](expected, expected.copy(), nt, .001,
+                                    2 / (nx - 1), 2 / (ny - 1), *params)
+    assert_same(u, expected, backend)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('name, params', [('nonlinearconv', (1.,)),
+                                          ('burger', (.01,))])
+def test_2d_two_fields_match_notebook(pure, backend, name, params):
+    ny, nx, nt = 31, 27, 11
+    rng = np.random.default_rng(2)
+    u0, v0 = 1 + rng.random((ny, nx)), 1 + rng.random((ny, nx))
+    u, v = u0.copy(), v0.copy()
+    ur, vr = u0.copy(), v0.copy()
+    getattr(equations, 'solve_2d_' + name)(
+        u, np.ones_like(u), v, np.ones_like(v), nt, .001, 2 / (nx - 1),
+        2 / (ny - 1), *params, backend=backend)
+    pure['solve_2d_%s_pure' % name](ur, ur.copy(), vr, vr.copy(), nt, .001,
+                                    2 / (nx - 1), 2 / (ny - 1), *params)
+    assert_same(u, ur, backend)
+    assert_same(v, vr, backend)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_poisson_matches_notebook(pure, backend):
+    n, nt = 30, 51
+    p, b = np.zeros((n, n)), np.zeros((n, n))
+    pr, br = np.zeros((n, n)), np.zeros((n, n))
+    equations.solve_2d_poisson(p, np.zeros_like(p), b, n, n, nt, 2 / (n - 1),
+                               1 / (n - 1), backend=backend)
+    pure['solve_2d_poisson_pure'](pr, np.zeros_like(pr), br, n, n, nt,
+                                  2 / (n - 1), 1 / (n - 1))
+    assert_same(p, pr, backend)
+
+
+@pytest.mark.parametrize('backend', ['python', 'numpy'])
+def test_cavity_matches_notebook(pure, backend):
+    n, nt, dx = 21, 30, 2 / 20
+    u, v, p = (np.zeros((n, n)) for _ in range(3))
+    ur, vr, pr = (np.zeros((n, n)) for _ in range(3))
+    # one pressure sweep per step is the run of cavity_flow_pure
+    cavity.cavity_flow(nt, u, v, .001, n, n, dx, dx, p, 1., .1, nit=1, tol=0,
+                       backend=backend)
+    pure['cavity_flow_pure'](nt, ur, vr, .001, n, n, dx, dx, pr, 1., .1)
+    for a, b in ((u, ur), (v, vr), (p, pr)):
+        np.testing.assert_array_equal(a, b)
+
+
+@pytest.mark.parametrize('nt', [0, 1, 6, 7])
+def test_pingpong_matches_copy(nt):
+    u0 = 1 + np.random.default_rng(3).random((25, 23))
+    results = []
+    for mode in ('pingpong', 'copy'):
+        u, v = u0.copy(), u0.copy()
+        kernel = compile_equation(equations.BURGER_2D, 'numpy', mode)
+        kernel(u, np.empty_like(u), v, np.empty_like(v), nt, .001, .1, .1,
+               .01)
+        results.append((u, v))
+    np.testing.assert_array_equal(results[0][0], results[1][0])
+    np.testing.assert_array_equal(results[0][1], results[1][1])
@@ -0,0 +1,78 @@
+"""
+Parameter sweeps: the table, its CSV and the case cache.
+"""
+import csv
+
+import numpy as np
+import pytest
+from mpi4py import MPI
+
+from kernels import sweep as sweeps
+
+GRID = {'nx': [21, 41], 'nu': [.1, .3], 'nt': 20}
+
+
+def test_grid_is_expanded_last_parameter_fastest():
+    assert sweeps.expand(GRID) == [
+        {'nx': 21, 'nu': .1, 'nt': 20}, {'nx': 21, 'nu': .3, 'nt': 20},
+        {'nx': 41, 'nu': .1, 'nt': 20}, {'nx': 41, 'nu': .3, 'nt': 20}]
+    with pytest.raises(ValueError):
+        sweeps.sweep('diff_1d', {'mu': [1]}, workers=1, cache=None)
+
+
+def test_second_run_is_served_from_the_cache(tmp_path, monkeypatch):
+    cache = str(tmp_path)
+    first = sweeps.sweep('diff_1d', GRID, workers=1, cache=cache)
+    assert list(first['nx']) == [21, 21, 41, 41]
+    assert list(first['nu']) == [.1, .3, .1, .3]
+    assert first['finite'].all()
+
+    def run(*args):
+        raise AssertionError('a cached case was run again')
+
+    monkeypatch.setattr(sweeps, 'run_case', run)
+    second = sweeps.sweep('diff_1d', GRID, workers=1, cache=cache)
+    for name, column in first.items():
+        np.testing.assert_array_equal(second[name], column)
+    fields = sweeps.load_fields(cache, 'diff_1d', 'numpy',
+                                sweeps.PROBLEMS['diff_1d'].parameters(
+                                    sweeps.expand(GRID)[3]))
+    assert fields['u'].shape == (41,)
+    assert fields['u'].max() == first['u_max'][3]
+
+
+def test_an_extended_grid_only_runs_the_new_cases(tmp_path, monkeypatch):
+    cache = str(tmp_path)
+    sweeps.sweep('diff_1d', GRID, workers=1, cache=cache)
+    ran = []
+    run_case = sweeps.run_case
+
+    def counted(problem, backend, parameters, cache=None):
+        ran.append(parameters['nx'])
+        return run_case(problem, backend, parameters, cache)
+
+    monkeypatch.setattr(sweeps, 'run_case', counted)
+    columns = sweeps.sweep('diff_1d', dict(GRID, nx=[21, 41, 61]), workers=1,
+                           cache=cache)
+    assert ran == [61, 61]
+    assert len(columns['nx']) == 6
+
+
+def test_csv_has_one_row_per_case(tmp_path):
+    columns = sweeps.sweep('linearconv_1d', {'nx': [41, 81, 161], 'nt': 10},
+                           workers=1, cache=None)
+    path = str(tmp_path / 'table.csv')
+    sweeps.save(path, columns)
+    with open(path, newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == list(columns)
+    assert [int(row[0]) for row in rows[1:]] == [41, 81, 161]
+
+
+def test_ranks_share_the_cases():
+    comm = MPI.COMM_WORLD
+    grid = {'nx': [21, 31, 41, 51, 61], 'nt': 5}
+    columns = sweeps.sweep('diff_1d', grid, cache=None, comm=comm)
+    serial = sweeps.sweep('diff_1d', grid, workers=1, cache=None)
+    assert list(columns['nx']) == grid['nx']
+    np.testing.assert_array_equal(columns['u_max'], serial['u_max'])
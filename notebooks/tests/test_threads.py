@@ -0,0 +1,99 @@
+"""
+The multithreaded backends against the serial numpy one.
+"""
+import os
+
+import numpy as np
+import pytest
+
+from conftest import have
+from kernels import cavity, ensemble, equations, threads
+
+needs_numba = pytest.mark.skipif(not have('numba'),
+                                 reason='numba is not installed')
+
+
+@pytest.fixture
+def restore_threads():
+    n = threads.get_threads()
+    environ = os.environ.get('OMP_NUM_THREADS')
+    yield
+    threads.set_threads(n)
+    if environ is None:
+        os.environ.pop('OMP_NUM_THREADS', None)
+    else:
+        os.environ['OMP_NUM_THREADS'] = environ
+
+
+def _counts():
+    if have('numba'):
+        import numba
+        return sorted({1, numba.config.NUMBA_NUM_THREADS})
+    return [1, 2]
+
+
+def test_set_threads_round_trips(restore_threads):
+    for n in _counts():
+        threads.set_threads(n)
+        assert threads.get_threads() == n
+        assert os.environ['OMP_NUM_THREADS'] == str(n)
+
+
+def test_first_touch_allocations_match_numpy():
+    a = np.random.default_rng(5).random((17, 9, 3))
+    np.testing.assert_array_equal(threads.zeros((17, 9)), np.zeros((17, 9)))
+    np.testing.assert_array_equal(threads.full(7, 2.5), np.full(7, 2.5))
+    np.testing.assert_array_equal(threads.copy(a), a)
+    assert threads.copy(a[:, ::2]).flags.c_contiguous
+
+
+@needs_numba
+@pytest.mark.parametrize('name, params', [('linearconv', (1.,)),
+                                          ('burger', (.07,))])
+def test_1d_numba_parallel_matches_numpy(name, params):
+    u0 = 1 + np.random.default_rng(6).random(61)
+    solve = getattr(equations, 'solve_1d_' + name)
+    results = []
+    for backend in ('numpy', 'numba_parallel'):
+        u = u0.copy()
+        solve(u, np.empty_like(u), 30, 61, .002, 2 / 60, *params,
+              backend=backend)
+        results.append(u)
+    assert np.isfinite(results[0]).all()
+    np.testing.assert_allclose(results[1], results[0], rtol=1e-13)
+
+
+@needs_numba
+def test_2d_numba_parallel_matches_numpy():
+    ny, nx = 33, 29
+    results = []
+    for backend in ('numpy', 'numba_parallel'):
+        u, v = np.ones((ny, nx)), np.ones((ny, nx))
+        equations.solve_2d_burger(u, np.ones_like(u), v, np.ones_like(v), 25,
+                                  .001, 2 / (nx - 1), 2 / (ny - 1), .01,
+                                  backend=backend)
+        results.append((u, v))
+    for got, want in zip(results[1], results[0]):
+        np.testing.assert_allclose(got, want, rtol=1e-13)
+
+
+@needs_numba
+def test_cavity_and_batch_numba_parallel_match_numpy():
+    n = 21
+    flows = []
+    for backend in ('numpy', 'numba_parallel'):
+        u, v, p = (np.zeros((n, n)) for _ in range(3))
+        cavity.cavity_flow(20, u, v, .001, n, n, 2 / (n - 1), 2 / (n - 1), p,
+                           1., .1, backend=backend)
+        flows.append((u, v, p))
+    for got, want in zip(flows[1], flows[0]):
+        np.testing.assert_allclose(got, want, rtol=1e-12, atol=1e-12)
+    u0 = 1 + np.random.default_rng(7).random((5, 41))
+    batches = []
+    for backend in ('numpy', 'numba_parallel'):
+        u = u0.copy()
+        ensemble.solve_1d_diff_batch(u, np.empty_like(u), 20, 41, .001,
+                                     2 / 40, np.linspace(.1, .3, 5),
+                                     backend=backend)
+        batches.append(u)
+    np.testing.assert_allclose(batches[1], batches[0], rtol=1e-13)
@@ -0,0 +1,88 @@
+"""
+Phase timers, their per-rank summary and the Chrome trace.
+"""
+import json
+
+import pytest
+from mpi4py import MPI
+
+import timing
+from timing import NULL_TIMER, PhaseTimer
+
+
+def _report():
+    """Two ranks; only rank 1 runs the 'master' phase and counts messages."""
+    return {'size': 2, 'samples': 100, 'ranks': [
+        {'rank': 0, 'start': 10., 'wall': 2.,
+         'phases': {'blocks': ['compute', 2, 1.5]},
+         'counters': {'blocks': 3},
+         'events': [('blocks', 'compute', 10.5, 1.), ('blocks', None, 11.5, 3)]},
+        {'rank': 1, 'start': 10.25, 'wall': 1.5,
+         'phases': {'blocks': ['compute', 1, .5],
+                    'master': ['communication', 4, 1.]},
+         'counters': {'blocks': 1, 'messages': 8},
+         'events': None}]}
+
+
+def test_summary_counts_missing_phases_as_zero():
+    lines = timing.summary(_report()).splitlines()
+    assert lines[0].startswith('2 ranks, wall 2.0000 s')
+    assert 'after 0.2500 s' in lines[0]
+    blocks = lines[2].split()
+    assert blocks[:3] == ['blocks', 'compute', '3']
+    # mean 1.0, min .5, max 1.5, imbalance 1.5
+    assert [float(v) for v in blocks[3:]] == [1., .5, 1.5, 1.5]
+    master = lines[3].split()
+    assert master[:3] == ['master', 'communication', '4']
+    assert [float(v) for v in master[3:]] == [.5, 0., 1., 2.]
+    counters = {line.split()[0]: line.split()[1:] for line in lines[5:]}
+    assert counters == {'blocks': ['4', '1', '3'], 'messages': ['8', '0', '8']}
+
+
+def test_trace_events_are_relative_to_the_first_start():
+    events = timing.trace_events(_report())
+    runs = [e for e in events if e['name'] == 'run']
+    assert [(e['pid'], e['ts'], e['dur']) for e in runs] == [
+        (0, 0., 2e6), (1, .25e6, 1.5e6)]
+    phase, = [e for e in events if e.get('cat') == 'compute']
+    assert (phase['ts'], phase['dur']) == (.5e6, 1e6)
+    counter, = [e for e in events if e['ph'] == 'C']
+    assert counter['args'] == {'blocks': 3} and counter['ts'] == 1.5e6
+    names = [e['args']['name'] for e in events if e['name'] == 'process_name']
+    assert names == ['rank 0', 'rank 1']
+
+
+def test_report_gathers_every_rank(tmp_path, monkeypatch):
+    comm = MPI.COMM_WORLD
+    output = comm.bcast(str(tmp_path / 'run.json'))
+    monkeypatch.setenv(timing.OUTPUT, output)
+    trace = str(tmp_path / 'trace.json')
+    timer = PhaseTimer(comm, trace=trace)
+    with timer.phase('work', 'compute'):
+        pass
+    if comm.Get_rank() == 1:
+        with timer.phase('extra', 'communication'):
+            pass
+    timer.count('items', comm.Get_rank() + 1)
+    timer.barrier()
+    result = timer.report(root=0, label='test')
+    if comm.Get_rank() != 0:
+        assert result is None
+        return
+    assert result['size'] == comm.Get_size() and result['label'] == 'test'
+    assert [r['counters']['items'] for r in result['ranks']] == list(
+        range(1, comm.Get_size() + 1))
+    assert result['ranks'][0]['phases']['idle'][1] == 1
+    with open(output) as f:
+        assert json.load(f)['size'] == comm.Get_size()
+    with open(trace) as f:
+        assert any(e['name'] == 'work' for e in json.load(f)['traceEvents'])
+
+
+def test_null_timer_records_nothing():
+    with NULL_TIMER.phase('anything', 'compute'):
+        NULL_TIMER.count('calls')
+    assert not NULL_TIMER.enabled
+    with pytest.raises(KeyError):
+        with PhaseTimer(MPI.COMM_SELF).phase('x', 'unknown'):
+            pass